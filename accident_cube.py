@@ -0,0 +1,92 @@
+"""Cube de comptes pré-calculé pour les métriques et graphiques de la page accidentologie.
+
+Une ligne par combinaison observée de (mois, type_usager, gravite_combinee,
+arrondissement, heure, jour_semaine) avec le nombre d'accidents. Les compteurs
+(``st.metric``), barres et camemberts filtrent et somment ce cube : un changement
+de filtre coûte O(cellules du cube) et non O(accidents).
+"""
+import pandas as pd
+import pyarrow.parquet as pq
+
+from accident_store import GRAVITY_LEVELS, ensure_accident_store, load_accidents, period_key
+from storage import cache_path, file_fingerprint, is_fresh, write_fingerprinted_parquet
+
+CUBE_NAME = "accidents_cube.parquet"
+CUBE_VERSION = "1"
+
+CUBE_DIMENSIONS = ['periode', 'type_usager', 'gravite_combinee', 'arrondissement', 'heure', 'jour_semaine']
+# Attributs fonctionnellement dépendants de ``periode`` (n'ajoutent aucune cellule)
+PERIOD_ATTRIBUTES = ['mois_annee', 'annee', 'mois', 'mois_nom']
+
+
+def _cube_fingerprint(store):
+    return f"{CUBE_VERSION}:{file_fingerprint(store)}"
+
+
+def build_cube(target=None):
+    """Agrège le jeu dérivé (accidents géolocalisés) sur les dimensions du cube."""
+    store = ensure_accident_store()
+    target = target or cache_path(CUBE_NAME)
+    df = load_accidents(columns=CUBE_DIMENSIONS + PERIOD_ATTRIBUTES)
+    cube = (
+        df.groupby(CUBE_DIMENSIONS + PERIOD_ATTRIBUTES, observed=True)
+        .size()
+        .rename('count')
+        .reset_index()
+    )
+    cube['count'] = cube['count'].astype('int32')
+    return write_fingerprinted_parquet(target, cube, _cube_fingerprint(store))
+
+
+def ensure_cube():
+    """Chemin du cube, reconstruit seulement si le jeu dérivé a changé."""
+    store = ensure_accident_store()
+    target = cache_path(CUBE_NAME)
+    if is_fresh(target, _cube_fingerprint(store)):
+        return target
+    return build_cube(target)
+
+
+def load_cube():
+    """Cube complet (quelques milliers de lignes)."""
+    return pd.read_parquet(ensure_cube())
+
+
+def slice_cube(cube, periode=None, usagers=None, gravites=None, arrondissements=None,
+               annee=None, mois_nom=None):
+    """Sous-cube correspondant aux filtres de la page (``None`` = pas de filtre)."""
+    mask = pd.Series(True, index=cube.index)
+    if periode is not None:
+        mask &= cube['periode'].between(period_key(periode[0]), period_key(periode[1]))
+    if usagers is not None:
+        mask &= cube['type_usager'].isin(list(usagers))
+    if gravites is not None:
+        mask &= cube['gravite_combinee'].isin(list(gravites))
+    if arrondissements is not None:
+        mask &= cube['arrondissement'].isin(list(arrondissements))
+    if annee is not None:
+        mask &= cube['annee'] == annee
+    if mois_nom is not None:
+        mask &= cube['mois_nom'] == mois_nom
+    return cube[mask]
+
+
+def total(cube):
+    """Nombre d'accidents d'un (sous-)cube."""
+    return int(cube['count'].sum())
+
+
+def counts_by(cube, by):
+    """Comptes agrégés selon une ou plusieurs dimensions (catégories absentes exclues)."""
+    return cube.groupby(by, observed=True)['count'].sum()
+
+
+def gravity_counts(cube):
+    """Comptes par niveau de gravité, dans l'ordre de GRAVITY_LEVELS (zéros inclus)."""
+    counts = counts_by(cube, 'gravite_combinee')
+    return {level: int(counts.get(level, 0)) for level in GRAVITY_LEVELS}
+
+
+if __name__ == "__main__":
+    path = build_cube()
+    print(f"{path} : {pq.ParquetFile(path).metadata.num_rows} cellules")
@@ -0,0 +1,127 @@
+"""Agrégation spatiale pré-calculée des accidents (grille par niveau de zoom).
+
+Chaque accident est rangé dans une cellule de ``CELL_PX`` pixels de la projection
+Web Mercator à chaque niveau de zoom de ``ZOOM_LEVELS``. Les comptes sont stockés
+par (zoom, periode, type_usager, gravite_combinee, cellule) : la carte ne reçoit
+que les cellules non vides de la vue demandée, dont le nombre est borné par la
+taille de la grille et non par le nombre d'accidents.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from accident_store import ensure_accident_store, load_accidents, period_key
+from storage import cache_path, file_fingerprint, is_fresh, write_fingerprinted_parquet
+
+GRID_NAME = "accidents_grid.parquet"
+GRID_VERSION = "1"
+ZOOM_LEVELS = (11, 12, 13, 14, 15)
+CELL_PX = 64
+TILE_PX = 256
+
+
+def _pixel_xy(lat, lon, zoom):
+    """Coordonnées pixel Web Mercator (vectorisé)."""
+    scale = TILE_PX * 2.0 ** zoom
+    x = (lon + 180.0) / 360.0 * scale
+    sin_lat = np.sin(np.radians(lat))
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)) * scale
+    return x, y
+
+
+def _cell_bounds(cx, cy, zoom):
+    """Emprise (lat/lon) d'une cellule de grille."""
+    scale = TILE_PX * 2.0 ** zoom
+    x0, x1 = cx * CELL_PX, (cx + 1) * CELL_PX
+    y0, y1 = cy * CELL_PX, (cy + 1) * CELL_PX
+    lon0, lon1 = x0 / scale * 360.0 - 180.0, x1 / scale * 360.0 - 180.0
+    lat0 = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y1 / scale))))
+    lat1 = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y0 / scale))))
+    return lat0, lon0, lat1, lon1
+
+
+def _grid_fingerprint(store):
+    return f"{GRID_VERSION}:{CELL_PX}:{ZOOM_LEVELS}:{file_fingerprint(store)}"
+
+
+def build_grid(target=None):
+    """Pré-calcule les comptes par cellule pour tous les niveaux de zoom."""
+    store = ensure_accident_store()
+    target = target or cache_path(GRID_NAME)
+    df = load_accidents(columns=['latitude', 'longitude', 'periode', 'type_usager', 'gravite_combinee'])
+    lat = df['latitude'].to_numpy()
+    lon = df['longitude'].to_numpy()
+
+    parts = []
+    for zoom in ZOOM_LEVELS:
+        x, y = _pixel_xy(lat, lon, zoom)
+        cells = pd.DataFrame({
+            'zoom': np.int8(zoom),
+            'periode': df['periode'],
+            'type_usager': df['type_usager'],
+            'gravite_combinee': df['gravite_combinee'],
+            'cx': (x // CELL_PX).astype('int32'),
+            'cy': (y // CELL_PX).astype('int32'),
+            'latitude': lat,
+            'longitude': lon,
+        })
+        grouped = cells.groupby(
+            ['zoom', 'periode', 'type_usager', 'gravite_combinee', 'cx', 'cy'], observed=True
+        ).agg(
+            count=('latitude', 'size'),
+            sum_lat=('latitude', 'sum'),
+            sum_lon=('longitude', 'sum'),
+        ).reset_index()
+        parts.append(grouped)
+
+    grid = pd.concat(parts, ignore_index=True).sort_values(['zoom', 'periode'], kind='stable')
+    return write_fingerprinted_parquet(
+        target, grid, _grid_fingerprint(store), row_group_size=16384, write_statistics=True
+    )
+
+
+def ensure_grid():
+    """Chemin de la grille, reconstruite seulement si le jeu dérivé a changé."""
+    store = ensure_accident_store()
+    target = cache_path(GRID_NAME)
+    if is_fresh(target, _grid_fingerprint(store)):
+        return target
+    return build_grid(target)
+
+
+def nearest_zoom(zoom):
+    """Niveau pré-calculé le plus proche d'un zoom de carte."""
+    return min(ZOOM_LEVELS, key=lambda z: abs(z - zoom))
+
+
+def query_grid(zoom, periode=None, usagers=None, gravites=None):
+    """Cellules non vides d'une vue : une ligne par cellule (compte, centroïde, emprise).
+
+    ``periode`` est un couple ('YYYY-MM', 'YYYY-MM') inclusif ; le zoom et la période
+    sont filtrés par le lecteur Parquet, les catégories sur la table (déjà agrégée)
+    en mémoire.
+    """
+    zoom = nearest_zoom(zoom)
+    filters = [('zoom', '==', zoom)]
+    if periode is not None:
+        filters += [('periode', '>=', period_key(periode[0])),
+                    ('periode', '<=', period_key(periode[1]))]
+    cells = pd.read_parquet(ensure_grid(), filters=filters)
+    if usagers is not None:
+        cells = cells[cells['type_usager'].isin(list(usagers))]
+    if gravites is not None:
+        cells = cells[cells['gravite_combinee'].isin(list(gravites))]
+
+    cells = cells.groupby(['cx', 'cy'], observed=True)[['count', 'sum_lat', 'sum_lon']].sum().reset_index()
+    cells['latitude'] = cells['sum_lat'] / cells['count']
+    cells['longitude'] = cells['sum_lon'] / cells['count']
+
+    lat0, lon0, lat1, lon1 = _cell_bounds(cells['cx'].to_numpy(), cells['cy'].to_numpy(), zoom)
+    cells = cells.assign(lat_min=lat0, lon_min=lon0, lat_max=lat1, lon_max=lon1, zoom=zoom)
+    return cells.drop(columns=['sum_lat', 'sum_lon']).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    path = build_grid()
+    meta = pq.ParquetFile(path).metadata
+    print(f"{path} : {meta.num_rows} cellules, {meta.num_row_groups} row groups")
@@ -0,0 +1,383 @@
+"""Construction des cartes folium de la page accidentologie.
+
+Les points sont extraits du DataFrame filtré en une passe NumPy (tableaux de
+coordonnées et codes de catégories), puis émis dans une seule couche
+``FastMarkerCluster`` / ``HeatMap`` : les marqueurs sont créés par le navigateur,
+pas un objet Python par accident. Plus besoin d'échantillonner.
+
+Les cartes rendues (HTML) sont conservées dans un cache LRU commun à toutes les
+sessions (``MapCache``), indexé par un descripteur compact des filtres et des
+paramètres de style (``map_key``) plutôt que par le contenu du DataFrame filtré,
+et borné en mémoire (``CV_MAP_CACHE_MB`` Mo). Le style de la carte principale
+(rayon, flou, intensité, taille et opacité des marqueurs) est lu côté navigateur
+dans un objet ``STYLE_CARTE`` : le HTML mis en cache ne dépend que des données et
+un changement de style ne fait que remplacer cet objet (``apply_map_style``).
+"""
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import folium
+import numpy as np
+from folium.plugins import FastMarkerCluster, HeatMap, HeatMapWithTime
+from folium.utilities import JsCode
+
+PARIS_CENTER = [48.8566, 2.3522]
+GRAVITY_LEVELS = ['Tué', 'Blessé hospitalisé', 'Blessé léger']
+GRAVITY_COLORS = {
+    'Tué': 'red',
+    'Blessé hospitalisé': 'orange',
+    'Blessé léger': 'yellow'
+}
+# Taille du marqueur = taille de base + décalage selon la gravité
+GRAVITY_SIZE_OFFSETS = {'Tué': 3, 'Blessé hospitalisé': 1, 'Blessé léger': 0}
+# Pondération de la carte de chaleur des zones à risque
+GRAVITY_WEIGHTS = {'Tué': 10, 'Blessé hospitalisé': 5, 'Blessé léger': 1}
+HEAT_GRADIENT = {
+    0.4: 'blue',
+    0.6: 'yellow',
+    0.8: 'orange',
+    1.0: 'red'
+}
+# Colonnes lues par les cartes de points et par les cartes de chaleur
+POINT_COLUMNS = ['latitude', 'longitude', 'gravite_combinee', 'type_usager', 'date_heure']
+COORD_COLUMNS = ['latitude', 'longitude']
+# Taille maximale du cache des cartes rendues (HTML), en Mo
+MAP_CACHE_MB = float(os.environ.get("CV_MAP_CACHE_MB", 64))
+# Emplacement du style dans le HTML d'une carte principale mise en cache
+STYLE_TOKEN = "STYLE_CARTE_A_REMPLACER"
+# ~1 m de précision : suffisant pour l'affichage, allège le HTML envoyé
+COORD_DECIMALS = 5
+
+# Rendu d'une ligne [lat, lon, code gravité, code usager, date] côté navigateur
+_MARKER_CALLBACK = """function (row) {
+    var gravite = GRAVITES[row[2]];
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: TAILLE + DECALAGES[row[2]],
+        color: COULEURS[row[2]],
+        fill: true,
+        fillOpacity: OPACITE
+    });
+    marker.bindPopup(POPUP(gravite, USAGERS[row[3]], row[4]), {maxWidth: 300});
+    return marker;
+}"""
+
+_POPUP_SIMPLE = """function (gravite, usager, date) {
+    return '<b>' + gravite + '</b><br>Type: ' + usager + '<br>Date: ' + date;
+}"""
+
+_POPUP_DETAILLE = """function (gravite, usager, date) {
+    return '<div style="font-family: Arial; font-size: 12px;"><b>' + gravite + '</b><br>'
+        + '<b>Type:</b> ' + usager + '<br>'
+        + '<b>Date:</b> ' + date.slice(0, 10) + '<br>'
+        + '<b>Heure:</b> ' + date.slice(11, 16) + '</div>';
+}"""
+
+
+def coordinates(df):
+    """Tableau (n, 2) des coordonnées arrondies."""
+    return np.round(df[['latitude', 'longitude']].to_numpy(dtype='float64'), COORD_DECIMALS)
+
+
+def _codes(series, categories):
+    """Codes entiers d'une colonne par rapport à une liste de catégories (vectorisé)."""
+    if hasattr(series, 'cat') and list(series.cat.categories) == list(categories):
+        return series.cat.codes.to_numpy()
+    return np.asarray(
+        series.astype('category').cat.set_categories(categories).cat.codes
+    )
+
+
+def heat_points(df, weighted=False):
+    """Points [lat, lon] (ou [lat, lon, poids] pondérés par la gravité) en une passe."""
+    coords = coordinates(df)
+    if not weighted:
+        return coords
+    weights = np.array([GRAVITY_WEIGHTS[g] for g in GRAVITY_LEVELS], dtype='float64')
+    codes = _codes(df['gravite_combinee'], GRAVITY_LEVELS)
+    return np.column_stack([coords, weights[codes]])
+
+
+def marker_rows(df, date_format='%Y-%m-%d'):
+    """Lignes compactes pour le callback JS et la table des types d'usagers."""
+    usagers = sorted(df['type_usager'].astype(str).unique())
+    coords = coordinates(df)
+    gravite = _codes(df['gravite_combinee'], GRAVITY_LEVELS)
+    usager = _codes(df['type_usager'].astype(str), usagers)
+    dates = df['date_heure'].dt.strftime(date_format).to_numpy()
+    rows = [
+        [lat, lon, g, u, d]
+        for lat, lon, g, u, d in zip(coords[:, 0].tolist(), coords[:, 1].tolist(),
+                                     gravite.tolist(), usager.tolist(), dates.tolist())
+    ]
+    return rows, usagers
+
+
+def add_marker_layer(m, df, marker_size=8, marker_opacity=0.7, cluster_options=None,
+                     detailed_popup=False, name=None):
+    """Ajoute tous les accidents à la carte dans une seule couche de clusters."""
+    date_format = '%Y-%m-%d %H:%M' if detailed_popup else '%Y-%m-%d'
+    rows, usagers = marker_rows(df, date_format)
+    constants = {
+        'GRAVITES': GRAVITY_LEVELS,
+        'COULEURS': [GRAVITY_COLORS[g] for g in GRAVITY_LEVELS],
+        'DECALAGES': [GRAVITY_SIZE_OFFSETS[g] for g in GRAVITY_LEVELS],
+        'USAGERS': usagers,
+        'TAILLE': marker_size,
+        'OPACITE': marker_opacity,
+    }
+    declarations = "".join(
+        f"var {k} = {v.js_code if isinstance(v, JsCode) else json.dumps(v, ensure_ascii=False)};\n"
+        for k, v in constants.items()
+    )
+    popup = _POPUP_DETAILLE if detailed_popup else _POPUP_SIMPLE
+    callback = (
+        "(function () {\n" + declarations
+        + f"var POPUP = {popup};\n"
+        + f"return {_MARKER_CALLBACK};\n" + "})()"
+    )
+    FastMarkerCluster(rows, callback=callback, name=name, options=cluster_options or {}).add_to(m)
+    return m
+
+
+def add_heat_layer(m, points, **kwargs):
+    """Ajoute une couche de chaleur à partir d'un tableau de points."""
+    if len(points):
+        kwargs.setdefault('gradient', HEAT_GRADIENT)
+        HeatMap(points.tolist(), **kwargs).add_to(m)
+    return m
+
+
+def map_style(heatmap_radius=25, heatmap_blur=15, heatmap_intensity=0.6, marker_size=8, marker_opacity=0.7):
+    """Littéral JavaScript ``STYLE_CARTE`` (sans guillemets : insérable tel quel dans le HTML de l'iframe)."""
+    return (f"{{rayon: {float(heatmap_radius)}, flou: {float(heatmap_blur)}, "
+            f"intensite: {float(heatmap_intensity)}, taille: {float(marker_size)}, "
+            f"opacite: {float(marker_opacity)}}}")
+
+
+def apply_map_style(html, **style):
+    """Fixe le style d'une carte rendue par ``create_accident_map_template`` (voir ``map_style``)."""
+    return html.replace(STYLE_TOKEN, map_style(**style), 1)
+
+
+def _accident_map(df, show_heatmap, style):
+    m = folium.Map(location=PARIS_CENTER, zoom_start=12, tiles='cartodbpositron')
+    m.get_root().header.add_child(folium.Element(f"<script>var STYLE_CARTE = {style};</script>"))
+
+    if show_heatmap:
+        add_heat_layer(
+            m, heat_points(df),
+            name="Carte de chaleur",
+            min_opacity=JsCode("0.3 * STYLE_CARTE.intensite"),
+            max_zoom=18,
+            radius=JsCode("STYLE_CARTE.rayon"),
+            blur=JsCode("STYLE_CARTE.flou"),
+        )
+
+    add_marker_layer(
+        m, df, JsCode("STYLE_CARTE.taille"), JsCode("STYLE_CARTE.opacite"),
+        cluster_options={
+            'maxClusterRadius': 60,
+            'disableClusteringAtZoom': 16,
+            'spiderfyOnMaxZoom': True,
+            'showCoverageOnHover': False
+        },
+        name="Accidents",
+    )
+    folium.LayerControl().add_to(m)
+    return m
+
+
+def create_accident_map(df, show_heatmap=True, heatmap_radius=25, heatmap_blur=15,
+                        heatmap_intensity=0.6, marker_size=8, marker_opacity=0.7):
+    """Carte principale : tous les accidents filtrés + carte de chaleur optionnelle."""
+    return _accident_map(df, show_heatmap, map_style(heatmap_radius, heatmap_blur, heatmap_intensity,
+                                                     marker_size, marker_opacity))
+
+
+def create_accident_map_template(df, show_heatmap=True):
+    """Carte principale sans style : à compléter par ``apply_map_style`` après rendu."""
+    return _accident_map(df, show_heatmap, STYLE_TOKEN)
+
+
+def grid_features(cells):
+    """FeatureCollection GeoJSON des cellules agrégées (rayon et couleur selon le compte)."""
+    counts = cells['count'].to_numpy(dtype='float64')
+    if len(counts):
+        scale = np.sqrt(counts / counts.max())
+        radius = np.round(4 + 16 * scale, 1)
+        colors = np.array(['blue', 'yellow', 'orange', 'red'])[
+            np.minimum((scale * 4).astype(int), 3)
+        ]
+    else:
+        radius, colors = np.array([]), np.array([])
+    coords = np.round(cells[['longitude', 'latitude']].to_numpy(dtype='float64'), COORD_DECIMALS)
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'accidents': n, 'radius': r, 'color': c},
+        }
+        for (lon, lat), n, r, c in zip(coords.tolist(), cells['count'].astype(int).tolist(),
+                                       radius.tolist(), colors.tolist())
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def _grid_style(feature):
+    # Fonction de module (et non lambda) : la carte doit rester sérialisable pour le cache
+    props = feature['properties']
+    return {'radius': props['radius'], 'color': props['color'], 'fillColor': props['color']}
+
+
+def create_grid_map(cells, zoom):
+    """Carte agrégée : une bulle par cellule de grille non vide (comptes pré-calculés)."""
+    m = folium.Map(location=PARIS_CENTER, zoom_start=zoom, tiles='cartodbpositron')
+    folium.GeoJson(
+        grid_features(cells),
+        name="Accidents (agrégés)",
+        marker=folium.CircleMarker(fill=True, fill_opacity=0.6, weight=1),
+        style_function=_grid_style,
+        tooltip=folium.GeoJsonTooltip(fields=['accidents'], aliases=["Accidents"]),
+    ).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m
+
+
+def create_period_heatmap(df):
+    """Carte de chaleur d'une période (mois ou année) de l'animation."""
+    m = folium.Map(location=PARIS_CENTER, zoom_start=13,
+                   tiles='cartodbpositron',
+                   max_bounds=True,
+                   min_zoom=12,
+                   max_zoom=16)
+    add_heat_layer(m, heat_points(df), radius=15, blur=20, min_opacity=0.4)
+    return m
+
+
+def period_frames(df, column, labels):
+    """Points [lat, lon] de chaque période : une image par valeur de ``column`` (mois, année)."""
+    coords = coordinates(df)
+    keys = df[column].to_numpy()
+    return [coords[keys == label] for label in labels]
+
+
+def create_animated_heatmap(frames, labels):
+    """Carte de chaleur animée : toutes les périodes envoyées en une couche, lecture dans le navigateur.
+
+    Le serveur ne construit la carte qu'une fois ; lecture, pause, vitesse (1 image
+    par seconde au départ) et navigation entre périodes sont gérées par le lecteur
+    Leaflet TimeDimension.
+    """
+    m = folium.Map(location=PARIS_CENTER, zoom_start=13,
+                   tiles='cartodbpositron',
+                   max_bounds=True,
+                   min_zoom=12,
+                   max_zoom=16)
+    HeatMapWithTime(
+        [frame.tolist() for frame in frames],
+        index=[str(label) for label in labels],
+        name="Carte de chaleur",
+        radius=15,
+        min_opacity=0.1,
+        max_opacity=0.8,
+        auto_play=True,
+        min_speed=0.5,
+        max_speed=4,
+        speed_step=0.5,
+        position='bottomleft',
+    ).add_to(m)
+    return m
+
+
+def _arrondissement_center(df):
+    return [float(df['latitude'].mean()), float(df['longitude'].mean())]
+
+
+def create_arrondissement_map(df):
+    """Carte détaillée des accidents d'un arrondissement (popups avec l'heure)."""
+    m = folium.Map(location=_arrondissement_center(df), zoom_start=15, tiles='cartodbpositron')
+    add_marker_layer(
+        m, df,
+        cluster_options={
+            'maxClusterRadius': 30,
+            'disableClusteringAtZoom': 16
+        },
+        detailed_popup=True,
+        name="Accidents",
+    )
+    folium.LayerControl().add_to(m)
+    return m
+
+
+def create_arrondissement_heatmap(df):
+    """Carte de chaleur des zones à risque d'un arrondissement, pondérée par la gravité."""
+    m = folium.Map(location=_arrondissement_center(df), zoom_start=15, tiles='cartodbpositron')
+    add_heat_layer(
+        m, heat_points(df, weighted=True),
+        name="Zones à risque",
+        min_opacity=0.3,
+        max_zoom=18,
+        radius=25,
+        blur=15,
+    )
+    folium.LayerControl().add_to(m)
+    return m
+
+
+def _normalize(value):
+    # Listes de filtres -> tuples triés (l'ordre de sélection ne change pas la carte) ;
+    # les tuples (bornes de période) gardent leur ordre
+    if isinstance(value, (list, set, frozenset)):
+        return tuple(sorted((_normalize(v) for v in value), key=str))
+    if isinstance(value, tuple):
+        return tuple(_normalize(v) for v in value)
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def map_key(kind, **params):
+    """Descripteur hachable d'une carte : type, filtres et paramètres de style."""
+    return (kind,) + tuple((name, _normalize(params[name])) for name in sorted(params))
+
+
+class MapCache:
+    """Cache LRU des cartes rendues (HTML), borné en octets et partagé entre threads."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = int(MAP_CACHE_MB * 2 ** 20) if max_bytes is None else int(max_bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """HTML de la carte ``key`` ; ``build()`` (qui renvoie une carte folium) n'est appelé qu'en cas d'absence."""
+        with self._lock:
+            html = self._items.get(key)
+            if html is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        # Construction hors verrou : les autres sessions ne sont pas bloquées
+        html = build()._repr_html_()
+        size = sys.getsizeof(html)
+        with self._lock:
+            if key not in self._items and size <= self.max_bytes:
+                self._items[key] = html
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._items.popitem(last=False)
+                    self.bytes -= sys.getsizeof(evicted)
+        return html
+
+    def stats(self):
+        """Nombre de cartes, octets occupés, succès et échecs de lecture."""
+        with self._lock:
+            return {'cartes': len(self._items), 'octets': self.bytes, 'succes': self.hits, 'echecs': self.misses}
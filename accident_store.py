@@ -0,0 +1,214 @@
+"""Jeu d'accidents dérivé, typé et trié, construit une seule fois depuis accidentologie.parquet.
+
+Toutes les colonnes utilisées par la page accidentologie (parties de date entières,
+libellés de mois/jour, gravité combinée, arrondissement nettoyé) sont calculées ici
+une fois pour toutes, puis relues avec projection de colonnes et filtres poussés
+jusqu'au lecteur Parquet (statistiques par row group).
+
+Construction manuelle : ``python accident_store.py``
+
+Le jeu géolocalisé complet peut aussi être chargé une fois par processus
+(``load_shared_accidents``) : les colonnes pandas pointent directement dans les
+tampons Arrow (lecture seule) et les périodes ou filtres de la page en sont des
+tranches ou des positions de lignes, sans copie du DataFrame.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from storage import cache_path, file_fingerprint, is_fresh, write_fingerprinted_parquet
+
+SOURCE_FILE = "accidentologie.parquet"
+STORE_NAME = "accidents_derived.parquet"
+STORE_VERSION = "1"
+ROW_GROUP_SIZE = 8192
+
+GRAVITY_LEVELS = ['Tué', 'Blessé hospitalisé', 'Blessé léger']
+MOIS_NOMS = ['January', 'February', 'March', 'April', 'May', 'June',
+             'July', 'August', 'September', 'October', 'November', 'December']
+JOURS_SEMAINE = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Colonnes sources réellement utilisées et leur nom dans le jeu dérivé
+COLUMN_MAPPING = {
+    'Date': 'date_heure',
+    'Latitude': 'latitude',
+    'Longitude': 'longitude',
+    'Mode': 'type_usager',
+    'Arrondissement': 'arrondissement',
+    'Id accident': 'id_accident',
+    'Gravité': 'gravite',
+}
+SOURCE_COLUMNS = list(COLUMN_MAPPING) + ['Blessés hospitalisés', 'Tué']
+
+# Colonnes chargées par défaut par l'application
+APP_COLUMNS = [
+    'date_heure', 'latitude', 'longitude', 'type_usager', 'arrondissement',
+    'id_accident', 'gravite_combinee', 'heure', 'mois', 'annee', 'periode',
+    'mois_annee', 'jour_semaine', 'mois_nom',
+]
+
+
+def clean_arrondissement(arr):
+    """Numéro d'arrondissement sous forme de chaîne sans zéros de tête."""
+    if isinstance(arr, str):
+        arr = arr.lstrip('0')
+        return arr if arr else '1'
+    return str(arr)
+
+
+def _source_fingerprint(source):
+    return f"{STORE_VERSION}:{file_fingerprint(source)}"
+
+
+def _derive(df):
+    """Calcule les colonnes dérivées de façon vectorisée (aucun formatage ligne à ligne)."""
+    gravite = pd.Series('Blessé léger', index=df.index)
+    gravite[df['Blessés hospitalisés'] > 0] = 'Blessé hospitalisé'
+    gravite[df['Tué'] > 0] = 'Tué'
+
+    df = df.rename(columns=COLUMN_MAPPING).drop(columns=['Blessés hospitalisés', 'Tué'])
+
+    dates = pd.to_datetime(df['date_heure'])
+    mois = dates.dt.month.astype('int8')
+    annee = dates.dt.year.astype('int16')
+    periode = annee.astype('int32') * 100 + mois
+
+    # Libellés 'YYYY-MM' : une chaîne par mois distinct, pas par ligne
+    periodes = sorted(periode.unique())
+    labels = [f"{p // 100}-{p % 100:02d}" for p in periodes]
+    codes = pd.Index(periodes).get_indexer(periode)
+
+    arr_values = df['arrondissement'].unique()
+    arr_labels = {a: clean_arrondissement(a) for a in arr_values}
+    arr_categories = sorted(set(arr_labels.values()), key=int)
+
+    out = pd.DataFrame({
+        'date_heure': dates,
+        'geolocalise': df['latitude'].notna() & df['longitude'].notna(),
+        'latitude': df['latitude'].astype('float64'),
+        'longitude': df['longitude'].astype('float64'),
+        'type_usager': df['type_usager'].astype(str).astype('category'),
+        'arrondissement': pd.Categorical(df['arrondissement'].map(arr_labels), categories=arr_categories),
+        'id_accident': df['id_accident'],
+        'gravite': df['gravite'].astype('category'),
+        'gravite_combinee': pd.Categorical(gravite, categories=GRAVITY_LEVELS),
+        'heure': dates.dt.hour.astype('int8'),
+        'mois': mois,
+        'annee': annee,
+        'periode': periode,
+        'mois_annee': pd.Categorical.from_codes(codes, categories=labels, ordered=True),
+        'jour_semaine': pd.Categorical.from_codes(dates.dt.dayofweek, categories=JOURS_SEMAINE, ordered=True),
+        'mois_nom': pd.Categorical.from_codes(mois - 1, categories=MOIS_NOMS, ordered=True),
+    })
+    return out.sort_values('date_heure', kind='stable').reset_index(drop=True)
+
+
+def build_accident_store(source=SOURCE_FILE, target=None):
+    """Construit le jeu dérivé (trié par date, catégoriel, statistiques par row group)."""
+    target = target or cache_path(STORE_NAME)
+    df = _derive(pd.read_parquet(source, columns=SOURCE_COLUMNS))
+
+    return write_fingerprinted_parquet(
+        target, df, _source_fingerprint(source),
+        row_group_size=ROW_GROUP_SIZE,
+        write_statistics=True,
+    )
+
+
+def ensure_accident_store(source=SOURCE_FILE):
+    """Chemin du jeu dérivé, reconstruit seulement si absent ou obsolète."""
+    target = cache_path(STORE_NAME)
+    if is_fresh(target, _source_fingerprint(source)):
+        return target
+    return build_accident_store(source, target)
+
+
+def list_periods():
+    """Mois disponibles ('YYYY-MM', triés) sans charger les lignes."""
+    col = pd.read_parquet(ensure_accident_store(), columns=['mois_annee'])['mois_annee']
+    return list(col.cat.categories)
+
+
+def period_key(mois_annee):
+    """'YYYY-MM' -> entier YYYYMM (colonne ``periode`` filtrable par row group)."""
+    annee, mois = mois_annee.split('-')
+    return int(annee) * 100 + int(mois)
+
+
+def load_accidents(columns=None, periode=None, filters=None, geolocalise=True):
+    """Lit le jeu dérivé avec projection et filtres poussés au lecteur Parquet.
+
+    ``periode`` est un couple ('YYYY-MM', 'YYYY-MM') inclusif ; ``filters`` suit la
+    syntaxe pyarrow (liste de tuples) et s'ajoute au filtre de période. Par défaut
+    seules les lignes ayant des coordonnées sont lues (comme pour les cartes) ;
+    ``geolocalise=False`` lit toutes les lignes (séries temporelles).
+    """
+    predicates = list(filters or [])
+    if geolocalise:
+        predicates.append(('geolocalise', '==', True))
+    if periode is not None:
+        predicates += [('periode', '>=', period_key(periode[0])),
+                       ('periode', '<=', period_key(periode[1]))]
+    return pd.read_parquet(
+        ensure_accident_store(),
+        columns=columns or APP_COLUMNS,
+        filters=predicates or None,
+    )
+
+
+def load_shared_accidents(columns=None):
+    """Jeu géolocalisé complet adossé aux tampons Arrow, à partager entre sessions.
+
+    Conversion sans copie (colonnes en lecture seule) : toute écriture accidentelle
+    échoue au lieu de dupliquer les données.
+    """
+    table = pq.read_table(
+        ensure_accident_store(),
+        columns=columns or APP_COLUMNS,
+        filters=[('geolocalise', '==', True)],
+        memory_map=True,
+    )
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def period_view(df, periode):
+    """Lignes d'une période ('YYYY-MM', 'YYYY-MM') : tranche contiguë du jeu trié par date (vue)."""
+    keys = df['periode'].to_numpy()
+    start = np.searchsorted(keys, period_key(periode[0]), side='left')
+    stop = np.searchsorted(keys, period_key(periode[1]), side='right')
+    return df.iloc[start:stop]
+
+
+def _category_mask(series, values):
+    # Table de vérité indexée par code de catégorie (dernière case : code -1, valeur manquante)
+    positions = series.cat.categories.get_indexer(list(values))
+    wanted = np.zeros(len(series.cat.categories) + 1, dtype=bool)
+    wanted[positions[positions >= 0]] = True
+    return wanted[series.cat.codes.to_numpy()]
+
+
+def select_rows(df, usagers=None, gravites=None, arrondissements=None, annee=None, mois_nom=None):
+    """Positions des lignes répondant aux filtres (``None`` = pas de filtre), calculées sur les codes."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in [('type_usager', usagers), ('gravite_combinee', gravites),
+                        ('arrondissement', arrondissements),
+                        ('mois_nom', None if mois_nom is None else [mois_nom])]:
+        if values is not None:
+            mask &= _category_mask(df[col], values)
+    if annee is not None:
+        mask &= df['annee'].to_numpy() == annee
+    return np.flatnonzero(mask)
+
+
+def take_columns(df, rows, columns):
+    """Colonnes demandées des lignes sélectionnées : seul ce sous-ensemble est matérialisé."""
+    projected = df[list(columns)]
+    if len(rows) == len(df):
+        return projected
+    return projected.iloc[rows]
+
+
+if __name__ == "__main__":
+    path = build_accident_store()
+    meta = pq.ParquetFile(path).metadata
+    print(f"{path} : {meta.num_rows} lignes, {meta.num_row_groups} row groups")
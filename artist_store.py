@@ -0,0 +1,173 @@
+"""Embeddings moyens des artistes, stockés en matrice float32 contiguë.
+
+``artistes.parquet`` contient un embedding par artiste (``avg_embedding``), sous
+forme de chaîne ``"[0.1, 0.2, ...]"`` ou de liste. Il est converti une fois en
+``.cache/artistes_embeddings.npy`` (n_artistes x dimension, float32), relu par
+projection mémoire : aucune analyse ligne à ligne à l'affichage de la page. Les
+noms d'artistes et l'empreinte de la source sont consignés à côté (``.json``).
+
+La projection t-SNE 2D, commune aux onglets « embeddings » et « clustering », est
+calculée une fois par version des embeddings et enregistrée de la même façon ;
+les embeddings sont d'abord ramenés à ``PCA_COMPONENTS`` dimensions par une ACP
+(désactivable), ce qui rend le t-SNE bien moins coûteux. Le backend t-SNE
+(scikit-learn ou openTSNE) est choisi dans ``projection`` ; l'ACP et le projecteur
+ajustés sont conservés pour placer de nouveaux points sur la même carte.
+
+Construction manuelle : ``python artist_store.py``
+"""
+import json
+import pickle
+import warnings
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from storage import atomic_write, cache_path, file_fingerprint
+
+SOURCE_FILE = "artistes.parquet"
+EMBEDDINGS_NAME = "artistes_embeddings.npy"
+STORE_VERSION = "1"
+
+# Dimensions conservées par l'ACP avant t-SNE (None : t-SNE sur les embeddings complets)
+PCA_COMPONENTS = 50
+
+
+def source_fingerprint():
+    """Empreinte de ``artistes.parquet`` et de la version du format."""
+    return f"{STORE_VERSION}:{file_fingerprint(SOURCE_FILE)}"
+
+
+def _embedding_matrix(column, source=SOURCE_FILE):
+    """Matrice float32 depuis une colonne liste (sans boucle Python) ou chaîne (décodée une fois).
+
+    ``ValueError`` (qui nomme ``source``) si une cellule est vide ou mal formée,
+    ou si les embeddings n'ont pas tous la même dimension.
+    """
+    column = column.combine_chunks()
+    if column.null_count:
+        raise ValueError(f"{source} : {column.null_count} embedding(s) manquant(s) dans la colonne {column.type}")
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        # "[0.1, 0.2]" -> un seul texte "0.1, 0.2,..." lu par numpy (bien plus rapide que literal_eval)
+        column = pc.utf8_trim(column, '[] ')
+        lengths = pc.add(pc.count_substring(column, ','), 1).to_numpy()
+        with warnings.catch_warnings():
+            # selon la version de numpy, un nombre illisible tronque la lecture (avec un avertissement) ou lève
+            warnings.simplefilter('error', DeprecationWarning)
+            try:
+                values = np.fromstring(','.join(column.to_pylist()), sep=',', dtype='float32')
+            except (ValueError, DeprecationWarning) as exc:
+                raise ValueError(f"{source} : embedding mal formé (nombre illisible) : {exc}") from exc
+    else:
+        lengths = pc.list_value_length(column).to_numpy()
+        values = pc.list_flatten(column).to_numpy(zero_copy_only=False).astype('float32', copy=False)
+    # Compte de valeurs contrôlé en plus (cellule vide "[]", virgule en trop...)
+    if values.size != lengths.sum():
+        raise ValueError(f"{source} : embedding mal formé, "
+                         f"{values.size} valeurs lues pour {lengths.sum()} attendues")
+    irregular = np.flatnonzero(lengths != lengths[:1])
+    if irregular.size:
+        row = irregular[0]
+        raise ValueError(f"{source} : embeddings de dimensions différentes "
+                         f"({lengths[0]} à la ligne 0, {lengths[row]} à la ligne {row})")
+    return values.reshape(len(column), -1)
+
+
+def _save_array(path, array):
+    def write(tmp):
+        with open(tmp, 'wb') as f:
+            np.save(f, array)
+    atomic_write(path, write)
+
+
+def build_embeddings():
+    """Convertit ``artistes.parquet`` en matrice ``.npy`` + noms ; renvoie le chemin de la matrice."""
+    fingerprint = source_fingerprint()
+    table = pq.read_table(SOURCE_FILE, columns=['artist_name', 'avg_embedding'])
+    matrix = np.ascontiguousarray(_embedding_matrix(table.column('avg_embedding'), SOURCE_FILE))
+
+    path = cache_path(EMBEDDINGS_NAME)
+    _save_array(path, matrix)
+    info = {'source_fingerprint': fingerprint, 'artists': table.column('artist_name').to_pylist()}
+    atomic_write(path.with_suffix('.json'), lambda tmp: tmp.write_text(json.dumps(info, ensure_ascii=False)))
+    return path
+
+
+def ensure_embeddings():
+    """Chemin de la matrice, reconstruite seulement si ``artistes.parquet`` a changé."""
+    path = cache_path(EMBEDDINGS_NAME)
+    info_path = path.with_suffix('.json')
+    if path.exists() and info_path.exists():
+        if json.loads(info_path.read_text()).get('source_fingerprint') == source_fingerprint():
+            return path
+    return build_embeddings()
+
+
+def load_embeddings():
+    """Noms des artistes et matrice des embeddings (float32, projetée en mémoire, lecture seule)."""
+    path = ensure_embeddings()
+    artists = json.loads(path.with_suffix('.json').read_text())['artists']
+    return artists, np.load(path, mmap_mode='r')
+
+
+def _projection_path(pca_components, backend):
+    suffix = f"pca{pca_components}" if pca_components else "complet"
+    return cache_path(f"artistes_tsne_{backend}_{suffix}.npy")
+
+
+def reduce_embeddings(embeddings, pca_components=PCA_COMPONENTS):
+    """Embeddings ramenés à ``pca_components`` dimensions, et l'ACP ajustée.
+
+    Sans réduction (désactivée, ou embeddings déjà plus petits), l'ACP vaut ``None``.
+    """
+    if not pca_components or min(embeddings.shape) <= pca_components:
+        return np.asarray(embeddings), None
+    from sklearn.decomposition import PCA
+
+    pca = PCA(n_components=pca_components, random_state=0)
+    return pca.fit_transform(embeddings), pca
+
+
+def tsne_projection(pca_components=PCA_COMPONENTS, backend=None):
+    """Coordonnées t-SNE 2D des artistes (ordre de ``load_embeddings``), calculées une fois.
+
+    ``backend`` : voir ``projection`` (``CV_TSNE_BACKEND`` par défaut). L'ACP et le
+    projecteur ajustés sont conservés à côté, pour ``place_embeddings``.
+    """
+    from projection import make_projector, resolve_backend
+
+    _, embeddings = load_embeddings()
+    backend = resolve_backend(backend, len(embeddings))
+    path = _projection_path(pca_components, backend)
+    info_path = path.with_suffix('.json')
+    fingerprint = source_fingerprint()
+    if path.exists() and info_path.exists() and path.with_suffix('.pkl').exists():
+        if json.loads(info_path.read_text()).get('source_fingerprint') == fingerprint:
+            return np.load(path)
+
+    reduced, pca = reduce_embeddings(embeddings, pca_components)
+    projector = make_projector(backend).fit(reduced)
+    _save_array(path, projector.embedding_.astype('float32'))
+    atomic_write(path.with_suffix('.pkl'),
+                 lambda tmp: tmp.write_bytes(pickle.dumps({'pca': pca, 'projector': projector})))
+    info = {'source_fingerprint': fingerprint, 'pca_components': pca_components, 'backend': backend}
+    atomic_write(info_path, lambda tmp: tmp.write_text(json.dumps(info)))
+    return np.load(path)
+
+
+def place_embeddings(embeddings, pca_components=PCA_COMPONENTS, backend=None):
+    """Coordonnées de nouveaux embeddings dans la carte existante (carte inchangée)."""
+    from projection import resolve_backend
+
+    backend = resolve_backend(backend, len(load_embeddings()[0]))
+    tsne_projection(pca_components, backend)
+    state = pickle.loads(_projection_path(pca_components, backend).with_suffix('.pkl').read_bytes())
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype='float32'))
+    reduced = embeddings if state['pca'] is None else state['pca'].transform(embeddings)
+    return state['projector'].transform(reduced)
+
+
+if __name__ == "__main__":
+    artists, embeddings = load_embeddings()
+    print(f"{cache_path(EMBEDDINGS_NAME)} : {embeddings.shape[0]} artistes x {embeddings.shape[1]}")
@@ -0,0 +1,182 @@
+"""Évaluation à origine glissante (backtesting) des modèles de prévision des accidents.
+
+Pour chaque origine ``t`` (tous les ``step`` mois à partir de ``initial``), le
+modèle est entraîné sur les données avant ``t`` (fenêtre croissante, ou des
+``initial`` derniers mois en fenêtre glissante) puis prévoit les ``horizon``
+mois suivants. Les paramètres sont estimés une seule fois sur la première
+fenêtre ; chaque pli repart de ces paramètres (démarrage à chaud) au lieu d'un
+ajustement complet, ou les réutilise tels quels avec ``refit=False``. Les plis
+sont indépendants et peuvent être évalués en parallèle ; les prévisions de
+chaque pli sont mémorisées sur disque.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from forecasting import fit_prophet, fit_sarimax, model_key, sarimax_model
+from storage import atomic_write, cache_path
+
+HORIZON = 12
+INITIAL = 48
+STEP = 6
+WINDOWS = ('expanding', 'rolling')
+
+
+def fold_origins(n, horizon=HORIZON, initial=INITIAL, step=STEP):
+    """Indices de fin d'entraînement des plis (chaque pli doit disposer de ``horizon`` valeurs)."""
+    return list(range(initial, n - horizon + 1, step))
+
+
+def _train_slice(t, window, initial):
+    return slice(0, t) if window == 'expanding' else slice(t - initial, t)
+
+
+def _rows(data, rows):
+    return None if data is None else data.iloc[rows]
+
+
+def _prophet_frame(endog, exog):
+    frame = pd.DataFrame({'ds': endog.index, 'y': np.asarray(endog, dtype='float64')})
+    if exog is not None:
+        for col in exog.columns:
+            frame[col] = np.asarray(exog[col], dtype='float64')
+    return frame
+
+
+def _prophet_init(model):
+    """Paramètres d'un Prophet ajusté, au format attendu par ``fit(init=...)``."""
+    params = {name: model.params[name][0][0] for name in ['k', 'm', 'sigma_obs']}
+    params.update({name: model.params[name][0] for name in ['delta', 'beta']})
+    return params
+
+
+def _sarimax_fold(endog, exog, t, window, initial, horizon, spec, params, refit):
+    # Exécuté dans un worker : prévision hors échantillon d'un pli
+    rows = _train_slice(t, window, initial)
+    model = sarimax_model(_rows(endog, rows), _rows(exog, rows), spec['order'], spec['seasonal_order'])
+    results = model.fit(start_params=params, disp=False) if refit else model.smooth(params)
+    future = None if exog is None else np.asarray(exog.iloc[t:t + horizon], dtype='float64')
+    return np.asarray(results.forecast(horizon, exog=future), dtype='float64').tolist()
+
+
+def _prophet_fold(endog, exog, t, window, initial, horizon, spec, params, refit):
+    from prophet import Prophet
+
+    rows = _train_slice(t, window, initial)
+    model = Prophet(**spec['options'])
+    regressors = [] if exog is None else list(exog.columns)
+    for var in regressors:
+        model.add_regressor(var)
+    # Prophet n'a pas de mise à jour sans réajustement : toujours un démarrage à chaud
+    model.fit(_prophet_frame(_rows(endog, rows), _rows(exog, rows)), init=params)
+    future = _prophet_frame(endog.iloc[t:t + horizon], _rows(exog, slice(t, t + horizon)))
+    return model.predict(future.drop(columns='y'))['yhat'].astype('float64').tolist()
+
+
+def _regression_fold(endog, exog, t, window, initial, horizon, spec, params, refit):
+    # Régression linéaire : tendance + indicatrices de mois (+ exogènes), moindres carrés
+    def design(index, rows):
+        index = pd.DatetimeIndex(index)
+        months = np.eye(12)[index.month - 1][:, 1:]
+        columns = [np.ones(len(index)), np.arange(rows.start, rows.stop, dtype='float64'), months]
+        if exog is not None:
+            columns.append(np.asarray(exog.iloc[rows], dtype='float64'))
+        return np.column_stack(columns)
+
+    rows = _train_slice(t, window, initial)
+    test = slice(t, t + horizon)
+    coef, *_ = np.linalg.lstsq(design(endog.index[rows], rows), np.asarray(endog.iloc[rows], dtype='float64'),
+                               rcond=None)
+    return (design(endog.index[test], test) @ coef).tolist()
+
+
+_FOLDS = {'sarimax': _sarimax_fold, 'prophet': _prophet_fold, 'regression': _regression_fold}
+
+
+def _initial_params(kind, endog, exog, window, initial, origins, spec):
+    """Paramètres estimés sur la première fenêtre (point de départ de tous les plis)."""
+    rows = _train_slice(origins[0], window, initial)
+    if kind == 'sarimax':
+        return np.asarray(fit_sarimax(_rows(endog, rows), _rows(exog, rows),
+                                      spec['order'], spec['seasonal_order']).params)
+    if kind == 'prophet':
+        data = _prophet_frame(_rows(endog, rows), _rows(exog, rows))
+        regressors = [] if exog is None else list(exog.columns)
+        return _prophet_init(fit_prophet(data, regressors, **spec['options']))
+    return None
+
+
+def backtest(kind, endog, exog=None, window='expanding', horizon=HORIZON, initial=INITIAL,
+             step=STEP, refit=True, pool=None, **spec):
+    """Prévisions hors échantillon de chaque pli pour un modèle ('sarimax', 'prophet' ou 'regression').
+
+    ``spec`` : ``order`` / ``seasonal_order`` (SARIMAX) ou ``options`` (Prophet).
+    Renvoie un dict avec les dates d'origine, les prévisions et les valeurs
+    réalisées (listes de longueur ``horizon`` par pli).
+    """
+    if window not in WINDOWS:
+        raise ValueError(f"Fenêtre inconnue : {window}")
+    key = model_key(f'backtest_{kind}', endog, exog, window=window, horizon=horizon,
+                    initial=initial, step=step, refit=refit, **spec)
+    path = cache_path(f"backtest_{key}.json")
+    if path.exists():
+        return json.loads(path.read_text())
+
+    origins = fold_origins(len(endog), horizon, initial, step)
+    if not origins:
+        raise ValueError("Série trop courte pour le backtesting demandé")
+    params = _initial_params(kind, endog, exog, window, initial, origins, spec)
+
+    run = pool.map if pool is not None else map
+    n = len(origins)
+    predicted = list(run(
+        _FOLDS[kind], [endog] * n, [exog] * n, origins, [window] * n, [initial] * n,
+        [horizon] * n, [spec] * n, [params] * n, [refit] * n,
+    ))
+    result = {
+        'origins': [str(endog.index[t]) for t in origins],
+        'predicted': predicted,
+        'actual': [np.asarray(endog.iloc[t:t + horizon], dtype='float64').tolist() for t in origins],
+    }
+    atomic_write(path, lambda tmp: tmp.write_text(json.dumps(result)))
+    return result
+
+
+def _mape(errors, actual, axis=None):
+    """MAPE (%) sur les seules valeurs observées non nulles (NaN s'il n'y en a aucune).
+
+    Un mois sans accident rendrait l'erreur relative infinie : il est exclu du
+    MAPE, mais reste compté dans MAE et RMSE.
+    """
+    observed = actual != 0
+    ratios = np.abs(errors) / np.where(observed, np.abs(actual), 1.0)
+    count = observed.sum(axis=axis)
+    total = np.where(observed, ratios, 0.0).sum(axis=axis)
+    return np.where(count > 0, total / np.maximum(count, 1), np.nan) * 100
+
+
+def horizon_metrics(result):
+    """MAE, RMSE et MAPE (%, hors mois sans accident) par horizon de prévision (1 = mois suivant l'origine)."""
+    errors = np.asarray(result['predicted']) - np.asarray(result['actual'])
+    actual = np.asarray(result['actual'])
+    return pd.DataFrame({
+        'horizon': np.arange(1, errors.shape[1] + 1),
+        'MAE': np.abs(errors).mean(axis=0),
+        'RMSE': np.sqrt((errors ** 2).mean(axis=0)),
+        'MAPE': _mape(errors, actual, axis=0),
+    })
+
+
+def summary_metrics(result):
+    """Métriques toutes origines et tous horizons confondus (R² hors échantillon inclus)."""
+    predicted = np.asarray(result['predicted']).ravel()
+    actual = np.asarray(result['actual']).ravel()
+    errors = predicted - actual
+    return {
+        'R² Score': float(1 - (errors ** 2).sum() / ((actual - actual.mean()) ** 2).sum()),
+        'MAE': float(np.abs(errors).mean()),
+        'RMSE': float(np.sqrt((errors ** 2).mean())),
+        'MAPE (%)': float(_mape(errors, actual)),
+        'Plis': len(result['origins']),
+    }
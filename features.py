@@ -0,0 +1,213 @@
+"""Matrices de variables explicatives partagées par les modèles de prévision.
+
+Les comptes d'accidents, la météo (``data_meteo.csv``) et le trafic
+(``trafic_routier_paris.csv``) sont alignés et complétés une seule fois, au pas
+mensuel et au pas quotidien ; les profils climatologiques servant d'exogènes
+futures sont calculés en même temps. Le tout est enregistré sous ``.cache/`` et
+reconstruit seulement si l'un des fichiers sources change (taille, mtime). Chaque
+variante de modèle (météo seule, trafic seul, sans 2020...) n'est qu'une tranche
+de colonnes ou de lignes de ces matrices.
+
+La saisonnalité annuelle d'une série quotidienne est décrite par quelques termes
+de Fourier plutôt que par une période saisonnière s=365, beaucoup trop coûteuse à
+estimer pour SARIMAX.
+
+Construction manuelle : ``python features.py``
+"""
+import numpy as np
+import pandas as pd
+
+from accident_store import ensure_accident_store, load_accidents
+from storage import cache_path, file_fingerprint, read_if_fresh, write_fingerprinted_parquet
+
+WEATHER_FILE = "data_meteo.csv"
+TRAFFIC_FILE = "trafic_routier_paris.csv"
+
+WEATHER_VARS = ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun']
+TRAFFIC_VARS = ['q', 'k', 'nb_mesures']
+EXOG_VARS = WEATHER_VARS + TRAFFIC_VARS
+# Quantités cumulées : une valeur manquante signifie 0 (pas de pluie, pas de neige...)
+QUANTITY_VARS = ['prcp', 'snow', 'tsun']
+
+# Exogènes du modèle quotidien (les autres relevés sont redondants ou presque vides)
+DAILY_EXOG = ['tavg', 'prcp', 'snow', 'wspd', 'q', 'k']
+YEAR_DAYS = 365.25
+FOURIER_ORDER = 3
+
+# Agrégation mensuelle des relevés quotidiens
+MONTHLY_AGG = {
+    'tavg': 'mean',       # Température moyenne
+    'tmin': 'mean',       # Température minimale
+    'tmax': 'mean',       # Température maximale
+    'prcp': 'sum',        # Précipitations
+    'snow': 'sum',        # Neige
+    'wdir': 'mean',       # Direction du vent
+    'wspd': 'mean',       # Vitesse du vent
+    'wpgt': 'mean',       # Rafales de vent
+    'pres': 'mean',       # Pression atmosphérique
+    'tsun': 'sum',        # Ensoleillement
+    'q': 'mean',          # Débit moyen
+    'k': 'mean',          # Densité moyenne
+    'nb_mesures': 'sum',  # Nombre total de mesures
+}
+
+FEATURES_VERSION = "1"
+
+
+def load_weather():
+    """Relevés météo quotidiens (colonnes numériques, index de dates)."""
+    weather = pd.read_csv(WEATHER_FILE).dropna(subset=['date'])
+    weather['date'] = pd.to_datetime(weather['date'])
+    weather = weather.set_index('date')
+    return weather[WEATHER_VARS].apply(pd.to_numeric, errors='coerce')
+
+
+def load_traffic():
+    """Débit (q), densité (k) et nombre de mesures quotidiens du trafic routier."""
+    traffic = pd.read_csv(TRAFFIC_FILE, sep=';')
+    traffic['date'] = pd.to_datetime(traffic['date'])
+    traffic = traffic.set_index('date')
+    return traffic[TRAFFIC_VARS].apply(pd.to_numeric, errors='coerce')
+
+
+def fill_missing(data):
+    """Remplace inf/NaN : 0 pour les quantités, moyenne de la colonne sinon (0 si vide)."""
+    data = data.replace([np.inf, -np.inf], np.nan)
+    for col in data.columns:
+        if col in QUANTITY_VARS or data[col].isna().all():
+            data[col] = data[col].fillna(0)
+        else:
+            data[col] = data[col].fillna(data[col].mean())
+    return data
+
+
+def daily_accidents():
+    """Nombre d'accidents par jour, jours sans accident inclus."""
+    dates = load_accidents(columns=['date_heure'], geolocalise=False)['date_heure']
+    counts = dates.dt.normalize().value_counts().sort_index()
+    days = pd.date_range(counts.index.min(), counts.index.max(), freq='D')
+    return counts.reindex(days, fill_value=0).astype('int64').rename('accidents').rename_axis('date')
+
+
+def monthly_accidents():
+    """Nombre d'accidents par mois (index : premier jour du mois)."""
+    dates = load_accidents(columns=['date_heure'], geolocalise=False)['date_heure']
+    counts = dates.dt.to_period('M').dt.to_timestamp().value_counts().sort_index()
+    return counts.astype('int64').rename('accidents').rename_axis('date')
+
+
+def monthly_features():
+    """Matrice mensuelle accidents + météo + trafic (mois présents dans les trois sources)."""
+    exog = load_weather().join(load_traffic(), how='outer').resample('MS').agg(MONTHLY_AGG)
+    monthly = monthly_accidents().to_frame().join(exog, how='inner')
+    return pd.concat([monthly['accidents'], fill_missing(monthly[EXOG_VARS])], axis=1)
+
+
+def daily_features():
+    """Matrice quotidienne accidents + météo + trafic, alignée sur les jours d'accidents."""
+    accidents = daily_accidents()
+    exog = load_weather().join(load_traffic(), how='outer').reindex(accidents.index)
+    return pd.concat([accidents, fill_missing(exog)], axis=1)
+
+
+def monthly_climatology(features, exclude_years=()):
+    """Moyenne historique de chaque exogène par mois de l'année (index 1 à 12)."""
+    history = features.loc[~features.index.year.isin(list(exclude_years)), EXOG_VARS]
+    return history.groupby(history.index.month).mean().rename_axis('mois')
+
+
+def daily_climatology(features):
+    """Moyenne historique de chaque exogène par (mois, jour de semaine)."""
+    history = features[EXOG_VARS]
+    return history.groupby([history.index.month, history.index.dayofweek]).mean().rename_axis(['mois', 'jour'])
+
+
+def expected_exog(profile, index, columns=None):
+    """Exogènes attendues sur des dates futures, lues dans un profil climatologique."""
+    index = pd.DatetimeIndex(index)
+    if profile.index.nlevels == 2:
+        keys = pd.MultiIndex.from_arrays([index.month, index.dayofweek])
+    else:
+        keys = index.month
+    columns = list(columns) if columns is not None else list(profile.columns)
+    return pd.DataFrame(profile.reindex(keys)[columns].to_numpy(), index=index, columns=columns)
+
+
+def holdout_exog(features, horizon, columns=None):
+    """Exogènes attendues sur les ``horizon`` derniers jours, d'après le profil des seuls jours précédents.
+
+    Validation sans fuite : les jours validés n'entrent pas dans la climatologie.
+    """
+    train, holdout = features.iloc[:-horizon], features.iloc[-horizon:]
+    return expected_exog(daily_climatology(train), holdout.index, columns)
+
+
+# Matrices et profils enregistrés (nom -> construction)
+_FRAMES = {
+    'monthly': monthly_features,
+    'daily': daily_features,
+}
+_PROFILES = {
+    'climatology_monthly': ('monthly', monthly_climatology),
+    'climatology_monthly_sans_2020': ('monthly', lambda f: monthly_climatology(f, exclude_years=(2020,))),
+    'climatology_daily': ('daily', daily_climatology),
+}
+
+
+def source_fingerprint():
+    """Empreinte des sources (jeu d'accidents dérivé, météo, trafic) et de la version du code."""
+    return f"{FEATURES_VERSION}:{file_fingerprint(ensure_accident_store(), WEATHER_FILE, TRAFFIC_FILE)}"
+
+
+def _frame_path(name):
+    return cache_path(f"features_{name}.parquet")
+
+
+def _read_if_fresh(name, fingerprint):
+    return read_if_fresh(_frame_path(name), fingerprint)
+
+
+def _write(name, frame, fingerprint):
+    # Index conservé : les profils et séries sont indexés (date, mois, heure...)
+    write_fingerprinted_parquet(_frame_path(name), frame, fingerprint, preserve_index=None)
+
+
+def build_features():
+    """Construit et enregistre toutes les matrices et tous les profils."""
+    fingerprint = source_fingerprint()
+    store = {name: build() for name, build in _FRAMES.items()}
+    for name, (frame, build) in _PROFILES.items():
+        store[name] = build(store[frame])
+    for name, frame in store.items():
+        _write(name, frame, fingerprint)
+    return store
+
+
+def load_features():
+    """Matrices ('monthly', 'daily') et profils climatologiques, relus depuis le disque si à jour."""
+    fingerprint = source_fingerprint()
+    store = {name: _read_if_fresh(name, fingerprint) for name in list(_FRAMES) + list(_PROFILES)}
+    if any(frame is None for frame in store.values()):
+        return build_features()
+    return store
+
+
+def fourier_terms(index, period=YEAR_DAYS, order=FOURIER_ORDER):
+    """Termes sin/cos de la saisonnalité annuelle (calculés sur la date : valables hors échantillon)."""
+    t = (pd.DatetimeIndex(index) - pd.Timestamp('1970-01-01')).days.to_numpy(dtype='float64')
+    angles = 2 * np.pi * np.outer(t, np.arange(1, order + 1)) / period
+    return pd.DataFrame(
+        np.hstack([np.sin(angles), np.cos(angles)]),
+        index=index,
+        columns=[f'sin_{k}' for k in range(1, order + 1)] + [f'cos_{k}' for k in range(1, order + 1)],
+    )
+
+
+def daily_design(exog, fourier_order=FOURIER_ORDER):
+    """Matrice exogène du modèle quotidien : termes de Fourier + variables observées."""
+    return pd.concat([fourier_terms(exog.index, order=fourier_order), exog], axis=1)
+
+
+if __name__ == "__main__":
+    for name, frame in build_features().items():
+        print(f"{_frame_path(name)} : {frame.shape[0]} lignes x {frame.shape[1]} colonnes")
@@ -0,0 +1,394 @@
+"""Ajustement des modèles de prévision des accidents avec cache disque.
+
+Les paramètres estimés sont enregistrés sous ``.cache/`` avec une clé calculée
+à partir de (empreinte de la série, empreinte des exogènes, ordres, fenêtre
+d'entraînement). Un SARIMAX déjà ajusté est reconstruit par ``smooth(params)`` :
+un seul passage du filtre de Kalman, sans optimisation. Les modèles Prophet sont
+conservés sérialisés en JSON.
+
+Les ajustements indépendants peuvent être lancés en parallèle sur un pool de
+processus (``CV_FIT_WORKERS`` processus, 0 ou 1 pour tout ajuster sur place) :
+les workers remplissent le cache disque, l'application relit ensuite chaque
+modèle dès que son ajustement est terminé.
+
+Un budget de temps peut borner l'optimisation (mode quotidien, ~2 500 points) :
+les paramètres atteints à l'échéance sont conservés comme ceux d'un ajustement
+complet.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from storage import atomic_write, cache_path
+
+MODEL_VERSION = "1"
+
+logger = logging.getLogger(__name__)
+
+# Modèle quotidien : saisonnalité hebdomadaire dans SARIMA (s=7), annuelle en termes
+# de Fourier exogènes ; budget d'ajustement en secondes (mesuré : 4 à 6 s sur un cœur)
+DAILY_ORDER = (1, 0, 1)
+DAILY_SEASONAL_ORDER = (1, 0, 1, 7)
+DAILY_FIT_BUDGET = 8.0
+
+
+def data_fingerprint(data) -> str:
+    """Empreinte du contenu d'une série / d'un DataFrame (valeurs, colonnes, index)."""
+    h = hashlib.sha1()
+    if data is None:
+        h.update(b"none")
+        return h.hexdigest()[:16]
+    if isinstance(data, pd.DataFrame):
+        h.update(json.dumps([str(c) for c in data.columns]).encode())
+    values = np.ascontiguousarray(np.asarray(data, dtype='float64'))
+    h.update(str(values.shape).encode())
+    h.update(values.tobytes())
+    if isinstance(data, (pd.Series, pd.DataFrame)):
+        h.update(str(list(data.index)).encode())
+    return h.hexdigest()[:16]
+
+
+def training_window(endog):
+    """Première et dernière date d'entraînement ('' si la série n'est pas indexée par date)."""
+    if isinstance(endog, pd.Series) and len(endog):
+        return str(endog.index[0]), str(endog.index[-1])
+    return '', ''
+
+
+def model_key(kind, endog, exog=None, **spec) -> str:
+    """Clé d'un modèle : type, données, fenêtre d'entraînement et spécification."""
+    payload = {
+        'version': MODEL_VERSION,
+        'kind': kind,
+        'endog': data_fingerprint(endog),
+        'exog': data_fingerprint(exog),
+        'window': training_window(endog),
+        'spec': {k: spec[k] for k in sorted(spec)},
+    }
+    return hashlib.sha1(json.dumps(payload, default=str).encode()).hexdigest()[:20]
+
+
+def _model_index(data):
+    """Index utilisable par statsmodels : dates à fréquence régulière, sinon positions.
+
+    Une série à trous (sans 2020) n'a pas de fréquence : sans index positionnel,
+    statsmodels ne sait pas indexer les prévisions.
+    """
+    if data is None:
+        return None
+    data = data.copy() if isinstance(data, (pd.Series, pd.DataFrame)) else pd.Series(np.asarray(data))
+    if isinstance(data.index, pd.DatetimeIndex):
+        freq = data.index.freq or (pd.infer_freq(data.index) if len(data) > 2 else None)
+        if freq is not None:
+            data.index = pd.DatetimeIndex(data.index, freq=freq)
+            return data.astype('float64')
+    return data.reset_index(drop=True).astype('float64')
+
+
+def sarimax_model(endog, exog, order, seasonal_order):
+    """Modèle SARIMAX (non ajusté) sur l'index renvoyé par ``_model_index``."""
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    return SARIMAX(
+        _model_index(endog),
+        exog=_model_index(exog),
+        order=tuple(order),
+        seasonal_order=tuple(seasonal_order),
+    )
+
+
+def sarimax_path(endog, exog=None, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12), time_budget=None):
+    """Fichier des paramètres d'un SARIMAX."""
+    # Le budget ne fait partie de la clé que s'il est fixé (clés des modèles existants inchangées)
+    budget = {} if time_budget is None else {'time_budget': float(time_budget)}
+    key = model_key('sarimax', endog, exog, order=list(order), seasonal_order=list(seasonal_order), **budget)
+    return cache_path(f"sarimax_{key}.npy")
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def _fit_within_budget(model, time_budget):
+    """Ajustement interrompu après ``time_budget`` secondes (paramètres de la dernière itération).
+
+    Renvoie (résultats, convergé, interrompu, durée en secondes).
+    """
+    start = time.perf_counter()
+    last = {}
+
+    def callback(xk):
+        # xk : paramètres non contraints de l'itération en cours de l'optimiseur
+        last['params'] = xk
+        if time_budget is not None and time.perf_counter() - start > time_budget:
+            raise _BudgetExceeded
+
+    try:
+        results = model.fit(disp=False, callback=callback)
+        converged, interrupted = bool(results.mle_retvals.get('converged', True)), False
+    except _BudgetExceeded:
+        results = model.smooth(model.transform_params(last['params']))
+        converged, interrupted = False, True
+    return results, converged, interrupted, time.perf_counter() - start
+
+
+def fit_sarimax(endog, exog=None, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12), time_budget=None):
+    """SARIMAX ajusté ; paramètres relus depuis le disque s'ils ont déjà été estimés.
+
+    Avec ``time_budget`` (secondes), l'optimisation s'arrête à l'échéance sur les
+    derniers paramètres atteints ; la durée mesurée est consignée à côté des
+    paramètres (voir ``sarimax_fit_info``).
+    """
+    path = sarimax_path(endog, exog, order, seasonal_order, time_budget)
+    model = sarimax_model(endog, exog, order, seasonal_order)
+
+    if path.exists():
+        params = np.load(path)
+        if params.shape == (len(model.param_names),):
+            return model.smooth(params)
+
+    results, converged, interrupted, seconds = _fit_within_budget(model, time_budget)
+    _save_array(path, np.asarray(results.params))
+    info = {'seconds': round(seconds, 3), 'converged': converged, 'interrupted': interrupted,
+            'time_budget': time_budget, 'nobs': int(results.nobs)}
+    atomic_write(path.with_suffix('.json'), lambda tmp: tmp.write_text(json.dumps(info)))
+    return results
+
+
+def sarimax_fit_info(endog, exog=None, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12), time_budget=None):
+    """Durée et convergence du dernier ajustement d'un SARIMAX (``None`` s'il n'a pas été consigné)."""
+    path = sarimax_path(endog, exog, order, seasonal_order, time_budget).with_suffix('.json')
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def _save_array(path, array):
+    def write(tmp):
+        with open(tmp, 'wb') as f:
+            np.save(f, array)
+    atomic_write(path, write)
+
+
+# Recherche automatique des ordres SARIMA
+
+# Grille par défaut : d = D = 1 (tendance et saisonnalité annuelle des séries mensuelles)
+ORDER_GRID = {'p': (0, 1, 2), 'd': (1,), 'q': (0, 1, 2), 'P': (0, 1), 'D': (1,), 'Q': (0, 1)}
+# Grille du modèle quotidien (saisonnalité hebdomadaire, série sans différenciation) et
+# budget de la recherche en secondes : chaque ajustement y coûte plusieurs secondes
+DAILY_ORDER_GRID = {'p': (0, 1, 2), 'd': (0,), 'q': (0, 1, 2), 'P': (0, 1), 'D': (0,), 'Q': (0, 1)}
+DAILY_SEARCH_BUDGET = 30.0
+# Itérations de l'optimiseur lors du premier tri (grossier) des candidats
+PRESCREEN_MAXITER = 15
+# Part du budget de recherche consacrée au premier tri
+PRESCREEN_SHARE = 0.6
+
+
+def candidate_orders(grid=None, s=12):
+    """Couples (order, seasonal_order) de la grille, du plus simple au plus complexe."""
+    grid = {**ORDER_GRID, **(grid or {})}
+    candidates = [
+        ((p, d, q), (P, D, Q, s))
+        for p, d, q, P, D, Q in itertools.product(
+            grid['p'], grid['d'], grid['q'], grid['P'], grid['D'], grid['Q'])
+    ]
+    return sorted(candidates, key=lambda c: sum(c[0]) + sum(c[1][:3]))
+
+
+def _score_order(endog, exog, order, seasonal_order, criterion, maxiter, deadline=None):
+    # Exécuté dans un worker : critère d'information d'un candidat (inf si l'ajustement
+    # échoue ou n'a pas fini avant ``deadline``, heure absolue ``time.time()``)
+    def callback(xk):
+        if deadline is not None and time.time() > deadline:
+            raise _BudgetExceeded
+
+    try:
+        results = sarimax_model(endog, exog, order, seasonal_order).fit(
+            disp=False, maxiter=maxiter, callback=callback)
+        score = float(getattr(results, criterion))
+    except Exception:
+        score = float('inf')
+    return {'order': list(order), 'seasonal_order': list(seasonal_order),
+            criterion: score if np.isfinite(score) else None}
+
+
+def search_sarima_order(endog, exog=None, s=12, criterion='aic', grid=None, keep=5, pool=None,
+                        time_budget=None):
+    """Meilleurs ordres SARIMA d'une série selon l'AIC ou le BIC.
+
+    Tous les candidats de la grille sont d'abord ajustés grossièrement
+    (``PRESCREEN_MAXITER`` itérations), en parallèle si un pool est fourni ; seuls
+    les ``keep`` meilleurs sont réajustés jusqu'à convergence. Le résultat est
+    mémorisé sur disque par empreinte de la série.
+
+    Avec ``time_budget`` (secondes, séries quotidiennes), les candidats sont
+    évalués du plus simple au plus complexe et ceux qui n'ont pas fini à
+    l'échéance sont abandonnés ; si aucun finaliste n'a pu être réajusté, le
+    meilleur candidat du premier tri est retenu.
+    """
+    budget = {} if time_budget is None else {'time_budget': float(time_budget)}
+    key = model_key('order_search', endog, exog, s=s, criterion=criterion,
+                    grid={**ORDER_GRID, **(grid or {})}, keep=keep, maxiter=PRESCREEN_MAXITER, **budget)
+    path = cache_path(f"order_search_{key}.json")
+    if path.exists():
+        return json.loads(path.read_text())
+
+    candidates = candidate_orders(grid, s)
+    start = time.time()
+
+    def evaluate(orders, maxiter, stage, deadline=None):
+        if not orders:
+            return []
+        tasks = [(endog, exog, order, seasonal, criterion, maxiter, deadline) for order, seasonal in orders]
+        if pool is None:
+            rows = []
+            for task in tasks:
+                if deadline is not None and time.time() > deadline:
+                    break
+                rows.append(_score_order(*task))
+        else:
+            futures = [pool.submit(_score_order, *task) for task in tasks]
+            if deadline is not None:
+                # Candidats pas encore démarrés abandonnés ; ceux en cours s'arrêtent d'eux-mêmes
+                wait(futures, timeout=max(0.0, deadline - time.time()))
+                for future in futures:
+                    future.cancel()
+            rows = [future.result() for future in futures if not future.cancelled()]
+        return [{**row, 'stage': stage} for row in rows]
+
+    def score(row):
+        return row[criterion] if row[criterion] is not None else float('inf')
+
+    # Avec un budget : PRESCREEN_SHARE du temps pour le premier tri, le reste pour les finalistes
+    prescreen_deadline = None if time_budget is None else start + PRESCREEN_SHARE * time_budget
+    final_deadline = None if time_budget is None else start + time_budget
+    prescreen = sorted(evaluate(candidates, PRESCREEN_MAXITER, 'prescreen', prescreen_deadline), key=score)
+    finalists = [(tuple(r['order']), tuple(r['seasonal_order'])) for r in prescreen[:keep] if r[criterion] is not None]
+    final = sorted(evaluate(finalists, 50, 'final', final_deadline), key=score)
+    if time_budget is not None and (not final or final[0][criterion] is None):
+        final = prescreen[:keep]
+    if not final or final[0][criterion] is None:
+        raise ValueError("Aucun ordre SARIMA n'a pu être ajusté sur cette série")
+
+    result = {
+        'order': final[0]['order'],
+        'seasonal_order': final[0]['seasonal_order'],
+        'criterion': criterion,
+        'score': final[0][criterion],
+        'candidates': final + prescreen[keep:],
+    }
+    atomic_write(path, lambda tmp: tmp.write_text(json.dumps(result)))
+    return result
+
+
+def prophet_path(data, regressors=(), **options):
+    """Fichier JSON d'un modèle Prophet."""
+    regressors = list(regressors)
+    indexed = data.set_index('ds')
+    key = model_key('prophet', indexed['y'], indexed[regressors] if regressors else None,
+                    regressors=regressors, **options)
+    return cache_path(f"prophet_{key}.json")
+
+
+def fit_prophet(data, regressors=(), **options):
+    """Prophet ajusté sur ``data`` (colonnes ds, y et régresseurs), relu depuis le disque si possible."""
+    from prophet import Prophet
+    from prophet.serialize import model_from_json, model_to_json
+
+    regressors = list(regressors)
+    path = prophet_path(data, regressors, **options)
+
+    if path.exists():
+        return model_from_json(path.read_text())
+
+    model = Prophet(**options)
+    for var in regressors:
+        model.add_regressor(var)
+    model.fit(data)
+    serialized = model_to_json(model)
+    atomic_write(path, lambda tmp: tmp.write_text(serialized))
+    return model
+
+
+# Ajustements en parallèle
+
+_FITTERS = {'sarimax': (fit_sarimax, sarimax_path), 'prophet': (fit_prophet, prophet_path)}
+
+
+def fit_workers():
+    """Nombre de processus d'ajustement (``CV_FIT_WORKERS``, par défaut min(4, nb de cœurs))."""
+    default = min(4, os.cpu_count() or 1)
+    return max(0, int(os.environ.get("CV_FIT_WORKERS", default)))
+
+
+class _FitPool(ProcessPoolExecutor):
+    """Pool dont les workers ne ré-exécutent pas le script principal.
+
+    Streamlit exécute ``main.py`` comme module ``__main__`` ; spawn et forkserver
+    relancent ce module dans chaque nouveau processus s'il a un chemin. Les
+    processus sont créés lors des soumissions : le chemin est masqué le temps
+    de ``submit``.
+    """
+
+    _lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        main = sys.modules.get('__main__')
+        with self._lock:
+            path = getattr(main, '__file__', None)
+            if path is not None:
+                del main.__file__
+            try:
+                return super().submit(fn, *args, **kwargs)
+            finally:
+                if path is not None:
+                    main.__file__ = path
+
+
+def make_fit_pool(max_workers=None):
+    """Pool de processus d'ajustement, ou ``None`` si les ajustements se font sur place."""
+    max_workers = fit_workers() if max_workers is None else max_workers
+    if max_workers <= 1:
+        return None
+    # Pas de fork : le serveur Streamlit est multi-thread (Tornado, pyarrow, BLAS), un
+    # fork peut hériter de verrous tenus par d'autres threads. Les workers partent d'un
+    # processus neuf (forkserver, sinon spawn) et n'ont besoin que de ce module.
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return _FitPool(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+
+
+def _warm(kind, args, kwargs):
+    # Exécuté dans un worker : seul le fichier de cache est utile au processus parent
+    _FITTERS[kind][0](*args, **kwargs)
+    return kind
+
+
+def submit_fit(pool, kind, *args, **kwargs):
+    """Lance l'ajustement d'un modèle ('sarimax' ou 'prophet') s'il n'est pas déjà en cache.
+
+    Renvoie un ``Future`` ; sans pool, ou si le modèle est déjà sur disque, le
+    ``Future`` est déjà résolu et l'ajustement éventuel se fera à la relecture.
+    """
+    if pool is not None and not _FITTERS[kind][1](*args, **kwargs).exists():
+        return pool.submit(_warm, kind, args, kwargs)
+    done = Future()
+    done.set_result(kind)
+    return done
+
+
+def wait_fit(future):
+    """Attend un ajustement lancé par ``submit_fit`` ; ``False`` s'il a échoué ou a été annulé."""
+    try:
+        future.result()
+        return True
+    except Exception:
+        logger.exception("Échec d'un ajustement en parallèle (le modèle sera ajusté sur place)")
+        return False
@@ -1,24 +1,10 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-from sklearn.manifold import TSNE
-from sklearn.cluster import KMeans
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.decomposition import PCA
-import numpy as np
-import ast
-import plotly.express as px
-import re
-from collections import Counter
 import base64
 from pathlib import Path
 
-# Imports pour les modèles avancés
-try:
-    from prophet import Prophet
-    PROPHET_AVAILABLE = True
-except ImportError:
-    PROPHET_AVAILABLE = False
+# Les dépendances lourdes (pandas, plotly, scikit-learn, UMAP, Prophet...) sont importées
+# dans la page qui les utilise, à sa première ouverture
+from page_imports import timed_imports
 
 # ARCH supprimé
 
@@ -30,6 +16,11 @@ st.set_page_config(page_title="Théo Bernad — CV & Portfolio", page_icon="📊
 if "nav" not in st.session_state:
     st.session_state["nav"] = "🏠 Accueil"
 
+# Ajustements de modèles lancés par le run précédent (onglet prédictions) : ceux qui n'ont pas
+# démarré sont annulés à chaque rerun ou changement de page ; ceux en cours alimentent le cache disque
+for _fit in st.session_state.pop("fits_en_cours", {}).values():
+    _fit.cancel()
+
 # =========================
 # STYLES (clair, harmonisé, largeur maîtrisée)
 # =========================
@@ -546,110 +537,73 @@ if page == "🏠 Accueil":
 # =========================
   
 elif page== "▶️ NLP: Cartographie politique des Youtubeurs":
-    import pandas as pd
-    import numpy as np
-    from sklearn.preprocessing import MultiLabelBinarizer, StandardScaler
-    from umap.umap_ import UMAP
-    import plotly.express as px
-    import streamlit as st
-    import ast
-    import time
+    with timed_imports(page):
+        import pandas as pd
+        import plotly.graph_objects as go
+        import youtube_map
+        from scatter_labels import LABEL_MODES, label_scatter
     
     st.title("📊 Cartographie politique des influenceurs YouTube")
     
     # Afficher un message d'attente stylisé
     with st.spinner("🔄Veuillez patienter pendant le chargement de la visualisation"):
         
-        # Chargement des données avec cache pour optimiser les performances
+        # Coordonnées UMAP enregistrées sur disque : encodage et UMAP ne tournent
+        # qu'une fois par version de results_df.csv
         @st.cache_data
-        def load_data():
-            df = pd.read_csv("results_df.csv")
-            df = df.dropna(subset=["title", "charge_politique_latente"]).reset_index(drop=True)
-            
-            # Conversion des colonnes de listes depuis string
-            list_cols = [
-                "style_de_politisation",
-                "figures_ennemies",
-                "valeurs_invoquées",
-                "thématiques_dominantes"
-            ]
-        
-            for col in list_cols:
-                df[col] = df[col].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) and x.startswith('[') else [])
-            
-            return df
-        
-
-        
-        df = load_data()
-        
-     
-        
-        # Colonnes numériques à inclure
-        numerical_cols = ["charge_politique_latente", "index_fanatisme"]
-        
-        # Encodage MultiLabel
-        list_cols = [
-            "style_de_politisation",
-            "figures_ennemies",
-            "valeurs_invoquées",
-            "thématiques_dominantes"
-        ]
-        
-        encoded_parts = []
-        for col in list_cols:
-            mlb = MultiLabelBinarizer()
-            try:
-                binarized = mlb.fit_transform(df[col])
-                encoded_df = pd.DataFrame(binarized, columns=[f"{col}__{c}" for c in mlb.classes_])
-                encoded_parts.append(encoded_df)
-            except Exception as e:
-                st.warning(f"Problème d'encodage pour {col} : {e}")
-        
-     
-        
-        # Construction de la matrice finale
-        X_num = df[numerical_cols].fillna(0).reset_index(drop=True)
-        X_cat = pd.concat(encoded_parts, axis=1).reset_index(drop=True)
-        X_all = pd.concat([X_num, X_cat], axis=1)
-        
-        # Normalisation
-        X_scaled = StandardScaler().fit_transform(X_all)
-        
-  
-        # UMAP
-        umap = UMAP(n_neighbors=5, min_dist=0.1, metric="cosine", random_state=42)
-        embedding = umap.fit_transform(X_scaled)
-        
-        # DataFrame pour visualisation
-        df_visu = pd.DataFrame({
-            "x": embedding[:, 0],
-            "y": embedding[:, 1],
-            "title": df["title"],
-            "charge_politique_latente": df["charge_politique_latente"]
-        })
-        
-   
-        # Graphique Plotly
-        fig = px.scatter(
-            df_visu,
-            x="x", y="y",
-            text="title",
-            color="charge_politique_latente",
-            color_continuous_scale="RdBu_r",
-            hover_name="title",
-            title="Projection UMAP des chaînes YouTube par orientation politique"
+        def load_embedding(fingerprint):
+            return youtube_map.load_embedding()
+        
+        df_visu = load_embedding(youtube_map.source_fingerprint())
+        
+        # Graphique Plotly (WebGL) : noms au survol, une partie affichée selon le mode d'étiquetage
+        label_mode = st.radio("Noms des chaînes", list(LABEL_MODES), horizontal=True)
+        fig = go.Figure(label_scatter(
+            df_visu["x"], df_visu["y"], df_visu["title"],
+            mode=LABEL_MODES[label_mode],
+            marker=dict(
+                size=10,
+                color=df_visu["charge_politique_latente"],
+                colorscale="RdBu_r",
+                colorbar=dict(title="charge_politique_latente"),
+            ),
+        ))
+        fig.update_layout(
+            height=600,
+            showlegend=False,
+            title="Projection UMAP des chaînes YouTube par orientation politique",
+            xaxis_title="x",
+            yaxis_title="y",
         )
-        fig.update_traces(textposition='top center', marker=dict(size=10))
-        fig.update_layout(height=600, showlegend=False)
         
         st.success("✅ Chargement complété.")
     
     # Afficher le graphique
-    st.plotly_chart(fig, use_column_width=True)
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Chaînes similaires : voisins pré-calculés dans l'espace complet des variables
+    @st.cache_data
+    def load_neighbors(fingerprint):
+        return youtube_map.load_neighbors()
+
+    voisins = load_neighbors(youtube_map.source_fingerprint())
+    st.markdown("### 🔎 Chaînes similaires")
+    chaine = st.selectbox(
+        "Choisir une chaîne",
+        options=sorted(df_visu["title"]),
+        help="Similarité cosinus calculée sur toutes les variables analysées, et non sur la projection 2D"
+    )
+    similaires = youtube_map.similar_channels(voisins, chaine)
+    st.dataframe(
+        similaires.rename(columns={"voisin": "Chaîne", "similarite": "Similarité"}),
+        hide_index=True,
+        use_container_width=True,
+        column_config={"Similarité": st.column_config.ProgressColumn(min_value=0.0, max_value=1.0, format="%.2f")}
+    )
+
     st.markdown("""
         ---
-        
+
         ### 🎯 Objectif du projet
         
         Cette visualisation cherche à représenter l'identité politique des influenceurs YouTube à partir de plusieurs dimensions qualitatives et quantitatives extraites de leurs discours.
@@ -725,6 +679,17 @@ elif page== "▶️ NLP: Cartographie politique des Youtubeurs":
         st.dataframe(df_descr, height=400)
         
 elif page == "🎵 NLP/LLM: Cartographier les artistes français depuis les paroles de leur répertoire.":
+    with timed_imports(page):
+        import numpy as np
+        import plotly.express as px
+        import plotly.graph_objects as go
+        import artist_store
+        import song_store
+        from projection import resolve_backend
+        from scatter_labels import LABEL_MODES, label_scatter
+        from sklearn.cluster import KMeans
+        from sklearn.decomposition import PCA
+    
     st.markdown("""
     <div style="text-align: left; font-size: 18px; line-height: 1.6; margin-top: 20px;">
         <p><strong>Présentation du projet :</strong></p>
@@ -751,52 +716,41 @@ elif page == "🎵 NLP/LLM: Cartographier les artistes français depuis les paro
      
     </div>
 """, unsafe_allow_html=True)
-    # Chargement des données
-    file_path = 'artistes.parquet' 
-    df = pd.read_parquet(file_path, columns=['artist_name', 'avg_embedding'])
+    # Chargement des données : embeddings en matrice float32 projetée en mémoire
+    # (convertie une fois depuis artistes.parquet)
+    @st.cache_resource
+    def load_artist_embeddings(fingerprint):
+        return artist_store.load_embeddings()
+
+    # Projection t-SNE commune aux deux premiers onglets (ACP préalable, enregistrée sur disque)
+    @st.cache_data
+    def load_artist_projection(fingerprint, backend):
+        return artist_store.tsne_projection(backend=backend)
 
     with st.spinner("⏳ Patientez quelques secondes le temps que le graphique charge :)"):
-        if 'avg_embedding' not in df.columns:
-            st.error('La colonne avg_embedding n\'existe pas dans le DataFrame.')
+        artists, embeddings = load_artist_embeddings(artist_store.source_fingerprint())
+        if len(artists) == 0:
+            st.error("Aucun embedding d'artiste dans artistes.parquet.")
         else:
-            # Extraction des noms d'artistes et des embeddings
-            artists = df['artist_name'].tolist()
-            embeddings = np.array(df['avg_embedding'].apply(ast.literal_eval).tolist())
-    
+            reduced_embeddings = load_artist_projection(artist_store.source_fingerprint(), resolve_backend(n_points=len(artists)))
+            # Noms affichés sur les trois graphiques (tous les noms restent visibles au survol)
+            label_mode = LABEL_MODES[st.radio("Noms des artistes et des chansons", list(LABEL_MODES), horizontal=True)]
             tabs = st.tabs(["Visualisation des Embeddings", "Clustering des Artistes", "Etude par Artiste"])
     
             # Onglet 1 : Visualisation des embeddings
             with tabs[0]:
                 # Visualisation avec t-SNE
                 def generate_espace_artistes():
-                    reducer = TSNE(n_components=2, random_state=0)
-                    reduced_embeddings = reducer.fit_transform(embeddings)
-    
-                    fig = go.Figure()
-                    fig.add_trace(go.Scatter(
-                        x=reduced_embeddings[:, 0],
-                        y=reduced_embeddings[:, 1],
-                        mode='markers',
+                    # Nuage WebGL : noms au survol, une partie affichée selon le mode d'étiquetage
+                    fig = go.Figure(label_scatter(
+                        reduced_embeddings[:, 0],
+                        reduced_embeddings[:, 1],
+                        artists,
+                        mode=label_mode,
                         marker=dict(size=8, color='blue'),
-                        text=artists,
-                        textposition='top center',
-                        hoverinfo='none'
+                        textfont=dict(size=10, color='blue'),
                     ))
     
-                    for i, artist in enumerate(artists):
-                        artist_url = f'/{artist}/'
-                        fig.add_annotation(
-                            x=reduced_embeddings[i, 0],
-                            y=reduced_embeddings[i, 1],
-                            text=f'<a href="{artist_url}" target="_blank">{artist}</a>',
-                            showarrow=True,
-                            arrowhead=2,
-                            ax=20,
-                            ay=-20,
-                            font=dict(size=10, color='blue'),
-                            align='center'
-                        )
-    
                     fig.update_layout(
                         autosize=True,
                         width=1800,
@@ -816,61 +770,33 @@ elif page == "🎵 NLP/LLM: Cartographier les artistes français depuis les paro
             # Onglet 2 : Clustering des artistes
             with tabs[1]:
                 st.write("Ce second graphique est le même que le premier, mais met en avant différents clusters, c'est à dire des groupements d'éléments semblables au regard des autres. On retrouve les différentes segmentations que l'on présentais, et même une segmentation au sein même du groupe des rappeurs")
-                def cluster_artists(artist_vectors, n_clusters=5):
+                def cluster_artists(artist_names, embeddings, n_clusters=5):
                     """Clustering des artistes en utilisant les vecteurs de leurs paroles."""
-                    artist_names = list(artist_vectors.keys())
-                    embeddings = np.array(list(artist_vectors.values()))
-                    
                     kmeans = KMeans(n_clusters=n_clusters, random_state=0)
                     clusters = kmeans.fit_predict(embeddings)
                     
                     return artist_names, embeddings, clusters
     
                 # Fonction pour visualiser les clusters en utilisant t-SNE
-                def visualize_clusters_with_tsne(artist_names, embeddings, clusters):
-                    """Visualiser les clusters d'artistes avec t-SNE."""
-                    # Réduction de dimensionnalité avec t-SNE
-                    tsne = TSNE(n_components=2, random_state=0)
-                    reduced_embeddings = tsne.fit_transform(embeddings)
-                    
-                    
-                    fig = go.Figure()
+                def visualize_clusters_with_tsne(artist_names, clusters):
+                    """Visualiser les clusters d'artistes sur la projection t-SNE commune."""
                     color_scale = px.colors.qualitative.Plotly
-    
-                    fig.add_trace(go.Scatter(
-                        x=reduced_embeddings[:, 0],
-                        y=reduced_embeddings[:, 1],
-                        mode='markers',
+                    fig = go.Figure(label_scatter(
+                        reduced_embeddings[:, 0],
+                        reduced_embeddings[:, 1],
+                        artist_names,
+                        mode=label_mode,
+                        hovertext=[f'Artiste: {name}<br>Cluster: {cluster}' for name, cluster in zip(artist_names, clusters)],
                         marker=dict(
                             size=12,
                             color=clusters,
                             colorscale=color_scale,
-                            colorbar=None,
                             line=dict(width=2, color='DarkSlateGrey')
                         ),
-                        hoverinfo='text',
-                        hovertext=[f'Artiste: {name}<br>Cluster: {cluster}' for name, cluster in zip(artist_names, clusters)]
+                        textfont=dict(size=10, color='blue'),
                     ))
     
-                
-                    annotations = []
-                    for i, artist in enumerate(artist_names):
-                        artist_url = f'/{artist}/'  # URL vers la page de l'artiste
-                        annotations.append(dict(
-                            x=reduced_embeddings[i, 0],
-                            y=reduced_embeddings[i, 1],
-                            text=f'<a href="{artist_url}" target="_blank">{artist}</a>',
-                            showarrow=True,
-                            arrowhead=2,
-                            ax=20,
-                            ay=-20,
-                            font=dict(size=10, color='blue'),
-                            align='center'
-                        ))
-    
-            
                     fig.update_layout(
-                        annotations=annotations,
                         title='Clustering des Artistes basés sur les Embeddings des Paroles (t-SNE)',
                         xaxis_title='Composante 1',
                         yaxis_title='Composante 2',
@@ -887,133 +813,94 @@ elif page == "🎵 NLP/LLM: Cartographier les artistes français depuis les paro
                     return fig
     
            
-                def load_and_visualize(df):
-             
-                    if 'avg_embedding' not in df.columns:
-                        st.error('La colonne avg_embedding n\'existe pas dans le DataFrame.')
-                        return
-    
-                    # Extraction des artistes et des embeddings
-                    artist_vectors = {row['artist_name']: ast.literal_eval(row['avg_embedding']) for index, row in df.iterrows()}
-                    
-                    # Appliquer le clustering
+                def load_and_visualize(artists, embeddings):
+                    # Appliquer le clustering (matrice déjà chargée, aucun décodage ligne à ligne)
                     n_clusters = 5  # Nombre de clusters
-                    artist_names, embeddings, clusters = cluster_artists(artist_vectors, n_clusters)
+                    artist_names, embeddings, clusters = cluster_artists(artists, embeddings, n_clusters)
                     
                     # Visualiser les clusters
-                    fig = visualize_clusters_with_tsne(artist_names, embeddings, clusters)
+                    fig = visualize_clusters_with_tsne(artist_names, clusters)
                     st.plotly_chart(fig, use_container_width=True)
     
                 # Appel de la fonction pour charger et visualiser les données
-                load_and_visualize(df)
-            # Onglet 3 : Autre contenu (ajoutez ici ce que vous souhaitez)
-            # Onglet 3 : Autre contenu (ajoutez ici ce que vous souhaitez)
+                load_and_visualize(artists, embeddings)
+            # Onglet 3 : Etude par artiste (chansons lues artiste par artiste, cache LRU)
             with tabs[2]:
-                st.write("Cette section est encore en déploiement car elle implique un chargement trop long pour le moment ! ")
-            #     # Charger les données
-            #     df = pd.read_parquet('cluster.parquet')
-
-
-        #     # Fonction pour récupérer les titres, albums et embeddings d'un artiste
-        #     def fetch_artist_lyrics(artist_name, df):
-        #         # Filtrer le DataFrame pour l'artiste donné
-        #         artist_data = df[df['artist_name'] == artist_name]
-        #         titles = artist_data['song_title'].tolist()
-        #         albums = artist_data['album_name'].tolist()
-        #         embeddings = artist_data['embedded_lyrics'].tolist()  # Supposant que les embeddings sont stockés sous forme de liste
-
-        #         # Convertir les chaînes d'embeddings en listes
-        #         embeddings = [ast.literal_eval(embedding) if isinstance(embedding, str) else embedding for embedding in embeddings]
-        #         return titles, albums, embeddings
-
-        #     # Fonction pour visualiser les chansons d'un artiste
-        #     def visualize_artist_songs(artist_name, df, method='PCA'):
-        #         titles, albums, embeddings = fetch_artist_lyrics(artist_name, df)
-
-        #         # Vérifier si les embeddings sont valides
-        #         if len(embeddings) == 0 or any(len(embedding) == 0 for embedding in embeddings):
-        #             return ''  # Si les embeddings sont vides, on ne fait rien
-
-        #         # Convertir la liste de listes en tableau NumPy
-        #         embeddings_array = np.array(embeddings)
-
-        #         # Réduction des dimensions
-        #         if method == 'PCA':
-        #             reducer = PCA(n_components=2)
-        #         elif method == 't-SNE':
-        #             reducer = TSNE(n_components=2, random_state=0)
-        #         else:
-        #             raise ValueError("Méthode non reconnue. Utilisez 'PCA' ou 't-SNE'.")
-
-        #         reduced_embeddings = reducer.fit_transform(embeddings_array)
-
-        #         unique_albums = list(set(albums))
-        #         color_map = {album: i for i, album in enumerate(unique_albums)}
-        #         colors = [color_map[album] for album in albums]
-
-        #         fig = go.Figure()
-        #         color_scale = px.colors.qualitative.Plotly
-        #         fig.add_trace(go.Scatter(
-        #             x=reduced_embeddings[:, 0],
-        #             y=reduced_embeddings[:, 1],
-        #             mode='markers',
-        #             marker=dict(
-        #                 size=15,
-        #                 color=colors,
-        #                 colorscale=color_scale,
-        #                 colorbar=dict(title='album_name'),
-        #                 line=dict(width=2, color='DarkSlateGrey')
-        #             ),
-        #         ))
-
-        #         # Ajouter des annotations avec des liens cliquables
-        #         annotations = []
-        #         for i, title in enumerate(titles):
-        #             formatted_title = title.replace(" ", "_")
-        #             annotations.append(dict(
-        #                 x=reduced_embeddings[i, 0],
-        #                 y=reduced_embeddings[i, 1],
-        #                 text=f'<a href="/chanson/{artist_name}/{formatted_title}/" target="_blank">{title}</a>',
-        #                 showarrow=True,
-        #                 arrowhead=2,
-        #                 ax=20,
-        #                 ay=-20,
-        #                 font=dict(size=10, color='black'),
-        #                 align='center'
-        #             ))
-
-        #         fig.update_layout(
-        #             title=f'Visualisation des Embeddings des Paroles - Répertoire de {artist_name}',
-        #             xaxis_title='Composante 1',
-        #             yaxis_title='Composante 2',
-        #             showlegend=True,
-        #             template='plotly_white',
-        #             width=1500,
-        #             height=900,
-        #             autosize=True,
-        #             margin=dict(l=50, r=50, t=100, b=50),
-        #             annotations=annotations
-        #         )
-
-        #         return fig
-
-        #     # Titre de l'application
-        #     st.title("Visualisation des Chansons par Artiste")
-
-            
-        #     # Sélectionner l'artiste dans un sélecteur
-        #     artist_name = st.selectbox("Choisir un artiste", df['artist_name'].unique())
+                # Fonction pour visualiser les chansons d'un artiste
+                def visualize_artist_songs(artist_name, songs, embeddings):
+                    titles = songs['song_title'].tolist()
+                    albums = songs['album_name'].tolist()
 
-    
-        #     if artist_name:
-        #         # Visualiser les chansons de l'artiste
-        #         fig = visualize_artist_songs(artist_name, df, 'PCA')
-        #         st.plotly_chart(fig)
+                    # Réduction des dimensions (ACP sur les seules chansons de l'artiste)
+                    reduced_embeddings = PCA(n_components=2).fit_transform(embeddings)
+
+                    unique_albums = list(dict.fromkeys(albums))
+                    color_map = {album: i for i, album in enumerate(unique_albums)}
+                    colors = [color_map[album] for album in albums]
+
+                    color_scale = px.colors.qualitative.Plotly
+                    fig = go.Figure(label_scatter(
+                        reduced_embeddings[:, 0],
+                        reduced_embeddings[:, 1],
+                        titles,
+                        mode=label_mode,
+                        hovertext=[f'{title}<br>Album : {album}' for title, album in zip(titles, albums)],
+                        marker=dict(
+                            size=15,
+                            color=colors,
+                            colorscale=color_scale,
+                            line=dict(width=2, color='DarkSlateGrey')
+                        ),
+                        textfont=dict(size=10, color='black'),
+                    ))
+
+                    fig.update_layout(
+                        title=f'Visualisation des Embeddings des Paroles - Répertoire de {artist_name}',
+                        xaxis_title='Composante 1',
+                        yaxis_title='Composante 2',
+                        showlegend=False,
+                        template='plotly_white',
+                        height=900,
+                        autosize=True,
+                        margin=dict(l=50, r=50, t=100, b=50)
+                    )
+
+                    return fig
+
+                # Liste des artistes (seule la colonne artist_name est lue)
+                @st.cache_data
+                def load_song_artists(fingerprint):
+                    return song_store.list_artists()
+
+                # Changer d'artiste ne relance que cet onglet ; seules ses chansons sont lues
+                @st.fragment
+                def etude_par_artiste():
+                    st.subheader("Visualisation des Chansons par Artiste")
+                    artist_name = st.selectbox("Choisir un artiste", load_song_artists(song_store.source_fingerprint()))
+
+                    if artist_name:
+                        songs, song_embeddings = song_store.load_artist_songs(artist_name)
+                        if len(songs) < 2:
+                            st.info("Pas assez de chansons pour cet artiste.")
+                        else:
+                            st.plotly_chart(visualize_artist_songs(artist_name, songs, song_embeddings),
+                                            use_container_width=True)
+
+                if not Path(song_store.SOURCE_FILE).exists():
+                    st.info(f"Données des chansons indisponibles ({song_store.SOURCE_FILE} absent).")
+                else:
+                    etude_par_artiste()
 
 # =========================
 # PAGE: ANALYSE D'ACCIDENTOLOGIE À PARIS
 # =========================
 elif page == "🚨 ML: Analyse d'accidentologie à Paris":
+    with timed_imports(page):
+        import pandas as pd
+        import numpy as np
+        import plotly.express as px
+        import plotly.graph_objects as go
+    
     st.title("🚨 Analyse d'Accidentologie à Paris")
     
     # Onglets pour séparer présentation, application et prédictions
@@ -1078,18 +965,12 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
         with col4:
             st.metric("Période", "7 ans", "2017-2023")
         
-        # Tableau des métriques par modèle
+        # Tableau des métriques par modèle (rempli par le backtesting de l'onglet Prédictions)
         st.markdown("### 📊 Métriques de performance par modèle")
+        st.caption("Backtesting à origine glissante : prévisions à 12 mois depuis plusieurs origines, erreurs hors échantillon (accidents/mois).")
         
-        metrics_data = {
-            'Modèle': ['SARIMA', 'Prophet', 'Régression Linéaire'],
-            'R² Score': [0.79, 0.82, 0.75],
-            'MAE': [2.4, 2.1, 2.8],
-            'RMSE': [3.1, 2.7, 3.5]
-        }
-        
-        df_metrics = pd.DataFrame(metrics_data)
-        st.dataframe(df_metrics, use_container_width=True)
+        metrics_placeholder = st.empty()
+        metrics_placeholder.info("Calcul des métriques en cours (onglet 🔮 Prédictions)...")
         
         # Liens vers le projet
         st.markdown("### 🔗 Liens du projet")
@@ -1140,74 +1021,70 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
         # APPLICATION D'ACCIDENTOLOGIE INTÉGRÉE DIRECTEMENT
         # =========================
         
-        # Fonction pour charger les données d'accidentologie
+        # Fonctions pour charger les données d'accidentologie
         @st.cache_data
-        def load_accident_data():
-            """Charger et prétraiter les données d'accidentologie"""
+        def load_accident_periods():
+            """Liste des mois disponibles (lecture de la seule colonne mois_annee)"""
             try:
-                # Vérifier si le fichier Parquet existe
-                parquet_file = 'accidentologie.parquet'
-                
-                # Lecture du fichier Parquet
-                df = pd.read_parquet(parquet_file)
-                
-                # Création d'une colonne de gravité combinée si elle n'existe pas déjà
-                if 'gravite_combinee' not in df.columns:
-                    df['gravite_combinee'] = 'Blessé léger'
-                    df.loc[df['Blessés hospitalisés'] > 0, 'gravite_combinee'] = 'Blessé hospitalisé'
-                    df.loc[df['Tué'] > 0, 'gravite_combinee'] = 'Tué'
-                
-                # Renommage des colonnes pour correspondre à nos besoins
-                column_mapping = {
-                    'Date': 'date',
-                    'Latitude': 'latitude',
-                    'Longitude': 'longitude',
-                    'Mode': 'type_usager',
-                    'Arrondissement': 'arrondissement',
-                    'Id accident': 'id_accident',
-                    'Gravité': 'gravite'
-                }
-                
-                # Renommage des colonnes si nécessaire
-                df = df.rename(columns={k: v for k, v in column_mapping.items() if k in df.columns})
-                
-                # Extraction des informations temporelles
-                df['date_heure'] = pd.to_datetime(df['date'])
-                df['heure'] = df['date_heure'].dt.hour
-                df['mois'] = df['date_heure'].dt.month
-                df['annee'] = df['date_heure'].dt.year
-                df['mois_annee'] = df['date_heure'].dt.strftime('%Y-%m')
-                df['jour_semaine'] = df['date_heure'].dt.day_name()
-                df['mois_nom'] = df['date_heure'].dt.strftime('%B')
-                
-                # Filtrage des lignes avec des coordonnées valides
-                df = df.dropna(subset=['latitude', 'longitude'])
-                
-                return df
+                from accident_store import list_periods
+                return list_periods()
+            except Exception as e:
+                st.error(f"Erreur lors du chargement des données : {str(e)}")
+                return []
+        
+        # Un seul exemplaire par processus, partagé par toutes les sessions (pas de copie par rerun)
+        @st.cache_resource
+        def load_shared_accidents():
+            """Jeu d'accidents dérivé complet, adossé aux tampons Arrow et en lecture seule"""
+            try:
+                from accident_store import load_shared_accidents as load_shared
+                return load_shared()
             except Exception as e:
                 st.error(f"Erreur lors du chargement des données : {str(e)}")
                 return None
         
-        # Chargement des données
-        df = load_accident_data()
+        # Cartes rendues partagées par les sessions : LRU borné en mémoire, indexé par les
+        # filtres et le style (aucun hachage de DataFrame pour retrouver une carte)
+        @st.cache_resource
+        def get_map_cache():
+            from accident_maps import MapCache
+            return MapCache()
         
-        if df is not None:
-            st.success(f"✅ Données chargées avec succès : {len(df):,} accidents")
-            
+        @st.cache_resource
+        def load_accident_cube():
+            """Cube de comptes pré-calculé : métriques et graphiques de synthèse sans parcourir les accidents"""
+            from accident_cube import load_cube
+            return load_cube()
+        
+        # Chargement des mois disponibles
+        mois_annees = load_accident_periods()
+        
+        if mois_annees:
             # Sidebar pour les filtres
             st.sidebar.header("Filtres")
             
             # Sélection de la période
-            mois_annees = sorted(df['mois_annee'].unique())
             periode_selectionnee = st.sidebar.select_slider(
                 "Sélectionner la période",
                 options=mois_annees,
                 value=(mois_annees[0], mois_annees[-1])
             )
             
-            # Filtrage par période
-            mask_periode = (df['mois_annee'] >= periode_selectionnee[0]) & (df['mois_annee'] <= periode_selectionnee[1])
-            df_periode = df[mask_periode]
+            # Période : tranche contiguë du jeu partagé (vue, aucune copie)
+            from accident_store import period_view, select_rows, take_columns
+            from accident_maps import COORD_COLUMNS, POINT_COLUMNS, map_key
+            import accident_maps
+            accidents_partages = load_shared_accidents()
+            df_periode = None if accidents_partages is None else period_view(accidents_partages, periode_selectionnee)
+            
+            # Sous-cube de la période : base de tous les compteurs de la page
+            from accident_cube import slice_cube, total, counts_by, gravity_counts
+            cube_periode = slice_cube(load_accident_cube(), periode=periode_selectionnee)
+        else:
+            df_periode = None
+        
+        if df_periode is not None:
+            st.success(f"✅ Données chargées avec succès : {len(df_periode):,} accidents")
             
             # Affichage de la période sélectionnée
             st.sidebar.info(f"Période sélectionnée : de {periode_selectionnee[0]} à {periode_selectionnee[1]}")
@@ -1242,171 +1119,143 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                     key='gravity_filter'
                 )
 
-                # Paramètres de la heatmap
-                st.sidebar.subheader("Paramètres de la carte de chaleur")
-                show_heatmap = st.sidebar.checkbox("Afficher la carte de chaleur", value=True)
-                
-                if show_heatmap:
-                    heatmap_radius = st.sidebar.slider(
-                        "Rayon de la zone de chaleur",
-                        min_value=10,
-                        max_value=50,
-                        value=25,
-                        help="Ajuste la taille des zones de chaleur"
-                    )
-                    
-                    heatmap_blur = st.sidebar.slider(
-                        "Flou de la carte de chaleur",
-                        min_value=5,
-                        max_value=30,
-                        value=15,
-                        help="Ajuste le niveau de flou entre les zones"
-                    )
-                    
-                    heatmap_intensity = st.sidebar.slider(
-                        "Intensité de la carte de chaleur",
-                        min_value=0.1,
-                        max_value=1.0,
-                        value=0.6,
-                        step=0.1,
-                        help="Ajuste l'intensité globale de la carte de chaleur"
-                    )
-                    
-                # Paramètres des marqueurs
-                st.sidebar.subheader("Paramètres des marqueurs")
-                marker_size = st.sidebar.slider(
-                    "Taille des marqueurs",
-                    min_value=3,
-                    max_value=15,
-                    value=8,
-                    help="Ajuste la taille des points sur la carte"
-                )
-                
-                marker_opacity = st.sidebar.slider(
-                    "Opacité des marqueurs",
-                    min_value=0.1,
-                    max_value=1.0,
-                    value=0.7,
-                    step=0.1,
-                    help="Ajuste la transparence des points"
-                )
-
                 if not selected_categories or not selected_gravity:
                     st.warning("Veuillez sélectionner au moins une catégorie d'usager et un niveau de gravité.")
                 else:
-                    # Filtrage des données
-                    filtered_data = df_periode[
-                        (df_periode['type_usager'].isin(selected_categories)) &
-                        (df_periode['gravite_combinee'].isin(selected_gravity))
-                    ]
+                    # Comptes de la sélection (cube) : la carte n'est construite qu'en cas d'absence du cache
+                    cube_carte = slice_cube(cube_periode, usagers=selected_categories, gravites=selected_gravity)
+                    comptes = gravity_counts(cube_carte)
                     
-                    if filtered_data.empty:
+                    if total(cube_carte) == 0:
                         st.warning("Aucun accident trouvé avec les critères sélectionnés.")
                     else:
-                        st.info(f"Affichage de {len(filtered_data):,} accidents sur la carte")
+                        st.info(f"Affichage de {total(cube_carte):,} accidents sur la carte")
                         
-                        # Création de la carte optimisée
-                        @st.cache_data
-                        def create_accident_map(df):
-                            import folium
-                            from folium.plugins import HeatMap, MarkerCluster
-                            
-                            # Limitation du nombre de points pour améliorer les performances
-                            max_points = 5000
-                            if len(df) > max_points:
-                                # Échantillonnage aléatoire pour les grandes datasets
-                                df_sample = df.sample(n=max_points, random_state=42)
-                                st.info(f"⚠️ Affichage de {max_points:,} accidents sur {len(df):,} (échantillonnage pour les performances)")
-                            else:
-                                df_sample = df
-                            
-                            m = folium.Map(location=[48.8566, 2.3522], zoom_start=12,
-                                            tiles='cartodbpositron')
+                        # Panneau de la carte : un réglage d'affichage ne relance que ce fragment
+                        @st.fragment
+                        def panneau_carte():
+                            with st.expander("⚙️ Paramètres de la carte", expanded=False):
+                                # Mode de rendu : points individuels ou comptes agrégés par cellule de grille
+                                map_mode = st.radio(
+                                    "Mode de carte",
+                                    ["Points individuels", "Agrégation spatiale"],
+                                    horizontal=True,
+                                    key='map_mode',
+                                    help="L'agrégation envoie à la carte des comptes pré-calculés par cellule, quel que soit le nombre d'accidents"
+                                )
                                 
-                            # Création d'un cluster de marqueurs optimisé
-                            marker_cluster = MarkerCluster(
-                                options={
-                                    'maxClusterRadius': 60,
-                                    'disableClusteringAtZoom': 16,
-                                    'spiderfyOnMaxZoom': True,
-                                    'showCoverageOnHover': False
-                                }
-                            )
-
-                            # Ajout de la carte de chaleur si activée (plus rapide)
-                            if show_heatmap:
-                                # Utilisation d'un échantillon plus petit pour la heatmap
-                                heat_sample_size = min(2000, len(df_sample))
-                                heat_df = df_sample.sample(n=heat_sample_size, random_state=42)
-                                heat_data = [[row['latitude'], row['longitude']] for _, row in heat_df.iterrows()]
+                                if map_mode == "Agrégation spatiale":
+                                    from accident_grid import ZOOM_LEVELS
+                                    grid_zoom = st.select_slider(
+                                        "Niveau de détail (zoom)",
+                                        options=list(ZOOM_LEVELS),
+                                        value=13,
+                                        key='grid_zoom',
+                                        help="Taille des cellules d'agrégation : plus le zoom est élevé, plus les cellules sont fines"
+                                    )
+                                else:
+                                    col_chaleur, col_marqueurs = st.columns(2)
+                                    with col_chaleur:
+                                        # Paramètres de la heatmap
+                                        st.markdown("**Carte de chaleur**")
+                                        show_heatmap = st.checkbox("Afficher la carte de chaleur", value=True, key='show_heatmap')
+                                        heatmap_radius = st.slider(
+                                            "Rayon de la zone de chaleur",
+                                            min_value=10,
+                                            max_value=50,
+                                            value=25,
+                                            disabled=not show_heatmap,
+                                            key='heatmap_radius',
+                                            help="Ajuste la taille des zones de chaleur"
+                                        )
+                                        heatmap_blur = st.slider(
+                                            "Flou de la carte de chaleur",
+                                            min_value=5,
+                                            max_value=30,
+                                            value=15,
+                                            disabled=not show_heatmap,
+                                            key='heatmap_blur',
+                                            help="Ajuste le niveau de flou entre les zones"
+                                        )
+                                        heatmap_intensity = st.slider(
+                                            "Intensité de la carte de chaleur",
+                                            min_value=0.1,
+                                            max_value=1.0,
+                                            value=0.6,
+                                            step=0.1,
+                                            disabled=not show_heatmap,
+                                            key='heatmap_intensity',
+                                            help="Ajuste l'intensité globale de la carte de chaleur"
+                                        )
+                                    with col_marqueurs:
+                                        # Paramètres des marqueurs
+                                        st.markdown("**Marqueurs**")
+                                        marker_size = st.slider(
+                                            "Taille des marqueurs",
+                                            min_value=3,
+                                            max_value=15,
+                                            value=8,
+                                            key='marker_size',
+                                            help="Ajuste la taille des points sur la carte"
+                                        )
+                                        marker_opacity = st.slider(
+                                            "Opacité des marqueurs",
+                                            min_value=0.1,
+                                            max_value=1.0,
+                                            value=0.7,
+                                            step=0.1,
+                                            key='marker_opacity',
+                                            help="Ajuste la transparence des points"
+                                        )
+                            
+                            # Affichage de la carte
+                            if map_mode == "Agrégation spatiale":
+                                # Carte agrégée : seuls les comptes par cellule de la vue sont envoyés
+                                def build_map():
+                                    from accident_grid import query_grid
+                                    cells = query_grid(grid_zoom, periode_selectionnee, selected_categories, selected_gravity)
+                                    return accident_maps.create_grid_map(cells, grid_zoom)
                                 
-                                if heat_data:
-                                    HeatMap(
-                                        heat_data,
-                                        name="Carte de chaleur",
-                                        min_opacity=0.3 * heatmap_intensity,
-                                        max_zoom=18,
-                                        radius=heatmap_radius,
-                                        blur=heatmap_blur,
-                                        gradient={
-                                            0.4: 'blue',
-                                            0.6: 'yellow',
-                                            0.8: 'orange',
-                                            1.0: 'red'
-                                        }
-                                    ).add_to(m)
-
-                            # Couleurs par gravité
-                            colors = {
-                                'Tué': 'red',
-                                'Blessé hospitalisé': 'orange',
-                                'Blessé léger': 'yellow'
-                            }
-
-                            # Ajout des marqueurs (optimisé)
-                            for _, row in df_sample.iterrows():
-                                # Taille du marqueur basée sur la gravité
-                                size = {
-                                    'Tué': marker_size + 3,
-                                    'Blessé hospitalisé': marker_size + 1,
-                                    'Blessé léger': marker_size
-                                }[row['gravite_combinee']]
+                                cle_carte = map_key(
+                                    'grille', periode=tuple(periode_selectionnee), usagers=selected_categories,
+                                    gravites=selected_gravity, zoom=grid_zoom
+                                )
+                                html_carte = get_map_cache().get_or_build(cle_carte, build_map)
+                            else:
+                                # Tous les points filtrés, rendus côté navigateur (seules les colonnes utiles sont extraites)
+                                def build_map():
+                                    filtered_data = take_columns(
+                                        df_periode,
+                                        select_rows(df_periode, usagers=selected_categories, gravites=selected_gravity),
+                                        POINT_COLUMNS
+                                    )
+                                    return accident_maps.create_accident_map_template(filtered_data, show_heatmap)
                                 
-                                # Création du marqueur simplifié
-                                folium.CircleMarker(
-                                    location=[row['latitude'], row['longitude']],
-                                    radius=size,
-                                    color=colors[row['gravite_combinee']],
-                                    fill=True,
-                                    fillOpacity=marker_opacity,
-                                    popup=f"<b>{row['gravite_combinee']}</b><br>Type: {row['type_usager']}<br>Date: {row['date']}"
-                                ).add_to(marker_cluster)
-                            
-                            # Ajout du cluster à la carte
-                            marker_cluster.add_to(m)
-                            
-                            # Ajout du contrôle des couches
-                            folium.LayerControl().add_to(m)
-                            
-                            return m
-
-                        # Affichage de la carte
-                        m = create_accident_map(filtered_data)
-                        st.components.v1.html(m._repr_html_(), height=600)
+                                # Le HTML en cache ne dépend que des données : le style y est injecté à chaque affichage
+                                cle_carte = map_key(
+                                    'points', periode=tuple(periode_selectionnee), usagers=selected_categories,
+                                    gravites=selected_gravity, show_heatmap=show_heatmap
+                                )
+                                html_carte = accident_maps.apply_map_style(
+                                    get_map_cache().get_or_build(cle_carte, build_map),
+                                    heatmap_radius=heatmap_radius, heatmap_blur=heatmap_blur,
+                                    heatmap_intensity=heatmap_intensity, marker_size=marker_size,
+                                    marker_opacity=marker_opacity
+                                )
+                            st.components.v1.html(html_carte, height=600)
                         
-                        # Statistiques rapides
+                        panneau_carte()
+                        
+                        # Statistiques rapides (lues dans le cube de comptes)
                         col1, col2, col3, col4 = st.columns(4)
                         with col1:
-                            st.metric("Total accidents", len(filtered_data))
+                            st.metric("Total accidents", total(cube_carte))
                         with col2:
-                            morts = len(filtered_data[filtered_data['gravite_combinee'] == 'Tué'])
-                            st.metric("Accidents mortels", morts)
+                            st.metric("Accidents mortels", comptes['Tué'])
                         with col3:
-                            blesses = len(filtered_data[filtered_data['gravite_combinee'] == 'Blessé hospitalisé'])
-                            st.metric("Blessés hospitalisés", blesses)
+                            st.metric("Blessés hospitalisés", comptes['Blessé hospitalisé'])
                         with col4:
-                            legers = len(filtered_data[filtered_data['gravite_combinee'] == 'Blessé léger'])
-                            st.metric("Blessés légers", legers)
+                            st.metric("Blessés légers", comptes['Blessé léger'])
 
             elif analysis_type == "Évolution temporelle animée":
                 st.header("Évolution temporelle animée des accidents")
@@ -1432,14 +1281,7 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                     key='gravite_filter_anim'
                 )
                 
-                # Nettoyage et sélection des arrondissements
-                def clean_arrondissement(arr):
-                    if isinstance(arr, str):
-                        arr = arr.lstrip('0')
-                        return arr if arr else '1'
-                    return str(arr)
-                
-                df_periode['arrondissement'] = df_periode['arrondissement'].apply(clean_arrondissement)
+                # Sélection des arrondissements (déjà nettoyés dans le jeu dérivé)
                 arrondissements = sorted(df_periode['arrondissement'].unique(), key=int)
                 selected_arrondissements = st.sidebar.multiselect(
                     "Arrondissements",
@@ -1448,16 +1290,20 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                     key='arrondissements_filter_anim'
                 )
                 
-                # Application des filtres
+                # Application des filtres (aux points des cartes et au cube des compteurs)
                 if selected_types_usagers and selected_gravite and selected_arrondissements:
-                    df_filtered = df_periode[
-                        (df_periode['type_usager'].isin(selected_types_usagers)) &
-                        (df_periode['gravite_combinee'].isin(selected_gravite)) &
-                        (df_periode['arrondissement'].isin(selected_arrondissements))
-                    ]
+                    filtres_anim = dict(
+                        usagers=selected_types_usagers, gravites=selected_gravite,
+                        arrondissements=selected_arrondissements
+                    )
+                    cube_filtered = slice_cube(
+                        cube_periode, usagers=selected_types_usagers,
+                        gravites=selected_gravite, arrondissements=selected_arrondissements
+                    )
                 else:
                     st.warning("Veuillez sélectionner au moins un élément pour chaque filtre.")
-                    df_filtered = df_periode
+                    filtres_anim = {}
+                    cube_filtered = cube_periode
                 
                 # Création des sous-onglets
                 tab_mois, tab_annee = st.tabs(["Évolution mensuelle", "Évolution annuelle"])
@@ -1465,102 +1311,77 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                 with tab_mois:
                     st.subheader("Évolution moyenne mensuelle (toutes années confondues)")
                     
-                    # Préparation des données mensuelles avec les filtres appliqués
-                    df_mois = df_filtered.copy()
-                    df_mois['mois'] = df_mois['date_heure'].dt.month
-                    df_mois['mois_nom'] = df_mois['date_heure'].dt.strftime('%B')
-                    df_mois['annee'] = df_mois['date_heure'].dt.year
-                    
-                    # Création de l'ordre des mois pour le tri
-                    mois_ordre = {
-                        'January': 1, 'February': 2, 'March': 3, 'April': 4,
-                        'May': 5, 'June': 6, 'July': 7, 'August': 8,
-                        'September': 9, 'October': 10, 'November': 11, 'December': 12
-                    }
-                    df_mois['mois_num'] = df_mois['mois_nom'].map(mois_ordre)
-                    
                     # Liste des mois pour le slider
                     mois_list = ['January', 'February', 'March', 'April', 'May', 'June', 
                                 'July', 'August', 'September', 'October', 'November', 'December']
                     
-                    # Initialisation de l'index du mois dans le state si pas déjà fait
-                    if 'month_index' not in st.session_state:
-                        st.session_state.month_index = 0
-                        st.session_state.is_playing_month = False
-                    
-                    # Contrôles pour l'animation
-                    col_slider, col_play = st.columns([4, 1])
-                    
-                    with col_slider:
-                        selected_month = st.select_slider(
-                            "Sélectionner le mois",
-                            options=mois_list,
-                            value=mois_list[st.session_state.month_index]
-                        )
-                        st.session_state.month_index = mois_list.index(selected_month)
+                    # Lecteur mensuel : le mois affiché et l'animation ne relancent que ce fragment
+                    @st.fragment
+                    def lecteur_mensuel():
+                        # Contrôles : mois affiché, ou animation jouée dans le navigateur
+                        col_slider, col_play = st.columns([4, 1])
+                    
+                        with col_slider:
+                            selected_month = st.select_slider(
+                                "Sélectionner le mois",
+                                options=mois_list,
+                                value=mois_list[0]
+                            )
                     
-                    with col_play:
-                        if st.button('▶ Lecture' if not st.session_state.is_playing_month else '⏸ Pause', key='play_month'):
-                            st.session_state.is_playing_month = not st.session_state.is_playing_month
+                        with col_play:
+                            animation_mois = st.toggle(
+                                '▶ Animation', key='play_month',
+                                help="Les 12 cartes mensuelles sont envoyées une seule fois ; la lecture se fait dans le navigateur"
+                            )
                     
-                    # Création de la carte
-                    st.subheader("Carte des accidents")
-                    df_month = df_mois[df_mois['mois_nom'] == selected_month]
+                        # Création de la carte
+                        st.subheader("Carte des accidents")
                     
-                    # Fonction pour créer la carte mensuelle optimisée
-                    @st.cache_data
-                    def create_monthly_heatmap(df):
-                        import folium
-                        from folium.plugins import HeatMap
+                        if animation_mois:
+                            # Une image par mois, dans une seule couche animée côté client
+                            def build_monthly_heatmap():
+                                df_anim = take_columns(
+                                    df_periode, select_rows(df_periode, **filtres_anim), COORD_COLUMNS + ['mois_nom']
+                                )
+                                return accident_maps.create_animated_heatmap(
+                                    accident_maps.period_frames(df_anim, 'mois_nom', mois_list), mois_list
+                                )
                         
-                        # Limitation pour les performances
-                        max_points = 3000
-                        if len(df) > max_points:
-                            df_sample = df.sample(n=max_points, random_state=42)
+                            cle_mois = map_key('animation_mois', periode=tuple(periode_selectionnee), **filtres_anim)
                         else:
-                            df_sample = df
-                        
-                        m = folium.Map(location=[48.8566, 2.3522], zoom_start=13,
-                                      tiles='cartodbpositron',
-                                      max_bounds=True,
-                                      min_zoom=12,
-                                      max_zoom=16)
+                            # Carte de chaleur du mois (tous les points du mois), construite seulement hors cache
+                            def build_monthly_heatmap():
+                                df_month = take_columns(
+                                    df_periode, select_rows(df_periode, mois_nom=selected_month, **filtres_anim), COORD_COLUMNS
+                                )
+                                return accident_maps.create_period_heatmap(df_month)
                         
-                        # Création des données pour la heatmap
-                        heat_data = [[row['latitude'], row['longitude']] for _, row in df_sample.iterrows()]
-                        if heat_data:
-                            HeatMap(
-                                heat_data,
-                                radius=15,
-                                blur=20,
-                                min_opacity=0.4,
-                                gradient={
-                                    0.4: 'blue',
-                                    0.6: 'yellow',
-                                    0.8: 'orange',
-                                    1.0: 'red'
-                                }
-                            ).add_to(m)
+                            cle_mois = map_key('chaleur_mois', periode=tuple(periode_selectionnee), mois=selected_month,
+                                               **filtres_anim)
+                        st.components.v1.html(get_map_cache().get_or_build(cle_mois, build_monthly_heatmap), height=600)
                         
-                        return m
+                        # Statistiques du mois sélectionné
+                        st.subheader(f"Statistiques pour {selected_month}")
+                        cube_month = slice_cube(cube_filtered, mois_nom=selected_month)
+                        comptes_month = gravity_counts(cube_month)
+                        col1, col2, col3 = st.columns(3)
                     
-                    m = create_monthly_heatmap(df_month)
-                    st.components.v1.html(m._repr_html_(), height=600)
+                        with col1:
+                            st.metric("Nombre d'accidents", str(total(cube_month)))
+                    
+                        with col2:
+                            st.metric("Nombre de décès", str(comptes_month['Tué']))
+                    
+                        with col3:
+                            st.metric("Nombre de blessés graves", str(comptes_month['Blessé hospitalisé']))
                     
-                    # Animation
-                    if st.session_state.is_playing_month:
-                        st.session_state.month_index = (st.session_state.month_index + 1) % len(mois_list)
-                        import time
-                        time.sleep(0.5)
-                        st.rerun()
+                    lecteur_mensuel()
                     
-                    # Calcul des statistiques mensuelles (tous filtres confondus)
-                    monthly_stats = df_mois.groupby(['annee', 'mois_nom', 'mois_num']).agg({
-                        'id_accident': 'count'
-                    }).reset_index()
+                    # Calcul des statistiques mensuelles (tous filtres confondus, depuis le cube)
+                    monthly_stats = counts_by(cube_filtered, ['annee', 'mois', 'mois_nom']).reset_index(name='id_accident')
                     
                     # Tri des données
-                    monthly_stats = monthly_stats.sort_values(['annee', 'mois_num'])
+                    monthly_stats = monthly_stats.sort_values(['annee', 'mois'])
                     
                     # Création du graphique de comparaison
                     st.subheader("Comparaison mensuelle entre les années")
@@ -1628,198 +1449,140 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                     
                     # Affichage du graphique
                     st.plotly_chart(fig_monthly_comparison, use_container_width=True)
-                    
-                    # Statistiques du mois sélectionné
-                    st.subheader(f"Statistiques pour {selected_month}")
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        total_accidents = len(df_month)
-                        st.metric("Nombre d'accidents", str(total_accidents))
-                    
-                    with col2:
-                        morts = len(df_month[df_month['gravite_combinee'] == 'Tué'])
-                        st.metric("Nombre de décès", str(morts))
-                    
-                    with col3:
-                        blesses = len(df_month[df_month['gravite_combinee'] == 'Blessé hospitalisé'])
-                        st.metric("Nombre de blessés graves", str(blesses))
                 
                 with tab_annee:
                     st.subheader("Évolution annuelle des accidents")
                     
-                    # Préparation des données annuelles
-                    df_annee = df_filtered.copy()
-                    df_annee['annee'] = df_annee['date_heure'].dt.year
-                    
                     # Liste des années disponibles
-                    annees_list = sorted(df_annee['annee'].unique())
-                    
-                    # Initialisation de l'index de l'année dans le state si pas déjà fait
-                    if 'year_index' not in st.session_state:
-                        st.session_state.year_index = 0
-                        st.session_state.is_playing_year = False
-                    
-                    # Contrôles pour l'animation
-                    col_slider_year, col_play_year = st.columns([4, 1])
-                    
-                    with col_slider_year:
-                        selected_year = st.select_slider(
-                            "Sélectionner l'année",
-                            options=annees_list,
-                            value=annees_list[st.session_state.year_index]
-                        )
-                        st.session_state.year_index = annees_list.index(selected_year)
-                    
-                    with col_play_year:
-                        if st.button('▶ Lecture' if not st.session_state.is_playing_year else '⏸ Pause', key='play_year'):
-                            st.session_state.is_playing_year = not st.session_state.is_playing_year
+                    annees_list = sorted(int(a) for a in cube_filtered['annee'].unique())
+                    
+                    # Lecteur annuel : l'année affichée et l'animation ne relancent que ce fragment
+                    @st.fragment
+                    def lecteur_annuel():
+                        # Contrôles : année affichée, ou animation jouée dans le navigateur
+                        col_slider_year, col_play_year = st.columns([4, 1])
+                    
+                        with col_slider_year:
+                            selected_year = st.select_slider(
+                                "Sélectionner l'année",
+                                options=annees_list,
+                                value=annees_list[0]
+                            )
                     
-                    # Création de la carte pour l'année sélectionnée
-                    st.subheader(f"Carte des accidents pour l'année {selected_year}")
-                    df_year = df_annee[df_annee['annee'] == selected_year]
+                        with col_play_year:
+                            animation_annee = st.toggle(
+                                '▶ Animation', key='play_year',
+                                help="Les cartes de toutes les années sont envoyées une seule fois ; la lecture se fait dans le navigateur"
+                            )
                     
-                    # Fonction pour créer la carte annuelle optimisée
-                    @st.cache_data
-                    def create_yearly_heatmap(df):
-                        import folium
-                        from folium.plugins import HeatMap
+                        if animation_annee:
+                            st.subheader("Carte des accidents par année")
                         
-                        # Limitation pour les performances
-                        max_points = 4000
-                        if len(df) > max_points:
-                            df_sample = df.sample(n=max_points, random_state=42)
-                        else:
-                            df_sample = df
+                            # Une image par année, dans une seule couche animée côté client
+                            def build_yearly_heatmap():
+                                df_anim = take_columns(
+                                    df_periode, select_rows(df_periode, **filtres_anim), COORD_COLUMNS + ['annee']
+                                )
+                                return accident_maps.create_animated_heatmap(
+                                    accident_maps.period_frames(df_anim, 'annee', annees_list), annees_list
+                                )
                         
-                        m = folium.Map(location=[48.8566, 2.3522], zoom_start=13,
-                                      tiles='cartodbpositron',
-                                      max_bounds=True,
-                                      min_zoom=12,
-                                      max_zoom=16)
+                            cle_annee = map_key('animation_annee', periode=tuple(periode_selectionnee), **filtres_anim)
+                        else:
+                            # Création de la carte pour l'année sélectionnée
+                            st.subheader(f"Carte des accidents pour l'année {selected_year}")
                         
-                        # Création des données pour la heatmap
-                        heat_data = [[row['latitude'], row['longitude']] for _, row in df_sample.iterrows()]
-                        if heat_data:
-                            HeatMap(
-                                heat_data,
-                                radius=15,
-                                blur=20,
-                                min_opacity=0.4,
-                                gradient={
-                                    0.4: 'blue',
-                                    0.6: 'yellow',
-                                    0.8: 'orange',
-                                    1.0: 'red'
-                                }
-                            ).add_to(m)
+                            # Carte de chaleur de l'année (tous les points de l'année), construite seulement hors cache
+                            def build_yearly_heatmap():
+                                df_year = take_columns(
+                                    df_periode, select_rows(df_periode, annee=selected_year, **filtres_anim), COORD_COLUMNS
+                                )
+                                return accident_maps.create_period_heatmap(df_year)
                         
-                        return m
-                    
-                    # Placeholder pour la carte
-                    map_placeholder = st.empty()
-                    
-                    # Création de la carte pour l'année sélectionnée avec les données filtrées
-                    df_year = df_annee[df_annee['annee'] == selected_year]
-                    m = create_yearly_heatmap(df_year)
-                    
-                    # Affichage de la carte
-                    with map_placeholder:
-                        st.components.v1.html(
-                            m._repr_html_(),
-                            height=600
-                        )
+                            cle_annee = map_key('chaleur_annee', periode=tuple(periode_selectionnee), annee=selected_year,
+                                                **filtres_anim)
                     
-                    # Animation
-                    if st.session_state.is_playing_year:
-                        st.session_state.year_index = (st.session_state.year_index + 1) % len(annees_list)
-                        import time
-                        time.sleep(1.0)
-                        st.rerun()
-                    
-                    # Statistiques de l'année sélectionnée
-                    st.subheader(f"Statistiques pour l'année {selected_year}")
-                    col1, col2, col3, col4 = st.columns(4)
-                    
-                    with col1:
-                        total_accidents_year = len(df_year)
-                        st.metric("Total accidents", str(total_accidents_year))
-                    
-                    with col2:
-                        morts_year = len(df_year[df_year['gravite_combinee'] == 'Tué'])
-                        st.metric("Accidents mortels", str(morts_year))
+                        # Placeholder pour la carte
+                        map_placeholder = st.empty()
                     
-                    with col3:
-                        blesses_year = len(df_year[df_year['gravite_combinee'] == 'Blessé hospitalisé'])
-                        st.metric("Blessés hospitalisés", str(blesses_year))
+                        # Affichage de la carte
+                        with map_placeholder:
+                            st.components.v1.html(
+                                get_map_cache().get_or_build(cle_annee, build_yearly_heatmap),
+                                height=600
+                            )
                     
-                    with col4:
-                        legers_year = len(df_year[df_year['gravite_combinee'] == 'Blessé léger'])
-                        st.metric("Blessés légers", str(legers_year))
+                        # Statistiques de l'année sélectionnée
+                        st.subheader(f"Statistiques pour l'année {selected_year}")
+                        cube_year = slice_cube(cube_filtered, annee=selected_year)
+                        comptes_year = gravity_counts(cube_year)
+                        col1, col2, col3, col4 = st.columns(4)
                     
-                    # Graphique de répartition par mois pour l'année sélectionnée
-                    st.subheader(f"Répartition mensuelle pour {selected_year}")
+                        with col1:
+                            st.metric("Total accidents", str(total(cube_year)))
                     
-                    # Préparation des données pour le graphique mensuel
-                    df_year_monthly = df_year.copy()
-                    df_year_monthly['mois'] = df_year_monthly['date_heure'].dt.month
-                    df_year_monthly['mois_nom'] = df_year_monthly['date_heure'].dt.strftime('%B')
-                    df_year_monthly['mois_num'] = df_year_monthly['mois']
+                        with col2:
+                            st.metric("Accidents mortels", str(comptes_year['Tué']))
                     
-                    # Calcul des statistiques mensuelles pour l'année
-                    monthly_stats_year = df_year_monthly.groupby(['mois_nom', 'mois_num']).agg({
-                        'id_accident': 'count'
-                    }).reset_index()
+                        with col3:
+                            st.metric("Blessés hospitalisés", str(comptes_year['Blessé hospitalisé']))
                     
-                    # Tri des données
-                    monthly_stats_year = monthly_stats_year.sort_values('mois_num')
+                        with col4:
+                            st.metric("Blessés légers", str(comptes_year['Blessé léger']))
+                    
+                        # Graphique de répartition par mois pour l'année sélectionnée
+                        st.subheader(f"Répartition mensuelle pour {selected_year}")
+                    
+                        # Calcul des statistiques mensuelles pour l'année (depuis le cube)
+                        monthly_stats_year = counts_by(cube_year, ['mois', 'mois_nom']).reset_index(name='id_accident')
+                    
+                        # Tri des données
+                        monthly_stats_year = monthly_stats_year.sort_values('mois')
+                    
+                        # Création du graphique
+                        fig_monthly_year = px.bar(
+                            monthly_stats_year,
+                            x='mois_nom',
+                            y='id_accident',
+                            title=f"Nombre d'accidents par mois en {selected_year}",
+                            labels={
+                                'mois_nom': 'Mois',
+                                'id_accident': "Nombre d'accidents"
+                            },
+                            color='id_accident',
+                            color_continuous_scale='Reds'
+                        )
                     
-                    # Création du graphique
-                    fig_monthly_year = px.bar(
-                        monthly_stats_year,
-                        x='mois_nom',
-                        y='id_accident',
-                        title=f"Nombre d'accidents par mois en {selected_year}",
-                        labels={
-                            'mois_nom': 'Mois',
-                            'id_accident': "Nombre d'accidents"
-                        },
-                        color='id_accident',
-                        color_continuous_scale='Reds'
-                    )
+                        # Personnalisation du graphique
+                        fig_monthly_year.update_layout(
+                            height=400,
+                            showlegend=False,
+                            plot_bgcolor='white',
+                            paper_bgcolor='white'
+                        )
                     
-                    # Personnalisation du graphique
-                    fig_monthly_year.update_layout(
-                        height=400,
-                        showlegend=False,
-                        plot_bgcolor='white',
-                        paper_bgcolor='white'
-                    )
+                        # Amélioration de la grille
+                        fig_monthly_year.update_xaxes(
+                            showgrid=True,
+                            gridwidth=1,
+                            gridcolor='lightgray'
+                        )
+                        fig_monthly_year.update_yaxes(
+                            showgrid=True,
+                            gridwidth=1,
+                            gridcolor='lightgray'
+                        )
                     
-                    # Amélioration de la grille
-                    fig_monthly_year.update_xaxes(
-                        showgrid=True,
-                        gridwidth=1,
-                        gridcolor='lightgray'
-                    )
-                    fig_monthly_year.update_yaxes(
-                        showgrid=True,
-                        gridwidth=1,
-                        gridcolor='lightgray'
-                    )
+                        # Affichage du graphique
+                        st.plotly_chart(fig_monthly_year, use_container_width=True)
                     
-                    # Affichage du graphique
-                    st.plotly_chart(fig_monthly_year, use_container_width=True)
+                    lecteur_annuel()
 
             elif analysis_type == "Évolution temporelle":
                 st.header("Évolution temporelle des accidents")
                 
-                # Préparation des données pour l'évolution temporelle
-                df_evolution = df_periode.copy()
-                df_evolution['mois_annee'] = df_evolution['date'].dt.strftime('%Y-%m')
-                
-                # Groupement par mois et type de gravité
-                evolution_data = df_evolution.groupby(['mois_annee', 'gravite_combinee']).size().reset_index(name='count')
+                # Groupement par mois et type de gravité (depuis le cube de comptes)
+                evolution_data = counts_by(cube_periode, ['mois_annee', 'gravite_combinee']).reset_index(name='count')
                 evolution_data = evolution_data.sort_values('mois_annee')
                 
                 # Création du graphique d'évolution
@@ -1872,16 +1635,7 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
             elif analysis_type == "Analyse par arrondissement":
                 st.header("Analyse par arrondissement")
 
-                # Nettoyage des numéros d'arrondissements
-                def clean_arrondissement(arr):
-                    if isinstance(arr, str):
-                        arr = arr.lstrip('0')
-                        return arr if arr else '1'
-                    return str(arr)
-
-                # Nettoyage des arrondissements dans le DataFrame
-                df_periode['arrondissement'] = df_periode['arrondissement'].apply(clean_arrondissement)
-                
+                # Les numéros d'arrondissements sont déjà nettoyés dans le jeu dérivé
                 # Sélection de l'arrondissement (en haut de la page)
                 arr_analysis = st.selectbox(
                     "Sélectionner un arrondissement",
@@ -1890,38 +1644,40 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                 )
                 
                 # Filtrage des données pour l'arrondissement sélectionné
-                df_filtered = df_periode[df_periode['arrondissement'] == arr_analysis]
+                df_filtered = take_columns(
+                    df_periode, select_rows(df_periode, arrondissements=[arr_analysis]), POINT_COLUMNS
+                )
                 
                 if not df_filtered.empty:
-                    # Métriques principales pour l'arrondissement
+                    # Métriques principales pour l'arrondissement (depuis le cube de comptes)
                     st.subheader(f"Statistiques - Arrondissement {arr_analysis}")
                     
+                    cube_arr = slice_cube(cube_periode, arrondissements=[arr_analysis])
+                    comptes_arr = gravity_counts(cube_arr)
                     col1, col2, col3 = st.columns(3)
                     with col1:
                         st.metric(
                             "Total accidents",
-                            len(df_filtered)
+                            total(cube_arr)
                         )
                     with col2:
-                        morts = len(df_filtered[df_filtered['gravite_combinee'] == 'Tué'])
                         st.metric(
                             "Accidents mortels",
-                            morts
+                            comptes_arr['Tué']
                         )
                     with col3:
-                        blesses = len(df_filtered[df_filtered['gravite_combinee'] == 'Blessé hospitalisé'])
                         st.metric(
                             "Blessés hospitalisés",
-                            blesses
+                            comptes_arr['Blessé hospitalisé']
                         )
                     
                     # Graphique de répartition par gravité
                     st.subheader(f"Répartition par gravité - Arrondissement {arr_analysis}")
                     
-                    gravity_counts = df_filtered['gravite_combinee'].value_counts()
+                    repartition_gravite = counts_by(cube_arr, 'gravite_combinee').sort_values(ascending=False)
                     fig_gravity = px.pie(
-                        values=gravity_counts.values,
-                        names=gravity_counts.index,
+                        values=repartition_gravite.values,
+                        names=repartition_gravite.index.astype(str),
                         title=f"Répartition des accidents par gravité - Arrondissement {arr_analysis}",
                         color_discrete_map={
                             'Tué': 'red',
@@ -1940,113 +1696,21 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                     with tab_points:
                         st.subheader(f"Carte détaillée des accidents - Arrondissement {arr_analysis}")
                         
-                        def create_arrondissement_map(df):
-                            import folium
-                            from folium.plugins import MarkerCluster
-                            
-                            m = folium.Map(
-                                location=[df['latitude'].mean(), df['longitude'].mean()],
-                                zoom_start=15,
-                                tiles='cartodbpositron'
-                            )
-                            
-                            # Création d'un cluster de marqueurs
-                            marker_cluster = MarkerCluster(
-                                options={
-                                    'maxClusterRadius': 30,
-                                    'disableClusteringAtZoom': 16
-                                }
-                            )
-                            
-                            # Couleurs par gravité
-                            colors = {
-                                'Tué': 'red',
-                                'Blessé hospitalisé': 'orange',
-                                'Blessé léger': 'yellow'
-                            }
-                            
-                            # Ajout des marqueurs avec popups détaillés
-                            for _, accident in df.iterrows():
-                                # Création du popup HTML
-                                resume_html = f"""
-                                <div style="font-family: Arial; font-size: 12px;">
-                                    <b>{accident['gravite_combinee']}</b><br>
-                                    <b>Type:</b> {accident['type_usager']}<br>
-                                    <b>Date:</b> {accident['date']}<br>
-                                    <b>Heure:</b> {accident['date_heure'].strftime('%H:%M')}
-                                </div>
-                                """
-                                
-                                # Création du marqueur
-                                marker = folium.CircleMarker(
-                                    location=[accident['latitude'], accident['longitude']],
-                                    radius=8,
-                                    color=colors[accident['gravite_combinee']],
-                                    fill=True,
-                                    fillOpacity=0.7,
-                                    popup=folium.Popup(resume_html, max_width=300)
-                                )
-                                marker.add_to(marker_cluster)
-                            
-                            # Ajout du cluster à la carte
-                            marker_cluster.add_to(m)
-                            
-                            # Ajout du contrôle des couches
-                            folium.LayerControl().add_to(m)
-                            
-                            return m
-                        
                         # Affichage de la carte
-                        m_points = create_arrondissement_map(df_filtered)
-                        st.components.v1.html(m_points._repr_html_(), height=600)
+                        cle_points = map_key('arrondissement', periode=tuple(periode_selectionnee), arrondissement=arr_analysis)
+                        st.components.v1.html(get_map_cache().get_or_build(
+                            cle_points, lambda: accident_maps.create_arrondissement_map(df_filtered)
+                        ), height=600)
                     
                     with tab_heatmap:
                         st.subheader(f"Carte de chaleur des zones à risque - Arrondissement {arr_analysis}")
                         
-                        def create_arrondissement_heatmap(df):
-                            import folium
-                            from folium.plugins import HeatMap
-                            
-                            m = folium.Map(
-                                location=[df['latitude'].mean(), df['longitude'].mean()],
-                                zoom_start=15,
-                                tiles='cartodbpositron'
-                            )
-                            
-                            # Création des données pour la heatmap avec pondération par gravité
-                            heat_data = []
-                            for _, accident in df.iterrows():
-                                weight = {
-                                    'Tué': 10,
-                                    'Blessé hospitalisé': 5,
-                                    'Blessé léger': 1
-                                }[accident['gravite_combinee']]
-                                heat_data.append([accident['latitude'], accident['longitude'], weight])
-                            
-                            # Ajout de la heatmap
-                            HeatMap(
-                                heat_data,
-                                name="Zones à risque",
-                                min_opacity=0.3,
-                                max_zoom=18,
-                                radius=25,
-                                blur=15,
-                                gradient={
-                                    0.4: 'blue',
-                                    0.6: 'yellow',
-                                    0.8: 'orange',
-                                    1.0: 'red'
-                                }
-                            ).add_to(m)
-                            
-                            # Ajout du contrôle des couches
-                            folium.LayerControl().add_to(m)
-                            
-                            return m
-                        
                         # Affichage de la carte de chaleur
-                        m_heat = create_arrondissement_heatmap(df_filtered)
-                        st.components.v1.html(m_heat._repr_html_(), height=600)
+                        cle_chaleur = map_key('arrondissement_chaleur', periode=tuple(periode_selectionnee),
+                                              arrondissement=arr_analysis)
+                        st.components.v1.html(get_map_cache().get_or_build(
+                            cle_chaleur, lambda: accident_maps.create_arrondissement_heatmap(df_filtered)
+                        ), height=600)
                     
                 else:
                     st.warning(f"Aucun accident trouvé dans l'arrondissement {arr_analysis} avec les filtres sélectionnés.")
@@ -2055,25 +1719,23 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
             elif analysis_type == "Statistiques générales":
                 st.header("Statistiques générales")
                 
-                # Métriques globales
+                # Métriques globales (depuis le cube de comptes)
+                comptes = gravity_counts(cube_periode)
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("Total accidents", len(df_periode))
+                    st.metric("Total accidents", total(cube_periode))
                 with col2:
-                    morts = len(df_periode[df_periode['gravite_combinee'] == 'Tué'])
-                    st.metric("Accidents mortels", morts)
+                    st.metric("Accidents mortels", comptes['Tué'])
                 with col3:
-                    blesses = len(df_periode[df_periode['gravite_combinee'] == 'Blessé hospitalisé'])
-                    st.metric("Blessés hospitalisés", blesses)
+                    st.metric("Blessés hospitalisés", comptes['Blessé hospitalisé'])
                 with col4:
-                    legers = len(df_periode[df_periode['gravite_combinee'] == 'Blessé léger'])
-                    st.metric("Blessés légers", legers)
+                    st.metric("Blessés légers", comptes['Blessé léger'])
                 
                 # Graphique de répartition par type d'usager
                 st.subheader("Répartition par type d'usager")
-                usager_counts = df_periode['type_usager'].value_counts()
+                usager_counts = counts_by(cube_periode, 'type_usager').sort_values(ascending=False)
                 fig_usager = px.bar(
-                    x=usager_counts.index,
+                    x=usager_counts.index.astype(str),
                     y=usager_counts.values,
                     title="Nombre d'accidents par type d'usager",
                     labels={'x': 'Type d\'usager', 'y': 'Nombre d\'accidents'}
@@ -2083,10 +1745,10 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                 
                 # Graphique de répartition par gravité
                 st.subheader("Répartition par gravité")
-                gravity_counts = df_periode['gravite_combinee'].value_counts()
+                repartition_gravite = counts_by(cube_periode, 'gravite_combinee').sort_values(ascending=False)
                 fig_gravity = px.pie(
-                    values=gravity_counts.values,
-                    names=gravity_counts.index,
+                    values=repartition_gravite.values,
+                    names=repartition_gravite.index.astype(str),
                     title="Répartition des accidents par gravité",
                     color_discrete_map={
                         'Tué': 'red',
@@ -2101,25 +1763,25 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
     with tab_predictions:
         st.markdown("### 🔮 Prédictions SARIMA 2023")
         
-        # Chargement des données
-        @st.cache_data
-        def load_accident_data():
-                df = pd.read_parquet('accidentologie.parquet')
-                df['Date'] = pd.to_datetime(df['Date'])
-                monthly_accidents = df.groupby(df['Date'].dt.to_period('M')).size().reset_index()
-                monthly_accidents.columns = ['date', 'accidents']
-                monthly_accidents['accidents'] = monthly_accidents['accidents'].astype(int)
-                monthly_accidents['date'] = monthly_accidents['date'].dt.to_timestamp()
-                monthly_accidents = monthly_accidents.set_index('date')
-                return monthly_accidents
+        # Prophet n'est importé que par les ajustements (forecasting) : ici, simple détection
+        import importlib.util
+        PROPHET_AVAILABLE = importlib.util.find_spec("prophet") is not None
+        
+        # Matrices accidents + météo + trafic partagées par tous les modèles
+        # (reconstruites sur disque seulement si un fichier source change)
+        @st.cache_data(show_spinner="Préparation des variables explicatives...")
+        def load_feature_store(fingerprint):
+            from features import load_features
+            return load_features()
         
-        # Chargement des données
-        ts_data = load_accident_data()
+        from features import EXOG_VARS, TRAFFIC_VARS, WEATHER_VARS, expected_exog, source_fingerprint
+        feature_store = load_feature_store(source_fingerprint())
+        monthly_features = feature_store['monthly']
+        ts_data = monthly_features[['accidents']]
         
         
         if ts_data is not None:
             # Import des librairies
-            from statsmodels.tsa.statespace.sarimax import SARIMAX
             import numpy as np
             import warnings
             warnings.filterwarnings('ignore')
@@ -2133,6 +1795,34 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
             except ImportError:
                 XGBOOST_AVAILABLE = False
             
+            # Modèles ajustés partagés entre sessions ; paramètres persistés sur disque
+            # (clé : données, exogènes, ordres, fenêtre d'entraînement)
+            # ``_pending`` : ajustement lancé en parallèle, attendu avant relecture (exclu de la clé)
+            @st.cache_resource(show_spinner="Ajustement du modèle SARIMA...")
+            def fit_sarima_model(endog, exog, order, seasonal_order, _pending=None):
+                from forecasting import fit_sarimax, wait_fit
+                if _pending is not None:
+                    wait_fit(_pending)
+                return fit_sarimax(endog, exog, order, seasonal_order)
+            
+            @st.cache_resource(show_spinner="Ajustement du modèle Prophet...")
+            def fit_prophet_model(data, regressors, _pending=None, **options):
+                from forecasting import fit_prophet, wait_fit
+                if _pending is not None:
+                    wait_fit(_pending)
+                return fit_prophet(data, regressors, **options)
+            
+            # Pool de processus partagé par les sessions (taille : CV_FIT_WORKERS)
+            @st.cache_resource
+            def get_fit_pool():
+                from forecasting import make_fit_pool
+                return make_fit_pool()
+            
+            @st.cache_data(show_spinner="Recherche des ordres SARIMA...")
+            def search_sarima_orders(endog, criterion):
+                from forecasting import search_sarima_order
+                return search_sarima_order(endog, criterion=criterion, pool=get_fit_pool())
+            
             # Paramètres SARIMA
             p, d, q = 1, 1, 1
             P, D, Q, s = 1, 1, 1, 12
@@ -2145,11 +1835,96 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
             
             st.write(f"📊 **Données utilisées :** {len(ts_clean)} lignes")
             
+            # Ordres SARIMA : fixes ou choisis par recherche automatique sur la série d'accidents
+            choix_ordres = st.radio(
+                "Ordres SARIMA",
+                ["Fixes (1,1,1)x(1,1,1,12)", "Recherche automatique (AIC)", "Recherche automatique (BIC)"],
+                horizontal=True,
+                help="La recherche évalue une grille de (p,d,q)x(P,D,Q,12) en parallèle et retient le meilleur critère d'information"
+            )
+            
+            if choix_ordres != "Fixes (1,1,1)x(1,1,1,12)":
+                criterion = 'aic' if 'AIC' in choix_ordres else 'bic'
+                recherche = search_sarima_orders(ts_clean['accidents'], criterion)
+                (p, d, q), (P, D, Q, s) = recherche['order'], recherche['seasonal_order']
+                st.write(f"🔎 **Ordres retenus ({criterion.upper()} = {recherche['score']:.1f}) :** "
+                         f"({p},{d},{q})x({P},{D},{Q},{s})")
+                with st.expander("Candidats évalués"):
+                    st.dataframe(pd.DataFrame(recherche['candidates']), use_container_width=True)
+            
             future_dates = pd.date_range(start='2023-01-01', periods=12, freq='MS')
             
+            # PRÉPARATION DES DONNÉES DE TOUS LES MODÈLES
+            # Toutes les séries sont préparées d'abord pour lancer les ajustements en parallèle ;
+            # chaque graphique attend ensuite son propre modèle.
+            
+            # Variantes : tranches de la matrice mensuelle (aucune jointure ni complétion par exécution)
+            available_weather_vars = list(WEATHER_VARS)
+            available_all_vars = list(EXOG_VARS)
+            combined_data = monthly_features[['accidents'] + available_weather_vars]
+            combined_traffic_data = monthly_features[['accidents'] + TRAFFIC_VARS]
+            all_data = monthly_features
+            exog_data = all_data[available_all_vars]
+            
+            # Profils mensuels des exogènes, utilisés pour les mois à prévoir
+            climatologie = feature_store['climatology_monthly']
+            climatologie_sans_2020 = feature_store['climatology_monthly_sans_2020']
+            
+            if len(all_data) > 0:
+                all_data_no_2020 = all_data[all_data.index.year != 2020]
+                exog_data_no_2020 = all_data_no_2020[available_all_vars]
+                
+                # Préparation des données pour Prophet : 'ds' (date), 'y' (valeur) et régresseurs
+                available_exog_vars = available_all_vars
+                prophet_data = all_data.reset_index().rename(columns={'date': 'ds', 'accidents': 'y'})
+                
+                # Paramètres du modèle Prophet
+                prophet_options = dict(
+                    yearly_seasonality=True,
+                    weekly_seasonality=False,
+                    daily_seasonality=False,
+                    seasonality_mode='multiplicative',
+                    changepoint_prior_scale=0.05,  # Sensibilité aux changements de tendance
+                    seasonality_prior_scale=10.0,  # Force de la saisonnalité
+                    holidays_prior_scale=10.0,
+                    changepoint_range=0.8
+                )
+            
+            # Lancement des ajustements en parallèle (annulés au prochain rerun s'ils n'ont pas démarré)
+            from forecasting import submit_fit
+            fit_pool = get_fit_pool()
+            fits_en_cours = {
+                'base': submit_fit(fit_pool, 'sarimax', ts_clean['accidents'], None, (p, d, q), (P, D, Q, s))
+            }
+            if len(combined_data) > 0:
+                fits_en_cours['meteo'] = submit_fit(
+                    fit_pool, 'sarimax', combined_data['accidents'], combined_data[available_weather_vars],
+                    (p, d, q), (P, D, Q, s)
+                )
+            if len(combined_traffic_data) > 0:
+                fits_en_cours['trafic'] = submit_fit(
+                    fit_pool, 'sarimax', combined_traffic_data['accidents'],
+                    combined_traffic_data[TRAFFIC_VARS], (p, d, q), (P, D, Q, s)
+                )
+            if len(all_data) > 0:
+                fits_en_cours['complet'] = submit_fit(
+                    fit_pool, 'sarimax', all_data['accidents'], exog_data, (p, d, q), (P, D, Q, s)
+                )
+                if len(all_data_no_2020) > 0:
+                    fits_en_cours['sans_2020'] = submit_fit(
+                        fit_pool, 'sarimax', all_data_no_2020['accidents'], exog_data_no_2020,
+                        (p, d, q), (P, D, Q, s)
+                    )
+                if PROPHET_AVAILABLE:
+                    fits_en_cours['prophet'] = submit_fit(
+                        fit_pool, 'prophet', prophet_data, tuple(available_exog_vars), **prophet_options
+                    )
+            st.session_state['fits_en_cours'] = fits_en_cours
+            
             # Entraînement du modèle SARIMA
-            model = SARIMAX(ts_clean['accidents'], order=(p, d, q), seasonal_order=(P, D, Q, s))
-            fitted_model = model.fit(disp=False)
+            fitted_model = fit_sarima_model(
+                ts_clean['accidents'], None, (p, d, q), (P, D, Q, s), _pending=fits_en_cours['base']
+            )
             forecast = fitted_model.get_forecast(steps=periods)
             predictions = forecast.predicted_mean.values
             
@@ -2201,105 +1976,20 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
             # SECOND GRAPHIQUE AVEC DONNÉES MÉTÉOROLOGIQUES
             st.markdown("### 🌤️ Prédictions SARIMA avec données météorologiques (avec 2020)")
             
-            # Chargement des données météorologiques
-            @st.cache_data
-            def load_weather_data():
-                weather_df = pd.read_csv('data_meteo.csv')
-                
-                # Nettoyage des données : supprimer les lignes vides
-                weather_df = weather_df.dropna(subset=['date'])
-                
-                # Conversion des colonnes numériques en float, en gérant les valeurs vides
-                numeric_columns = ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun']
-                for col in numeric_columns:
-                    if col in weather_df.columns:
-                        weather_df[col] = pd.to_numeric(weather_df[col], errors='coerce')
-                
-                weather_df['date'] = pd.to_datetime(weather_df['date'])
-                weather_df = weather_df.set_index('date')
-                
-                # Agrégation par mois avec la même fréquence que les accidents
-                monthly_weather = weather_df.resample('MS').agg({
-                    'tavg': 'mean',    # Température moyenne
-                    'tmin': 'mean',    # Température minimale
-                    'tmax': 'mean',    # Température maximale
-                    'prcp': 'sum',     # Précipitations
-                    'snow': 'sum',     # Neige
-                    'wdir': 'mean',    # Direction du vent
-                    'wspd': 'mean',    # Vitesse du vent
-                    'wpgt': 'mean',    # Rafales de vent
-                    'pres': 'mean',    # Pression atmosphérique
-                    'tsun': 'sum'      # Ensoleillement
-                })
-                
-                return monthly_weather
-            
-            weather_data = load_weather_data()
-            
-            # Fusion des données d'accidents et météo
-            combined_data = ts_data.copy()
-            combined_data = combined_data.join(weather_data, how='inner')
-            
-            # Nettoyage intelligent des données météo
-            # Colonnes qui représentent des quantités (NaN = 0)
-            quantity_columns = ['prcp', 'snow', 'tsun']  # Précipitations, neige, ensoleillement
-            # Colonnes qui représentent des moyennes (NaN = moyenne de la colonne)
-            average_columns = ['tavg', 'tmin', 'tmax', 'wdir', 'wspd', 'pres']  # Températures, vent, pression
-            # Colonnes optionnelles (peuvent être entièrement vides)
-            optional_columns = ['wpgt']  # Rafales de vent (pas toujours mesurées)
-            
-            for col in combined_data.columns:
-                if col != 'accidents':
-                    # Remplacer inf et -inf par NaN
-                    combined_data[col] = combined_data[col].replace([np.inf, -np.inf], np.nan)
-                    
-                    if col in quantity_columns:
-                        # Pour les quantités, NaN signifie 0 (pas de précipitations, pas de neige, etc.)
-                        combined_data[col] = combined_data[col].fillna(0)
-                    elif col in average_columns:
-                        # Pour les moyennes, remplir par la moyenne de la colonne
-                        if not combined_data[col].isna().all():
-                            combined_data[col] = combined_data[col].fillna(combined_data[col].mean())
-                        else:
-                            combined_data[col] = combined_data[col].fillna(0)
-                    elif col in optional_columns:
-                        # Pour les colonnes optionnelles, remplir par 0 si entièrement vides
-                        combined_data[col] = combined_data[col].fillna(0)
-            
-            # Ne pas supprimer de colonnes - toutes les colonnes météo sont utiles
-            # Ne pas faire de dropna() - on veut garder toutes les données fusionnées
-            
             if len(combined_data) > 0:
                 st.write(f"📊 **Données utilisées :** {len(combined_data)} lignes")
                 
                 # Entraînement SARIMA avec données météo
-                weather_vars = ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun']
-                available_weather_vars = [var for var in weather_vars if var in combined_data.columns]
-                
-                model_weather = SARIMAX(
-                    combined_data['accidents'], 
-                    exog=combined_data[available_weather_vars],
-                    order=(p, d, q), 
-                    seasonal_order=(P, D, Q, s)
+                fitted_model_weather = fit_sarima_model(
+                    combined_data['accidents'],
+                    combined_data[available_weather_vars],
+                    (p, d, q),
+                    (P, D, Q, s),
+                    _pending=fits_en_cours.get('meteo')
                 )
-                fitted_model_weather = model_weather.fit(disp=False)
-                
-                # Prédictions 2023 avec données météo saisonnières réalistes
-                exog_forecast = pd.DataFrame(index=future_dates)
-                
-                for var in available_weather_vars:
-                    if var in combined_data.columns:
-                        if var in ['prcp', 'snow', 'tsun']:
-                            # Pour les quantités, utiliser les moyennes mensuelles historiques
-                            monthly_avg = combined_data[var].groupby(combined_data.index.month).mean()
-                            exog_forecast[var] = [monthly_avg.get(month, combined_data[var].mean()) for month in range(1, 13)]
-                        else:
-                            # Pour les moyennes, utiliser les moyennes mensuelles historiques
-                            monthly_avg = combined_data[var].groupby(combined_data.index.month).mean()
-                            exog_forecast[var] = [monthly_avg.get(month, combined_data[var].mean()) for month in range(1, 13)]
                 
-                # S'assurer que les données exogènes ont la même forme que lors de l'entraînement
-                exog_forecast = exog_forecast[available_weather_vars]
+                # Prédictions 2023 avec les moyennes mensuelles historiques de la météo
+                exog_forecast = expected_exog(climatologie, future_dates, available_weather_vars)
                 
                 forecast_weather = fitted_model_weather.get_forecast(steps=periods, exog=exog_forecast)
                 predictions_weather = forecast_weather.predicted_mean.values
@@ -2352,66 +2042,19 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
             # TROISIÈME GRAPHIQUE AVEC DONNÉES DE TRAFIC ROUTIER
             st.markdown("### 🚗 Prédictions SARIMA avec données de trafic routier")
             
-            # Chargement des données de trafic routier
-            @st.cache_data
-            def load_traffic_data():
-                traffic_df = pd.read_csv('trafic_routier_paris.csv', sep=';')
-                traffic_df['date'] = pd.to_datetime(traffic_df['date'])
-                traffic_df = traffic_df.set_index('date')
-                
-                # Agrégation par mois avec la même fréquence que les accidents
-                monthly_traffic = traffic_df.resample('MS').agg({
-                    'q': 'mean',  # Débit moyen
-                    'k': 'mean',  # Densité moyenne
-                    'nb_mesures': 'sum'  # Nombre total de mesures
-                })
-                
-                return monthly_traffic
-            
-            traffic_data = load_traffic_data()
-            
-            # Fusion des données d'accidents et trafic
-            combined_traffic_data = ts_data.copy()
-            combined_traffic_data = combined_traffic_data.join(traffic_data, how='inner')
-            
-            # Nettoyage intelligent des données de trafic
-            for col in ['q', 'k', 'nb_mesures']:
-                if col in combined_traffic_data.columns:
-                    # Remplacer inf et -inf par NaN
-                    combined_traffic_data[col] = combined_traffic_data[col].replace([np.inf, -np.inf], np.nan)
-                    # Remplir les NaN par la moyenne
-                    if not combined_traffic_data[col].isna().all():
-                        combined_traffic_data[col] = combined_traffic_data[col].fillna(combined_traffic_data[col].mean())
-                    else:
-                        combined_traffic_data[col] = combined_traffic_data[col].fillna(0)
-            
-            # Ne pas faire de dropna() - garder toutes les données fusionnées
-            
             if len(combined_traffic_data) > 0:
                 st.write(f"📊 **Données utilisées :** {len(combined_traffic_data)} lignes")
                 # Entraînement SARIMA avec données de trafic
-                model_traffic = SARIMAX(
-                    combined_traffic_data['accidents'], 
-                    exog=combined_traffic_data[['q', 'k', 'nb_mesures']],
-                    order=(p, d, q), 
-                    seasonal_order=(P, D, Q, s)
+                fitted_model_traffic = fit_sarima_model(
+                    combined_traffic_data['accidents'],
+                    combined_traffic_data[TRAFFIC_VARS],
+                    (p, d, q),
+                    (P, D, Q, s),
+                    _pending=fits_en_cours.get('trafic')
                 )
-                fitted_model_traffic = model_traffic.fit(disp=False)
-                
-                # Prédictions 2023 avec données de trafic saisonnières réalistes
-                exog_forecast_traffic = pd.DataFrame(index=future_dates)
-                
-                for var in ['q', 'k', 'nb_mesures']:
-                    if var in combined_traffic_data.columns:
-                        # Utiliser les moyennes mensuelles historiques
-                        monthly_avg = combined_traffic_data[var].groupby(combined_traffic_data.index.month).mean()
-                        exog_forecast_traffic[var] = [monthly_avg.get(month, combined_traffic_data[var].mean()) for month in range(1, 13)]
-                    else:
-                        # Si la variable n'est pas disponible, utiliser la moyenne globale
-                        exog_forecast_traffic[var] = [combined_traffic_data[var].mean() if var in combined_traffic_data.columns else 0] * 12
                 
-                # S'assurer que les données exogènes ont la même forme que lors de l'entraînement
-                exog_forecast_traffic = exog_forecast_traffic[['q', 'k', 'nb_mesures']]
+                # Prédictions 2023 avec les moyennes mensuelles historiques du trafic
+                exog_forecast_traffic = expected_exog(climatologie, future_dates, TRAFFIC_VARS)
                 
                 forecast_traffic = fitted_model_traffic.get_forecast(steps=periods, exog=exog_forecast_traffic)
                 predictions_traffic = forecast_traffic.predicted_mean.values
@@ -2464,85 +2107,20 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
             # QUATRIÈME GRAPHIQUE AVEC TOUTES LES DONNÉES
             st.markdown("### 🎯 Prédictions SARIMA avec toutes les données (météo + trafic)")
             
-            # Fusion de toutes les données
-            all_data = ts_data.copy()
-            all_data = all_data.join(weather_data, how='inner')
-            all_data = all_data.join(traffic_data, how='inner')
-            
-            # Nettoyage intelligent de toutes les données
-            # Colonnes qui représentent des quantités (NaN = 0)
-            quantity_columns = ['prcp', 'snow', 'tsun']  # Précipitations, neige, ensoleillement
-            # Colonnes qui représentent des moyennes (NaN = moyenne de la colonne)
-            average_columns = ['tavg', 'tmin', 'tmax', 'wdir', 'wspd', 'pres', 'q', 'k', 'nb_mesures']  # Températures, vent, pression, trafic
-            # Colonnes optionnelles (peuvent être entièrement vides)
-            optional_columns = ['wpgt']  # Rafales de vent (pas toujours mesurées)
-            
-            for col in all_data.columns:
-                if col != 'accidents':
-                    # Remplacer inf et -inf par NaN
-                    all_data[col] = all_data[col].replace([np.inf, -np.inf], np.nan)
-                    
-                    if col in quantity_columns:
-                        # Pour les quantités, NaN signifie 0 (pas de précipitations, pas de neige, etc.)
-                        all_data[col] = all_data[col].fillna(0)
-                    elif col in average_columns:
-                        # Pour les moyennes, remplir par la moyenne de la colonne
-                        if not all_data[col].isna().all():
-                            all_data[col] = all_data[col].fillna(all_data[col].mean())
-                        else:
-                            all_data[col] = all_data[col].fillna(0)
-                    elif col in optional_columns:
-                        # Pour les colonnes optionnelles, remplir par 0 si entièrement vides
-                        all_data[col] = all_data[col].fillna(0)
-            
-            # Ne pas faire de dropna() - garder toutes les données fusionnées
-            
             if len(all_data) > 0:
                 st.write(f"📊 **Données utilisées :** {len(all_data)} lignes")
             
                 # Entraînement SARIMA avec toutes les données
-                all_exog_vars = ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun', 'q', 'k', 'nb_mesures']
-                available_all_vars = [var for var in all_exog_vars if var in all_data.columns]
-                
-                # Vérification finale des données exogènes avant création du modèle
-                exog_data = all_data[available_all_vars].copy()
-                
-                # S'assurer qu'il n'y a plus de NaN ou d'inf dans les données exogènes
-                for col in exog_data.columns:
-                    exog_data[col] = exog_data[col].replace([np.inf, -np.inf], np.nan)
-                    if exog_data[col].isna().any():
-                        if col in ['prcp', 'snow', 'tsun']:
-                            exog_data[col] = exog_data[col].fillna(0)
-                        else:
-                            exog_data[col] = exog_data[col].fillna(exog_data[col].mean())
-                
-                model_all = SARIMAX(
-                    all_data['accidents'], 
-                    exog=exog_data,
-                    order=(p, d, q), 
-                    seasonal_order=(P, D, Q, s)
+                fitted_model_all = fit_sarima_model(
+                    all_data['accidents'],
+                    exog_data,
+                    (p, d, q),
+                    (P, D, Q, s),
+                    _pending=fits_en_cours.get('complet')
                 )
-                fitted_model_all = model_all.fit(disp=False)
-                
-            # Prédictions 2023 avec données saisonnières réalistes
-            exog_forecast_all = pd.DataFrame(index=future_dates)
-            
-            for var in available_all_vars:
-                if var in all_data.columns:
-                    if var in ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun']:
-                        # Pour les données météo, utiliser les moyennes mensuelles historiques
-                        monthly_avg = all_data[var].groupby(all_data.index.month).mean()
-                        exog_forecast_all[var] = [monthly_avg.get(month, all_data[var].mean()) for month in range(1, 13)]
-                    elif var in ['q', 'k', 'nb_mesures']:
-                        # Pour les données de trafic, utiliser les moyennes mensuelles historiques
-                        monthly_avg = all_data[var].groupby(all_data.index.month).mean()
-                        exog_forecast_all[var] = [monthly_avg.get(month, all_data[var].mean()) for month in range(1, 13)]
-                    else:
-                        # Pour les autres variables, utiliser la moyenne globale
-                        exog_forecast_all[var] = [all_data[var].mean()] * 12
-            
-            # S'assurer que les données exogènes ont la même forme que lors de l'entraînement
-            exog_forecast_all = exog_forecast_all[available_all_vars]
+                
+            # Prédictions 2023 avec les moyennes mensuelles historiques de la météo et du trafic
+            exog_forecast_all = expected_exog(climatologie, future_dates, available_all_vars)
             
             forecast_all = fitted_model_all.get_forecast(steps=periods, exog=exog_forecast_all)
             predictions_all = forecast_all.predicted_mean.values
@@ -2673,55 +2251,20 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
         
         # Préparation des données sans 2020 avec météo et trafic
         if 'all_data' in locals() and len(all_data) > 0:
-            # Utiliser les données complètes sans 2020
-            all_data_no_2020 = all_data[all_data.index.year != 2020].copy()
-            
             if len(all_data_no_2020) > 0:
                 st.write(f"📊 **Données utilisées (sans 2020, avec météo et trafic) :** {len(all_data_no_2020)} lignes")
                 
                 # Entraînement SARIMA sans 2020 avec toutes les données
-                all_exog_vars = ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun', 'q', 'k', 'nb_mesures']
-                available_all_vars = [var for var in all_exog_vars if var in all_data_no_2020.columns]
-                
-                # Vérification finale des données exogènes avant création du modèle
-                exog_data_no_2020 = all_data_no_2020[available_all_vars].copy()
-                
-                # S'assurer qu'il n'y a plus de NaN ou d'inf dans les données exogènes
-                for col in exog_data_no_2020.columns:
-                    exog_data_no_2020[col] = exog_data_no_2020[col].replace([np.inf, -np.inf], np.nan)
-                    if exog_data_no_2020[col].isna().any():
-                        if col in ['prcp', 'snow', 'tsun']:
-                            exog_data_no_2020[col] = exog_data_no_2020[col].fillna(0)
-                        else:
-                            exog_data_no_2020[col] = exog_data_no_2020[col].fillna(exog_data_no_2020[col].mean())
-                
-                model_no_2020 = SARIMAX(
-                    all_data_no_2020['accidents'], 
-                    exog=exog_data_no_2020,
-                    order=(p, d, q), 
-                    seasonal_order=(P, D, Q, s)
+                fitted_model_no_2020 = fit_sarima_model(
+                    all_data_no_2020['accidents'],
+                    exog_data_no_2020,
+                    (p, d, q),
+                    (P, D, Q, s),
+                    _pending=fits_en_cours.get('sans_2020')
                 )
-                fitted_model_no_2020 = model_no_2020.fit(disp=False)
-                
-                # Prédictions 2023 avec données saisonnières réalistes (sans 2020)
-                exog_forecast_no_2020 = pd.DataFrame(index=future_dates)
-                
-                for var in available_all_vars:
-                    if var in all_data_no_2020.columns:
-                        if var in ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun']:
-                            # Pour les données météo, utiliser les moyennes mensuelles historiques (sans 2020)
-                            monthly_avg = all_data_no_2020[var].groupby(all_data_no_2020.index.month).mean()
-                            exog_forecast_no_2020[var] = [monthly_avg.get(month, all_data_no_2020[var].mean()) for month in range(1, 13)]
-                        elif var in ['q', 'k', 'nb_mesures']:
-                            # Pour les données de trafic, utiliser les moyennes mensuelles historiques (sans 2020)
-                            monthly_avg = all_data_no_2020[var].groupby(all_data_no_2020.index.month).mean()
-                            exog_forecast_no_2020[var] = [monthly_avg.get(month, all_data_no_2020[var].mean()) for month in range(1, 13)]
-                        else:
-                            # Pour les autres variables, utiliser la moyenne globale (sans 2020)
-                            exog_forecast_no_2020[var] = [all_data_no_2020[var].mean()] * 12
                 
-                # S'assurer que les données exogènes ont la même forme que lors de l'entraînement
-                exog_forecast_no_2020 = exog_forecast_no_2020[available_all_vars]
+                # Prédictions 2023 avec les moyennes mensuelles historiques (hors 2020)
+                exog_forecast_no_2020 = expected_exog(climatologie_sans_2020, future_dates, available_all_vars)
                 
                 forecast_no_2020 = fitted_model_no_2020.get_forecast(steps=periods, exog=exog_forecast_no_2020)
                 predictions_no_2020 = forecast_no_2020.predicted_mean.values
@@ -2744,8 +2287,7 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                 ts_clean_no_2020 = ts_clean_no_2020.dropna()
                 
                 # Entraînement du modèle SARIMA sans 2020
-                model_no_2020 = SARIMAX(ts_clean_no_2020['accidents'], order=(p, d, q), seasonal_order=(P, D, Q, s))
-                fitted_model_no_2020 = model_no_2020.fit(disp=False)
+                fitted_model_no_2020 = fit_sarima_model(ts_clean_no_2020['accidents'], None, (p, d, q), (P, D, Q, s))
                 forecast_no_2020 = fitted_model_no_2020.get_forecast(steps=periods)
                 predictions_no_2020 = forecast_no_2020.predicted_mean.values
             else:
@@ -2806,8 +2348,8 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
         ts_clean_with_2020['accidents'] = pd.to_numeric(ts_clean_with_2020['accidents'], errors='coerce')
         ts_clean_with_2020 = ts_clean_with_2020.dropna()
         
-        model_with_2020 = SARIMAX(ts_clean_with_2020['accidents'], order=(p, d, q), seasonal_order=(P, D, Q, s))
-        fitted_model_with_2020 = model_with_2020.fit(disp=False)
+        # Même série et même spécification que le premier graphique : modèle déjà en cache
+        fitted_model_with_2020 = fit_sarima_model(ts_clean_with_2020['accidents'], None, (p, d, q), (P, D, Q, s))
         forecast_with_2020 = fitted_model_with_2020.get_forecast(steps=periods)
         predictions_with_2020 = forecast_with_2020.predicted_mean.values
         
@@ -2901,65 +2443,24 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
             if 'all_data' in locals() and len(all_data) > 0:
                 st.write(f"📊 **Données utilisées :** {len(all_data)} lignes")
                 
-                # Préparation des données pour Prophet
-                prophet_data = all_data[['accidents']].copy()
-                prophet_data = prophet_data.reset_index()
-                prophet_data.columns = ['ds', 'y']  # Prophet attend 'ds' (date) et 'y' (valeur)
-                
-                # Ajouter des variables exogènes si disponibles
-                all_exog_vars = ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun', 'q', 'k', 'nb_mesures']
-                available_exog_vars = [var for var in all_exog_vars if var in all_data.columns]
-                
-                for var in available_exog_vars:
-                    prophet_data[var] = all_data[var].values
-                
-                # Entraînement du modèle Prophet
-                model_prophet = Prophet(
-                    yearly_seasonality=True,
-                    weekly_seasonality=False,
-                    daily_seasonality=False,
-                    seasonality_mode='multiplicative',
-                    changepoint_prior_scale=0.05,  # Sensibilité aux changements de tendance
-                    seasonality_prior_scale=10.0,  # Force de la saisonnalité
-                    holidays_prior_scale=10.0,
-                    changepoint_range=0.8
+                # Entraînement du modèle Prophet (variables exogènes en régresseurs, modèle mis en cache)
+                model_prophet = fit_prophet_model(
+                    prophet_data,
+                    tuple(available_exog_vars),
+                    _pending=fits_en_cours.get('prophet'),
+                    **prophet_options
                 )
                 
-                # Ajouter les variables exogènes
-                for var in available_exog_vars:
-                    model_prophet.add_regressor(var)
-                
-                # Entraînement
-                model_prophet.fit(prophet_data)
-                
                 # Prédictions 2023
                 future_prophet = model_prophet.make_future_dataframe(periods=12, freq='MS')
                 
-                # Ajouter les variables exogènes pour 2023
+                # Variables exogènes : valeurs observées, puis moyennes mensuelles historiques pour 2023
+                exog_prophet = pd.concat([
+                    all_data[available_exog_vars],
+                    expected_exog(climatologie, future_prophet['ds'].iloc[len(all_data):], available_exog_vars)
+                ])
                 for var in available_exog_vars:
-                    if var in ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun']:
-                        # Moyennes mensuelles historiques pour les données météo
-                        monthly_avg = all_data[var].groupby(all_data.index.month).mean()
-                        # Créer un array de la bonne longueur (96 lignes)
-                        var_values = np.full(len(future_prophet), np.nan)
-                        # Assigner les valeurs historiques (84 premières lignes)
-                        var_values[:len(all_data)] = all_data[var].values
-                        # Assigner les valeurs futures (12 dernières lignes)
-                        var_values[-12:] = [monthly_avg.get(month, all_data[var].mean()) for month in range(1, 13)]
-                        future_prophet[var] = var_values
-                    elif var in ['q', 'k', 'nb_mesures']:
-                        # Moyennes mensuelles historiques pour les données de trafic
-                        monthly_avg = all_data[var].groupby(all_data.index.month).mean()
-                        # Créer un array de la bonne longueur (96 lignes)
-                        var_values = np.full(len(future_prophet), np.nan)
-                        # Assigner les valeurs historiques (84 premières lignes)
-                        var_values[:len(all_data)] = all_data[var].values
-                        # Assigner les valeurs futures (12 dernières lignes)
-                        var_values[-12:] = [monthly_avg.get(month, all_data[var].mean()) for month in range(1, 13)]
-                        future_prophet[var] = var_values
-                    else:
-                        # Moyenne globale pour les autres variables
-                        future_prophet[var] = all_data[var].mean()
+                    future_prophet[var] = exog_prophet[var].to_numpy()
                 
                 # Prédictions
                 forecast_prophet = model_prophet.predict(future_prophet)
@@ -3164,6 +2665,207 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
             else:
                 st.error("❌ Prédictions manquantes pour le modèle hybride")
         
+        # BACKTESTING À ORIGINE GLISSANTE
+        st.markdown("---")
+        st.markdown("### 🧪 Backtesting à origine glissante")
+        st.caption("Chaque modèle est réentraîné à plusieurs origines (tous les 6 mois à partir de 48 mois d'historique) "
+                   "et prévoit les 12 mois suivants ; les variables exogènes sont celles observées sur la période prévue.")
+        
+        if ts_data is not None:
+            fenetre = st.radio(
+                "Fenêtre d'entraînement",
+                ["Croissante", "Glissante (48 mois)"],
+                horizontal=True,
+                key='backtest_window'
+            )
+            window = 'expanding' if fenetre == "Croissante" else 'rolling'
+            
+            # Plis évalués en parallèle, prévisions mémorisées sur disque
+            @st.cache_data(show_spinner="Backtesting en cours...")
+            def backtest_model(kind, endog, exog, window, spec):
+                from backtesting import backtest
+                return backtest(kind, endog, exog, window=window, pool=get_fit_pool(), **spec)
+            
+            sarima_spec = {'order': (p, d, q), 'seasonal_order': (P, D, Q, s)}
+            modeles_backtest = {'SARIMA': ('sarimax', ts_clean['accidents'], None, sarima_spec)}
+            if 'all_data' in locals() and len(all_data) > 0:
+                modeles_backtest['SARIMAX (météo + trafic)'] = ('sarimax', all_data['accidents'], exog_data, sarima_spec)
+                if PROPHET_AVAILABLE:
+                    modeles_backtest['Prophet'] = ('prophet', all_data['accidents'], exog_data, {'options': prophet_options})
+            modeles_backtest['Régression linéaire'] = ('regression', ts_clean['accidents'], None, {})
+            
+            from backtesting import horizon_metrics, summary_metrics
+            resultats_backtest = {}
+            for nom, (kind, endog, exog, spec) in modeles_backtest.items():
+                try:
+                    resultats_backtest[nom] = backtest_model(kind, endog, exog, window, spec)
+                except Exception as e:
+                    st.warning(f"⚠️ Backtesting impossible pour {nom} : {e}")
+            
+            if resultats_backtest:
+                tableau_backtest = pd.DataFrame([
+                    {'Modèle': nom, **summary_metrics(resultat)} for nom, resultat in resultats_backtest.items()
+                ]).round(2)
+                st.dataframe(tableau_backtest, use_container_width=True)
+                st.caption("MAPE calculé sur les seuls mois ayant au moins un accident observé.")
+                
+                par_horizon = pd.concat([
+                    horizon_metrics(resultat).assign(Modèle=nom) for nom, resultat in resultats_backtest.items()
+                ])
+                fig_backtest = px.line(
+                    par_horizon,
+                    x='horizon',
+                    y='MAE',
+                    color='Modèle',
+                    markers=True,
+                    title="Erreur absolue moyenne selon l'horizon de prévision",
+                    labels={'horizon': 'Horizon (mois)', 'MAE': 'MAE (accidents)'}
+                )
+                st.plotly_chart(fig_backtest, use_container_width=True)
+                
+                with st.expander("Détail par horizon (MAE / RMSE / MAPE)"):
+                    st.dataframe(
+                        par_horizon.pivot(index='horizon', columns='Modèle', values=['MAE', 'RMSE', 'MAPE']).round(2),
+                        use_container_width=True
+                    )
+                
+                # Tableau de l'onglet Présentation
+                metrics_placeholder.dataframe(tableau_backtest, use_container_width=True)
+        
+        # PRÉVISION QUOTIDIENNE
+        st.markdown("---")
+        st.markdown("### 📅 Prévision quotidienne des accidents")
+        st.caption("Série quotidienne (~2 500 jours) : saisonnalité hebdomadaire SARIMA (s=7), saisonnalité annuelle "
+                   "en termes de Fourier, météo et trafic du jour en variables exogènes. Pour les jours à prévoir, "
+                   "météo et trafic sont remplacés par leur moyenne historique (mois x jour de semaine).")
+        
+        if ts_data is not None:
+            import time
+            from features import DAILY_EXOG, daily_design, holdout_exog
+            from forecasting import (DAILY_FIT_BUDGET, DAILY_ORDER, DAILY_ORDER_GRID, DAILY_SEARCH_BUDGET,
+                                     DAILY_SEASONAL_ORDER, sarimax_fit_info)
+            
+            # Optimisation bornée par le budget ; paramètres persistés comme pour les modèles mensuels
+            @st.cache_resource(show_spinner="Ajustement du modèle quotidien...")
+            def fit_daily_model(endog, exog, order, seasonal_order, time_budget):
+                from forecasting import fit_sarimax
+                return fit_sarimax(endog, exog, order, seasonal_order, time_budget=time_budget)
+            
+            # Recherche des ordres quotidiens, bornée par DAILY_SEARCH_BUDGET secondes
+            @st.cache_data(show_spinner="Recherche des ordres SARIMA quotidiens...")
+            def search_daily_orders(endog, exog):
+                from forecasting import search_sarima_order
+                return search_sarima_order(endog, exog, s=7, grid=DAILY_ORDER_GRID, pool=get_fit_pool(),
+                                           time_budget=DAILY_SEARCH_BUDGET)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                horizon_jours = st.slider("Horizon (jours)", 7, 28, 7, step=7, key='daily_horizon')
+            with col2:
+                budget = float(st.slider("Budget d'ajustement (secondes)", 2, 30, int(DAILY_FIT_BUDGET),
+                                         key='daily_budget'))
+            
+            daily_data = feature_store['daily']
+            # Profil de l'historique complet : uniquement pour les jours à prévoir
+            climatologie_quotidienne = feature_store['climatology_daily']
+            daily_exog = daily_design(daily_data[DAILY_EXOG])
+            
+            # Entraînement sans les derniers jours, gardés pour la validation
+            train_endog = daily_data['accidents'].iloc[:-horizon_jours]
+            train_exog = daily_exog.iloc[:-horizon_jours]
+            
+            daily_order, daily_seasonal_order = DAILY_ORDER, DAILY_SEASONAL_ORDER
+            choix_quotidien = st.radio(
+                "Ordres SARIMA quotidiens",
+                [f"Fixes {DAILY_ORDER}x{DAILY_SEASONAL_ORDER}", "Recherche automatique (AIC)"],
+                horizontal=True, key='daily_orders',
+                help=f"Grille (p,d,q)x(P,D,Q,7) évaluée en au plus {DAILY_SEARCH_BUDGET:.0f} s, du plus simple au plus complexe"
+            )
+            if choix_quotidien == "Recherche automatique (AIC)":
+                recherche_quotidienne = search_daily_orders(train_endog, train_exog)
+                daily_order = tuple(recherche_quotidienne['order'])
+                daily_seasonal_order = tuple(recherche_quotidienne['seasonal_order'])
+                st.write(f"🔎 **Ordres retenus (AIC = {recherche_quotidienne['score']:.1f}, "
+                         f"{len(recherche_quotidienne['candidates'])} candidats évalués) :** "
+                         f"{daily_order}x{daily_seasonal_order}")
+            
+            debut = time.perf_counter()
+            daily_model = fit_daily_model(train_endog, train_exog, daily_order, daily_seasonal_order, budget)
+            duree_reponse = time.perf_counter() - debut
+            fit_info = sarimax_fit_info(train_endog, train_exog, daily_order, daily_seasonal_order, budget)
+            
+            holdout = daily_data.iloc[-horizon_jours:]
+            # Validation : profil calculé sur la seule période d'entraînement (sans les jours validés)
+            exog_validation = daily_design(holdout_exog(daily_data, horizon_jours, DAILY_EXOG))
+            validation = np.asarray(daily_model.forecast(horizon_jours, exog=exog_validation))
+            mae_validation = float(np.abs(validation - holdout['accidents'].to_numpy()).mean())
+            
+            # Mise à jour du filtre avec les jours observés (mêmes paramètres), puis prévision
+            updated_model = daily_model.append(holdout['accidents'].astype('float64'), exog=daily_exog.iloc[-horizon_jours:])
+            future_days = pd.date_range(daily_data.index[-1] + pd.Timedelta(days=1), periods=horizon_jours, freq='D')
+            future_exog = daily_design(expected_exog(climatologie_quotidienne, future_days, DAILY_EXOG))
+            daily_forecast = updated_model.get_forecast(horizon_jours, exog=future_exog)
+            intervalle = np.asarray(daily_forecast.conf_int(alpha=0.05))
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Ajustement", f"{fit_info['seconds']:.1f} s" if fit_info else "—",
+                          help=f"Budget : {budget:.0f} s")
+            with col2:
+                if fit_info is None:
+                    convergence = "—"
+                elif fit_info['converged']:
+                    convergence = "Oui"
+                else:
+                    convergence = "Budget atteint" if fit_info.get('interrupted') else "Non (itérations max.)"
+                st.metric("Convergence", convergence)
+            with col3:
+                st.metric("Temps de réponse", f"{duree_reponse:.2f} s",
+                          help="Ajustement ou relecture du modèle lors de cette exécution")
+            with col4:
+                st.metric(f"MAE sur les {horizon_jours} derniers jours", f"{mae_validation:.1f}")
+            
+            fig_daily = go.Figure()
+            recent = daily_data['accidents'].iloc[-8 * 7:]
+            fig_daily.add_trace(go.Scatter(
+                x=recent.index, y=recent.values,
+                mode='lines+markers', name='Données historiques',
+                line=dict(color='blue', width=2), marker=dict(size=4)
+            ))
+            fig_daily.add_trace(go.Scatter(
+                x=holdout.index, y=validation,
+                mode='lines+markers', name='Validation (jours observés)',
+                line=dict(color='orange', width=2, dash='dot'), marker=dict(size=5)
+            ))
+            fig_daily.add_trace(go.Scatter(
+                x=list(future_days) + list(future_days[::-1]),
+                y=list(intervalle[:, 1]) + list(intervalle[::-1, 0]),
+                fill='toself', fillcolor='rgba(255, 0, 0, 0.1)', line=dict(width=0),
+                name='Intervalle à 95 %', hoverinfo='skip'
+            ))
+            fig_daily.add_trace(go.Scatter(
+                x=future_days, y=np.asarray(daily_forecast.predicted_mean),
+                mode='lines+markers', name='Prévisions',
+                line=dict(color='red', width=3, dash='dash'), marker=dict(size=6)
+            ))
+            fig_daily.update_layout(
+                title="Prévision quotidienne - Accidents à Paris",
+                xaxis_title="Date",
+                yaxis_title="Nombre d'accidents",
+                height=500,
+                hovermode='x unified'
+            )
+            st.plotly_chart(fig_daily, use_container_width=True)
+            
+            with st.expander("Prévisions par jour"):
+                st.dataframe(pd.DataFrame({
+                    'Date': future_days.strftime('%Y-%m-%d'),
+                    'Jour': future_days.day_name(),
+                    'Accidents prévus': np.round(np.asarray(daily_forecast.predicted_mean), 1),
+                    'Borne basse': np.round(intervalle[:, 0], 1),
+                    'Borne haute': np.round(intervalle[:, 1], 1),
+                }), use_container_width=True)
+        
         # SECTION XGBOOST
         st.markdown("---")
         st.markdown("### Prédictions XGBoost")
@@ -3319,13 +3021,9 @@ elif page == "🚨 ML: Analyse d'accidentologie à Paris":
                                 # Copier les autres features des dernières données disponibles
                                 for col in feature_columns:
                                     if col not in row and col in xgb_data.columns:
-                                        if col in ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun', 'q', 'k', 'nb_mesures']:
+                                        if col in EXOG_VARS:
                                             # Pour les données météo et trafic, utiliser la moyenne mensuelle historique
-                                            if col in xgb_data.columns:
-                                                monthly_avg = xgb_data[col].groupby(xgb_data.index.month).mean()
-                                                row[col] = monthly_avg.get(month, xgb_data[col].mean())
-                                            else:
-                                                row[col] = 0
+                                            row[col] = climatologie[col].get(month, xgb_data[col].mean())
                                         else:
                                             row[col] = 0
                                 
@@ -0,0 +1,90 @@
+"""Imports des dépendances lourdes, page par page, et budget de temps d'import.
+
+Chaque page de ``main.py`` importe ses bibliothèques (pandas, plotly, scikit-learn,
+folium...) dans sa propre branche, à l'intérieur de ``timed_imports`` : la
+page d'accueil ne charge que streamlit, et une page ne paie ses imports qu'à sa
+première ouverture dans le processus (ensuite les modules sont dans
+``sys.modules``). Prophet et statsmodels sont importés par l'onglet prédictions de
+la page accidentologie ; ``st.tabs`` exécutant le corps de tous les onglets, ils
+sont chargés dès la première ouverture de cette page, quel que soit l'onglet
+affiché (leur coût est mesuré à part dans le rapport).
+
+Le temps d'import d'une page au-delà de ``CV_IMPORT_BUDGET`` secondes (2 par
+défaut) est signalé dans les logs. Rapport complet, chaque page mesurée dans un
+interpréteur neuf : ``python page_imports.py``
+"""
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+IMPORT_BUDGET = float(os.environ.get("CV_IMPORT_BUDGET", 2.0))
+
+# Modules importés par chaque page (rapport à froid)
+PAGE_MODULES = {
+    "🏠 Accueil": [],
+    "▶️ NLP: Cartographie politique des Youtubeurs": [
+        'pandas', 'plotly.graph_objects', 'youtube_map', 'scatter_labels',
+    ],
+    "🎵 NLP/LLM: Cartographier les artistes français depuis les paroles de leur répertoire.": [
+        'numpy', 'plotly.express', 'plotly.graph_objects', 'artist_store', 'song_store',
+        'scatter_labels', 'sklearn.cluster', 'sklearn.decomposition',
+    ],
+    "🚨 ML: Analyse d'accidentologie à Paris": [
+        'pandas', 'numpy', 'plotly.express', 'plotly.graph_objects',
+        'accident_store', 'accident_cube', 'accident_maps',
+    ],
+    "🔮 Prédictions (onglet)": [
+        'features', 'forecasting', 'backtesting', 'statsmodels.tsa.statespace.sarimax', 'prophet',
+    ],
+}
+
+logger = logging.getLogger(__name__)
+
+# Page -> {'secondes', 'modules'} mesurés lors du premier import dans ce processus
+# (un seul avertissement par page)
+_IMPORT_TIMES = {}
+
+
+@contextmanager
+def timed_imports(page):
+    """Mesure les imports d'un bloc ; seuls les modules encore absents de ``sys.modules`` coûtent."""
+    before = len(sys.modules)
+    start = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - start
+    loaded = len(sys.modules) - before
+    if loaded and page not in _IMPORT_TIMES:
+        _IMPORT_TIMES[page] = {'secondes': seconds, 'modules': loaded}
+        if seconds > IMPORT_BUDGET:
+            logger.warning("Imports de « %s » : %.2f s (budget %.2f s)", page, seconds, IMPORT_BUDGET)
+
+
+def cold_import_seconds(modules):
+    """Temps d'import de ``modules`` après streamlit, dans un interpréteur neuf."""
+    code = (
+        "import importlib, time\n"
+        "import streamlit\n"
+        "start = time.perf_counter()\n"
+        f"for name in {list(modules)!r}:\n"
+        "    importlib.import_module(name)\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    print(f"Budget d'import par page : {IMPORT_BUDGET:.2f} s")
+    for page, modules in PAGE_MODULES.items():
+        seconds = cold_import_seconds(modules)
+        if seconds is None:
+            print(f"  {page} : dépendance manquante")
+        else:
+            status = "OK" if seconds <= IMPORT_BUDGET else "DÉPASSÉ"
+            print(f"  {page} : {seconds:.2f} s [{status}]")
@@ -0,0 +1,142 @@
+"""Backends t-SNE interchangeables pour la carte des artistes.
+
+- ``sklearn`` : t-SNE Barnes-Hut de scikit-learn (un seul cœur), toujours disponible ;
+- ``opentsne`` : openTSNE, gradient par interpolation FFT et calcul multi-cœur,
+  adapté aux dizaines de milliers de points (optionnel : ``pip install openTSNE``).
+
+``CV_TSNE_BACKEND`` choisit le backend (``auto`` par défaut : openTSNE s'il est
+installé et que la carte compte au moins ``OPENTSNE_MIN_POINTS`` points, sinon
+scikit-learn, plus rapide à démarrer sur quelques centaines de points).
+
+Les deux backends exposent ``fit`` (coordonnées dans ``embedding_``) et
+``transform``, qui place de nouveaux points dans une carte existante sans la
+modifier : openTSNE optimise les nouveaux points seuls ;
+scikit-learn n'ayant pas d'équivalent, ils sont placés à la moyenne des positions
+de leurs plus proches voisins, pondérée par l'inverse de la distance.
+
+Comparaison des backends (durée, fiabilité des voisinages) :
+``python projection.py [tailles...]`` (1000, 10000 et 100000 points par défaut)
+"""
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+
+TSNE_BACKEND = os.environ.get("CV_TSNE_BACKEND", "auto")
+TSNE_PARAMS = dict(n_components=2, random_state=0)
+# En dessous, le démarrage d'openTSNE (index de voisins, compilation) coûte plus que le t-SNE
+OPENTSNE_MIN_POINTS = 5000
+# Voisins utilisés pour placer un nouveau point (backend scikit-learn)
+PLACEMENT_NEIGHBORS = 10
+
+
+class SklearnTSNE:
+    """t-SNE de scikit-learn ; nouveaux points placés par leurs plus proches voisins."""
+
+    name = 'sklearn'
+
+    def __init__(self, **params):
+        self.params = dict(TSNE_PARAMS, **params)
+
+    def fit(self, X):
+        from sklearn.manifold import TSNE
+
+        self._X = np.asarray(X, dtype='float32')
+        self.embedding_ = TSNE(**self.params).fit_transform(self._X)
+        return self
+
+    def transform(self, X):
+        from sklearn.neighbors import NearestNeighbors
+
+        k = min(PLACEMENT_NEIGHBORS, len(self._X))
+        distances, index = NearestNeighbors(n_neighbors=k).fit(self._X).kneighbors(np.asarray(X, dtype='float32'))
+        weights = 1.0 / np.maximum(distances, 1e-12)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return np.einsum('ij,ijk->ik', weights, self.embedding_[index])
+
+
+class OpenTSNE:
+    """t-SNE d'openTSNE (interpolation FFT, tous les cœurs)."""
+
+    name = 'opentsne'
+
+    def __init__(self, **params):
+        self.params = dict(TSNE_PARAMS, negative_gradient_method='fft', n_jobs=-1, **params)
+
+    def fit(self, X):
+        from openTSNE import TSNE
+
+        self._embedding = TSNE(**self.params).fit(np.asarray(X, dtype='float64'))
+        self.embedding_ = np.asarray(self._embedding)
+        return self
+
+    def transform(self, X):
+        return np.asarray(self._embedding.transform(np.asarray(X, dtype='float64')))
+
+
+BACKENDS = {'sklearn': SklearnTSNE, 'opentsne': OpenTSNE}
+
+
+def available_backends():
+    """Backends utilisables dans cet environnement."""
+    return [name for name in BACKENDS
+            if name == 'sklearn' or importlib.util.find_spec('openTSNE') is not None]
+
+
+def resolve_backend(backend=None, n_points=None):
+    """Nom du backend effectif pour une carte de ``n_points`` points."""
+    backend = (backend or TSNE_BACKEND).lower()
+    if backend == 'auto':
+        large = n_points is None or n_points >= OPENTSNE_MIN_POINTS
+        return 'opentsne' if large and 'opentsne' in available_backends() else 'sklearn'
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend t-SNE inconnu : {backend} (choix : auto, {', '.join(BACKENDS)})")
+    if backend not in available_backends():
+        raise ImportError("openTSNE n'est pas installé. Installez-le avec : `pip install openTSNE`")
+    return backend
+
+
+def make_projector(backend=None, **params):
+    """Projecteur t-SNE non ajusté du backend demandé."""
+    return BACKENDS[resolve_backend(backend)](**params)
+
+
+def _benchmark_data(n, dim=50, centers=20, seed=0):
+    # Mélange de gaussiennes, de la dimension des embeddings après ACP
+    rng = np.random.default_rng(seed)
+    means = rng.normal(scale=4.0, size=(centers, dim))
+    return (means[rng.integers(0, centers, n)] + rng.normal(size=(n, dim))).astype('float32')
+
+
+def benchmark(sizes=(1000, 10000, 100000), backends=None, trust_sample=2000, n_neighbors=10):
+    """Durée d'ajustement et fiabilité (trustworthiness) de chaque backend, par taille.
+
+    La fiabilité est mesurée sur un échantillon de ``trust_sample`` points (le
+    calcul exact est quadratique en mémoire).
+    """
+    import pandas as pd
+    from sklearn.manifold import trustworthiness
+
+    rows = []
+    for n in sizes:
+        X = _benchmark_data(n)
+        sample = np.random.default_rng(1).choice(n, size=min(n, trust_sample), replace=False)
+        for backend in backends or available_backends():
+            start = time.perf_counter()
+            Y = make_projector(backend).fit(X).embedding_
+            seconds = time.perf_counter() - start
+            rows.append({
+                'points': n,
+                'backend': backend,
+                'secondes': round(seconds, 2),
+                'trustworthiness': round(float(trustworthiness(X[sample], Y[sample], n_neighbors=n_neighbors)), 4),
+            })
+            print(rows[-1], flush=True)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print(benchmark(sizes).to_string(index=False))
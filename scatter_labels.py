@@ -0,0 +1,142 @@
+"""Nuages de points WebGL (``Scattergl``) étiquetés, pour les cartes d'artistes et de chaînes.
+
+Les noms ne sont plus des annotations Plotly (une par point, chacune sérialisée
+et positionnée séparément par le navigateur) mais des données de survol ; une
+trace texte optionnelle affiche une partie des noms, selon le mode d'étiquetage :
+
+- ``survol`` : aucun nom affiché, nom au survol du point ;
+- ``lod`` (niveau de détail) : au plus ``CV_MAP_MAX_LABELS`` noms (150 par
+  défaut), un par case d'une grille couvrant le nuage — le point le plus proche
+  du centre de la case — : les zones denses ne sont pas illisibles et les points
+  isolés restent nommés ;
+- ``tous`` : tous les noms ;
+- ``auto`` (par défaut) : ``tous`` jusqu'à ``CV_MAP_MAX_LABELS`` points, ``lod`` au-delà.
+
+Taille des figures et temps de construction, annotations contre WebGL :
+``python scatter_labels.py [tailles...]`` (1000 et 5000 points par défaut)
+"""
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+MAX_LABELS = int(os.environ.get("CV_MAP_MAX_LABELS", 150))
+LABEL_MODES = {
+    "Automatique": 'auto',
+    "Niveau de détail": 'lod',
+    "Au survol uniquement": 'survol',
+    "Toutes": 'tous',
+}
+
+
+def resolve_label_mode(mode=None, n_points=0, max_labels=MAX_LABELS):
+    """Mode effectif (``survol``, ``lod`` ou ``tous``) pour ``n_points`` points."""
+    mode = mode or 'auto'
+    if mode == 'auto':
+        return 'tous' if n_points <= max_labels else 'lod'
+    if mode not in LABEL_MODES.values():
+        raise ValueError(f"Mode d'étiquetage inconnu : {mode} (choix : {', '.join(LABEL_MODES.values())})")
+    return mode
+
+
+def lod_label_mask(x, y, max_labels=MAX_LABELS):
+    """Points à nommer : au plus un par case d'une grille d'au plus ``max_labels`` cases."""
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    mask = np.zeros(len(x), dtype=bool)
+    if len(x) == 0 or max_labels <= 0:
+        return mask
+    side = max(1, math.isqrt(max_labels))
+    span_x = max(np.ptp(x), 1e-12)
+    span_y = max(np.ptp(y), 1e-12)
+    fx = (x - x.min()) / span_x * side
+    fy = (y - y.min()) / span_y * side
+    ix = np.minimum(fx.astype('int64'), side - 1)
+    iy = np.minimum(fy.astype('int64'), side - 1)
+    cells = iy * side + ix
+    # Dans chaque case, le point le plus proche du centre de la case
+    distance = (fx - ix - 0.5) ** 2 + (fy - iy - 0.5) ** 2
+    order = np.lexsort((distance, cells))
+    _, first = np.unique(cells[order], return_index=True)
+    mask[order[first]] = True
+    return mask
+
+
+def label_scatter(x, y, labels, mode=None, hovertext=None, marker=None, textfont=None, max_labels=MAX_LABELS):
+    """Traces ``Scattergl`` : les points (nom au survol) et, selon le mode, une partie des noms."""
+    # float32 : précision largement suffisante à l'écran, tableaux binaires deux fois plus petits
+    x = np.asarray(x, dtype='float32')
+    y = np.asarray(y, dtype='float32')
+    labels = np.asarray(labels, dtype=object)
+    mode = resolve_label_mode(mode, len(x), max_labels)
+
+    traces = [go.Scattergl(
+        x=x, y=y,
+        mode='markers',
+        marker=marker or {},
+        hovertext=labels if hovertext is None else hovertext,
+        hoverinfo='text',
+        showlegend=False,
+    )]
+    if mode != 'survol':
+        keep = np.ones(len(x), dtype=bool) if mode == 'tous' else lod_label_mask(x, y, max_labels)
+        traces.append(go.Scattergl(
+            x=x[keep], y=y[keep],
+            mode='text',
+            text=labels[keep],
+            textposition='top center',
+            textfont=textfont or {},
+            hoverinfo='skip',
+            showlegend=False,
+        ))
+    return traces
+
+
+def _annotation_figure(x, y, labels):
+    # Rendu précédent : un point SVG et une annotation avec flèche et lien par nom
+    fig = go.Figure(go.Scatter(x=x, y=y, mode='markers', text=labels))
+    fig.update_layout(annotations=[
+        dict(x=xi, y=yi, text=f'<a href="/{label}/" target="_blank">{label}</a>',
+             showarrow=True, arrowhead=2, ax=20, ay=-20)
+        for xi, yi, label in zip(x, y, labels)
+    ])
+    return fig
+
+
+def benchmark(sizes=(1000, 5000), mode=None):
+    """Taille JSON et durée de construction des figures : annotations contre ``label_scatter``."""
+    import pandas as pd
+
+    rows = []
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        x, y = rng.normal(size=(2, n))
+        labels = [f"Point {i}" for i in range(n)]
+        for name, build in [('annotations', lambda: _annotation_figure(x, y, labels)),
+                            ('webgl', lambda: go.Figure(label_scatter(x, y, labels, mode)))]:
+            start = time.perf_counter()
+            payload = build().to_json()
+            rows.append({
+                'points': n,
+                'rendu': name,
+                'secondes': round(time.perf_counter() - start, 3),
+                'ko': round(len(payload) / 1024, 1),
+                'noms_affiches': _shown_labels(json.loads(payload)),
+            })
+            print(rows[-1], flush=True)
+    return pd.DataFrame(rows)
+
+
+def _shown_labels(figure):
+    annotations = len(figure.get('layout', {}).get('annotations', []))
+    texts = sum(len(trace.get('text') or []) for trace in figure['data'] if trace.get('mode') == 'text')
+    return annotations + texts
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 5000]
+    print(benchmark(sizes).to_string(index=False))
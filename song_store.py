@@ -0,0 +1,111 @@
+"""Chansons et embeddings des paroles, regroupés par artiste et lus artiste par artiste.
+
+``cluster.parquet`` contient une ligne par chanson (``artist_name``,
+``song_title``, ``album_name``) et l'embedding de ses paroles
+(``embedded_lyrics``, chaîne ``"[0.1, ...]"`` ou liste). Il est converti une fois
+en ``.cache/chansons_par_artiste.parquet`` :
+
+- lignes triées par artiste, chaque artiste entier dans un seul row group
+  (regroupés jusqu'à ``ROW_GROUP_SIZE`` lignes), statistiques min/max écrites :
+  le filtre ``artist_name == ...`` est poussé au lecteur Parquet, qui ne lit
+  que le row group de l'artiste ;
+- embeddings en binaire (liste de taille fixe de float32), relus sans analyse
+  de texte.
+
+Les chansons des derniers artistes consultés restent en mémoire (cache LRU de
+``CV_SONG_CACHE_ARTISTS`` artistes, 32 par défaut), partagé par les sessions.
+
+Construction manuelle : ``python song_store.py``
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from artist_store import _embedding_matrix
+from storage import cache_path, file_fingerprint, is_fresh, write_fingerprinted_parquet
+
+SOURCE_FILE = "cluster.parquet"
+STORE_NAME = "chansons_par_artiste.parquet"
+STORE_VERSION = "1"
+ROW_GROUP_SIZE = 4096
+SONG_CACHE_ARTISTS = int(os.environ.get("CV_SONG_CACHE_ARTISTS", 32))
+
+SONG_COLUMNS = ['song_title', 'album_name']
+
+
+def source_fingerprint():
+    """Empreinte de ``cluster.parquet`` et de la version du format."""
+    return f"{STORE_VERSION}:{file_fingerprint(SOURCE_FILE)}"
+
+
+def _artist_row_groups(artists):
+    """Bornes (début, fin) des row groups : artistes consécutifs, jamais coupés."""
+    starts = np.flatnonzero(np.r_[True, artists[1:] != artists[:-1]])
+    stops = np.r_[starts[1:], len(artists)]
+    bounds, group_start = [], 0
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        if stop - group_start > ROW_GROUP_SIZE and start > group_start:
+            bounds.append((group_start, start))
+            group_start = start
+    bounds.append((group_start, len(artists)))
+    return bounds
+
+
+def build_song_store():
+    """Convertit ``cluster.parquet`` en jeu trié par artiste, embeddings binaires ; renvoie son chemin."""
+    fingerprint = source_fingerprint()
+    table = pq.read_table(SOURCE_FILE, columns=['artist_name'] + SONG_COLUMNS + ['embedded_lyrics'])
+    table = table.take(pc.sort_indices(table, sort_keys=[('artist_name', 'ascending')]))
+
+    matrix = np.ascontiguousarray(_embedding_matrix(table.column('embedded_lyrics'), SOURCE_FILE))
+    embeddings = pa.FixedSizeListArray.from_arrays(pa.array(matrix.reshape(-1)), matrix.shape[1])
+    table = table.drop_columns(['embedded_lyrics']).append_column('embedding', embeddings)
+
+    artists = table.column('artist_name').to_numpy(zero_copy_only=False)
+    return write_fingerprinted_parquet(cache_path(STORE_NAME), table, fingerprint,
+                                       row_group_bounds=_artist_row_groups(artists), write_statistics=True)
+
+
+def ensure_song_store():
+    """Chemin du jeu par artiste, reconstruit seulement si ``cluster.parquet`` a changé."""
+    path = cache_path(STORE_NAME)
+    if is_fresh(path, source_fingerprint()):
+        return path
+    return build_song_store()
+
+
+def list_artists():
+    """Artistes disponibles (triés), sans lire les chansons."""
+    column = pq.read_table(ensure_song_store(), columns=['artist_name']).column('artist_name')
+    return pc.unique(column).to_pylist()
+
+
+@lru_cache(maxsize=SONG_CACHE_ARTISTS)
+def _read_artist(artist, fingerprint):
+    table = pq.read_table(ensure_song_store(), filters=[('artist_name', '==', artist)],
+                          columns=SONG_COLUMNS + ['embedding'])
+    embeddings = pc.list_flatten(table.column('embedding')).to_numpy(zero_copy_only=False)
+    embeddings = embeddings.reshape(table.num_rows, table.schema.field('embedding').type.list_size)
+    embeddings.setflags(write=False)
+    songs = table.drop_columns(['embedding']).to_pandas()
+    return songs, embeddings
+
+
+def load_artist_songs(artist):
+    """Titres et albums (DataFrame) et embeddings (float32, lecture seule) des chansons d'un artiste.
+
+    Seul le row group de l'artiste est lu ; les résultats sont partagés par le
+    cache LRU (ne pas modifier le DataFrame renvoyé).
+    """
+    return _read_artist(artist, source_fingerprint())
+
+
+if __name__ == "__main__":
+    path = ensure_song_store()
+    metadata = pq.ParquetFile(path).metadata
+    print(f"{path} : {metadata.num_rows} chansons, {len(list_artists())} artistes, "
+          f"{metadata.num_row_groups} row groups")
@@ -0,0 +1,89 @@
+"""Emplacement et empreintes des fichiers dérivés (cache disque partagé par les pages)."""
+import hashlib
+import os
+from pathlib import Path
+
+# Répertoire des artefacts dérivés (reconstructibles, non versionnés)
+CACHE_DIR = Path(os.environ.get("CV_CACHE_DIR", ".cache"))
+
+
+def cache_path(name: str) -> Path:
+    """Chemin d'un artefact dans le répertoire de cache (créé si besoin)."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return CACHE_DIR / name
+
+
+def file_fingerprint(*paths) -> str:
+    """Empreinte courte (chemin, taille, mtime) des fichiers sources.
+
+    Suffisant pour invalider un artefact dérivé quand une source est remplacée,
+    sans relire son contenu.
+    """
+    h = hashlib.sha1()
+    for path in paths:
+        p = Path(path)
+        h.update(str(p).encode())
+        if p.exists():
+            st_ = p.stat()
+            h.update(f"{st_.st_size}:{st_.st_mtime_ns}".encode())
+        else:
+            h.update(b"missing")
+    return h.hexdigest()[:16]
+
+
+def atomic_write(path: Path, write_fn):
+    """Écrit via un fichier temporaire puis renomme (pas de fichier partiel lu par un autre worker)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write_fn(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path
+
+
+def write_fingerprinted_parquet(path, data, fingerprint, preserve_index=False, row_group_bounds=None, **options):
+    """Écrit ``data`` (table Arrow ou DataFrame) en Parquet, avec l'empreinte de sa source en métadonnées.
+
+    ``row_group_bounds`` : bornes (début, fin) explicites des row groups ; sinon
+    ``options`` est passé à ``pq.write_table`` (compression zstd par défaut).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=preserve_index)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'source_fingerprint'] = fingerprint.encode()
+    table = table.replace_schema_metadata(metadata)
+    options.setdefault('compression', 'zstd')
+
+    def write(tmp):
+        if row_group_bounds is None:
+            pq.write_table(table, tmp, **options)
+            return
+        with pq.ParquetWriter(tmp, table.schema, **options) as writer:
+            for start, stop in row_group_bounds:
+                writer.write_table(table.slice(start, stop - start), row_group_size=stop - start)
+
+    return atomic_write(path, write)
+
+
+def is_fresh(path, fingerprint) -> bool:
+    """Vrai si le Parquet ``path`` existe et a été construit depuis la source d'empreinte ``fingerprint``."""
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    if not path.exists():
+        return False
+    metadata = pq.read_schema(path).metadata or {}
+    return metadata.get(b'source_fingerprint', b'').decode() == fingerprint
+
+
+def read_if_fresh(path, fingerprint, **options):
+    """DataFrame du Parquet ``path`` s'il est à jour de ``fingerprint``, sinon ``None``."""
+    import pandas as pd
+
+    return pd.read_parquet(path, **options) if is_fresh(path, fingerprint) else None
@@ -0,0 +1,25 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from artist_store import _embedding_matrix
+
+
+def test_embedding_matrix_parses_strings_and_lists():
+    strings = pa.chunked_array([pa.array(["[0.1, 0.2]", "[1, 2]"])])
+    lists = pa.chunked_array([pa.array([[0.1, 0.2], [1.0, 2.0]])])
+    expected = np.array([[0.1, 0.2], [1, 2]], dtype='float32')
+    np.testing.assert_array_equal(_embedding_matrix(strings), expected)
+    np.testing.assert_array_equal(_embedding_matrix(lists), expected)
+
+
+@pytest.mark.parametrize('cells', [
+    ["[0.1, x]", "[1, 2]"],
+    ["[0.1, 0.2]", None],
+    ["[0.1, 0.2]", "[]"],
+    ["[0.1, 0.2, 0.3]", "[1, 2]"],
+    [[0.1, 0.2], [1.0]],
+])
+def test_embedding_matrix_rejects_malformed_cells(cells):
+    with pytest.raises(ValueError, match="source.parquet"):
+        _embedding_matrix(pa.chunked_array([pa.array(cells)]), "source.parquet")
@@ -0,0 +1,12 @@
+import numpy as np
+
+from backtesting import horizon_metrics, summary_metrics
+
+
+def test_mape_ignores_months_without_accidents():
+    result = {'predicted': [[1.0, 2.0], [3.0, 4.0]], 'actual': [[0.0, 2.0], [0.0, 5.0]], 'origins': [0, 1]}
+
+    par_horizon = horizon_metrics(result)
+    assert np.isnan(par_horizon['MAPE'].iloc[0])
+    assert par_horizon['MAPE'].iloc[1] == 10.0
+    assert summary_metrics(result)['MAPE (%)'] == 10.0
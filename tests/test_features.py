@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from features import DAILY_EXOG, EXOG_VARS, daily_climatology, expected_exog, holdout_exog
+
+
+def synthetic_daily(days=3 * 365, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2019-01-01', periods=days, freq='D')
+    return pd.DataFrame(rng.normal(size=(days, len(EXOG_VARS))), index=index, columns=EXOG_VARS)
+
+
+def test_holdout_exog_ignores_held_out_days():
+    features = synthetic_daily()
+    horizon = 60
+    validation = holdout_exog(features, horizon, DAILY_EXOG)
+
+    # Jours validés remplacés par des valeurs aberrantes : le profil de validation ne bouge pas
+    altered = features.copy()
+    altered.iloc[-horizon:] = 1e6
+    pd.testing.assert_frame_equal(holdout_exog(altered, horizon, DAILY_EXOG), validation)
+    assert validation.index.equals(features.index[-horizon:])
+
+    # Alors qu'un profil sur tout l'historique en dépend
+    full = expected_exog(daily_climatology(altered), features.index[-horizon:], DAILY_EXOG)
+    assert not np.allclose(full.to_numpy(), validation.to_numpy())
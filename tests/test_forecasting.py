@@ -0,0 +1,42 @@
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecasting
+import storage
+
+
+def test_search_without_any_scored_candidate_raises_value_error(monkeypatch, tmp_path):
+    # Aucun candidat ajustable : la liste des finalistes est vide, sans pool (map intégré)
+    monkeypatch.setattr(storage, 'CACHE_DIR', tmp_path)
+    def failed_fit(endog, exog, order, seasonal_order, criterion, maxiter, deadline=None):
+        return {'order': list(order), 'seasonal_order': list(seasonal_order), criterion: None}
+
+    monkeypatch.setattr(forecasting, '_score_order', failed_fit)
+    series = pd.Series(np.arange(36, dtype='float64'), index=pd.date_range('2020-01-01', periods=36, freq='MS'))
+
+    with pytest.raises(ValueError, match="Aucun ordre SARIMA"):
+        forecasting.search_sarima_order(series, pool=None)
+
+
+def test_failed_parallel_fit_is_logged_and_reported(monkeypatch, tmp_path, caplog):
+    # Les workers relisent CV_CACHE_DIR ; le processus parent, storage.CACHE_DIR
+    monkeypatch.setenv('CV_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(storage, 'CACHE_DIR', tmp_path)
+    endog = pd.Series(np.arange(36, dtype='float64'), index=pd.date_range('2020-01-01', periods=36, freq='MS'))
+    exog = pd.DataFrame({'x': np.arange(10, dtype='float64')})  # longueur incohérente : l'ajustement échoue
+    main_file = getattr(sys.modules['__main__'], '__file__', None)
+
+    pool = forecasting.make_fit_pool(max_workers=2)
+    try:
+        future = forecasting.submit_fit(pool, 'sarimax', endog, exog, (1, 0, 0), (0, 0, 0, 0))
+        assert getattr(sys.modules['__main__'], '__file__', None) == main_file
+        with caplog.at_level(logging.ERROR, logger='forecasting'):
+            assert forecasting.wait_fit(future) is False
+    finally:
+        pool.shutdown()
+    assert "Échec d'un ajustement" in caplog.text
+    assert caplog.records[-1].exc_info is not None
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import youtube_map
+
+LABELS = list("abcdefg")
+
+
+def synthetic_channels(n=40, seed=0):
+    # Numériques continues : pas d'égalité de similarité entre voisins
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'title': [f"chaine {i}" for i in range(n)],
+        'charge_politique_latente': rng.uniform(0, 100, n),
+        'index_fanatisme': rng.uniform(0, 100, n),
+    })
+    for col in youtube_map.LIST_COLS:
+        df[col] = [sorted(rng.choice(LABELS, rng.integers(0, 4), replace=False).tolist()) for _ in range(n)]
+    return df
+
+
+def neighbor_pairs(frame):
+    return frame.set_index(['title', 'voisin'])['similarite'].sort_index()
+
+
+def test_incremental_neighbors_match_full_rebuild_after_content_change():
+    df = synthetic_channels()
+    X, encoders = youtube_map.fit_encoders(df)
+    previous = youtube_map.build_neighbors(df, X)
+
+    # Même titre, libellés modifiés : ses anciennes listes de voisins ne valent plus
+    df.at[3, 'figures_ennemies'] = ['a', 'b', 'g']
+    df.at[3, 'thématiques_dominantes'] = ['c', 'd']
+    X = youtube_map.encode_channels(df, encoders)
+    incremental = youtube_map.build_neighbors(df, X, previous, changed=['chaine 3'])
+    rebuilt = youtube_map.build_neighbors(df, X)
+
+    incremental, rebuilt = neighbor_pairs(incremental), neighbor_pairs(rebuilt)
+    assert incremental.index.equals(rebuilt.index)
+    np.testing.assert_allclose(incremental.to_numpy(), rebuilt.to_numpy(), atol=1e-5)
+
+
+def write_results(df, path):
+    csv = df.copy()
+    for col in youtube_map.LIST_COLS:
+        csv[col] = csv[col].map(repr)
+    csv.to_csv(path, index=False)
+
+
+def test_channel_with_changed_content_is_replaced(monkeypatch, tmp_path):
+    pytest.importorskip('umap')
+    import storage
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, 'CACHE_DIR', tmp_path / 'cache')
+    df = synthetic_channels()
+    write_results(df, youtube_map.RESULTS_FILE)
+    before = youtube_map.build_embedding().set_index('title')
+
+    # Titre inchangé, contenu modifié : l'empreinte change, la chaîne doit être replacée
+    df.at[3, 'charge_politique_latente'] = 100 - df.at[3, 'charge_politique_latente']
+    df.at[3, 'figures_ennemies'] = ['a', 'b', 'g']
+    write_results(df, youtube_map.RESULTS_FILE)
+    after = youtube_map.place_new_channels()
+    assert after is not None
+    after = after.set_index('title')
+
+    loaded = youtube_map.load_results()
+    hashes = pd.Series(youtube_map.content_hashes(loaded), index=loaded['title'])
+    assert after.at['chaine 3', 'empreinte'] == hashes['chaine 3']
+    assert after.at['chaine 3', 'empreinte'] != before.at['chaine 3', 'empreinte']
+    assert (after.at['chaine 3', 'x'], after.at['chaine 3', 'y']) != (before.at['chaine 3', 'x'], before.at['chaine 3', 'y'])
+    others = before.index.drop('chaine 3')
+    pd.testing.assert_frame_equal(after.loc[others, ['x', 'y', 'empreinte']], before.loc[others, ['x', 'y', 'empreinte']])
@@ -0,0 +1,382 @@
+"""Projection UMAP des chaînes YouTube, calculée une fois par version de ``results_df.csv``.
+
+Le CSV d'analyse des chaînes est converti une fois en Parquet sous ``.cache/`` :
+les colonnes de listes, écrites dans le CSV sous forme de ``repr`` Python, y sont
+des colonnes natives ``list<string>`` (valeurs encodées par dictionnaire). Seule
+la conversion décode les chaînes ; les lectures suivantes ne chargent que les
+colonnes utiles, les listes restant dans les tampons Arrow.
+
+Encodage multilabel des colonnes de listes (matrice creuse CSR construite
+directement depuis les tampons Arrow), standardisation puis UMAP (distance
+cosinus, voisins calculés sur la matrice creuse) ne tournent qu'à la construction : les coordonnées 2D sont enregistrées
+sous ``.cache/`` avec l'empreinte du CSV, et le réducteur ajusté (avec ses
+encodeurs) est conservé à côté. La page ne fait que relire les coordonnées ;
+UMAP (et la compilation numba) n'est importé que pour reconstruire.
+
+Quand le CSV change, les chaînes déjà projetées gardent leurs coordonnées : seules
+les nouvelles, et celles dont le contenu a changé (empreinte de chaque ligne
+enregistrée avec les coordonnées), sont encodées avec les vocabulaires et
+statistiques enregistrés puis placées par ``reducer.transform``. Un réajustement complet n'a lieu que si aucune
+chaîne connue ne subsiste, si les titres ne sont plus uniques, ou si les chaînes
+placées ainsi dépassent ``MAX_PLACED_FRACTION`` de celles de l'ajustement.
+
+Les chaînes les plus proches de chacune (similarité cosinus dans l'espace des
+variables standardisées, et non dans la projection 2D qui déforme les distances)
+sont pré-calculées à côté des coordonnées ; l'index est complété au même moment
+que la projection quand des chaînes sont ajoutées.
+
+Construction manuelle : ``python youtube_map.py`` (``--refit`` : réajustement complet)
+"""
+import ast
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from storage import atomic_write, cache_path, file_fingerprint, is_fresh, read_if_fresh, write_fingerprinted_parquet
+
+RESULTS_FILE = "results_df.csv"
+RESULTS_STORE = "youtube_results.parquet"
+EMBEDDING_NAME = "youtube_umap.parquet"
+REDUCER_NAME = "youtube_umap_reducer.pkl"
+NEIGHBORS_NAME = "youtube_neighbors.parquet"
+EMBEDDING_VERSION = "3"
+
+NUMERICAL_COLS = ["charge_politique_latente", "index_fanatisme"]
+# Colonnes de listes (stockées sous forme de chaînes dans le CSV)
+LIST_COLS = [
+    "style_de_politisation",
+    "figures_ennemies",
+    "valeurs_invoquées",
+    "thématiques_dominantes",
+]
+UMAP_PARAMS = dict(n_neighbors=5, min_dist=0.1, metric="cosine", random_state=42)
+# Part maximale de chaînes placées sans réajustement (rapportée aux chaînes ajustées)
+MAX_PLACED_FRACTION = 0.5
+# Voisins conservés par chaîne, et lignes de la matrice de similarité calculées à la fois
+N_NEIGHBORS = 10
+SIMILARITY_BLOCK = 512
+
+
+def _parse_list(value):
+    return [str(v) for v in ast.literal_eval(value)] if isinstance(value, str) and value.startswith('[') else []
+
+
+def convert_results(target=None):
+    """Convertit le CSV en Parquet (chaînes avec titre et charge politique, listes natives)."""
+    fingerprint = source_fingerprint()
+    target = target or cache_path(RESULTS_STORE)
+    df = pd.read_csv(RESULTS_FILE)
+    df = df.dropna(subset=["title", "charge_politique_latente"]).reset_index(drop=True)
+    for col in LIST_COLS:
+        df[col] = df[col].map(_parse_list)
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for col in LIST_COLS:
+        schema = schema.set(schema.get_field_index(col), pa.field(col, pa.list_(pa.string())))
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    return write_fingerprinted_parquet(target, table, fingerprint)
+
+
+def ensure_results_store():
+    """Chemin du Parquet des chaînes, reconverti seulement si le CSV a changé."""
+    target = cache_path(RESULTS_STORE)
+    if is_fresh(target, source_fingerprint()):
+        return target
+    return convert_results(target)
+
+
+def load_results(columns=None):
+    """Chaînes analysées (titre et charge politique renseignés).
+
+    Par défaut, seules les colonnes de la projection sont lues ; les colonnes de
+    listes sont des séries ``list<string>`` adossées à Arrow.
+    """
+    columns = columns or ["title"] + NUMERICAL_COLS + LIST_COLS
+    table = pq.read_table(ensure_results_store(), columns=columns)
+    return table.to_pandas(types_mapper=lambda t: pd.ArrowDtype(t) if pa.types.is_list(t) else None)
+
+
+def multilabel_matrix(labels, vocabulary):
+    """Indicatrices CSR (chaînes x ``vocabulary``) d'une série de listes, sans passer par Python.
+
+    Les libellés hors vocabulaire sont ignorés.
+    """
+    from scipy import sparse
+
+    lists = pa.array(labels)
+    lengths = pc.list_value_length(lists).fill_null(0).to_numpy()
+    columns = pc.index_in(pc.list_flatten(lists), value_set=pa.array(vocabulary, pa.string()))
+    rows = np.repeat(np.arange(len(lists)), lengths)
+    known = columns.is_valid().to_numpy(zero_copy_only=False)
+    matrix = sparse.csr_matrix(
+        (np.ones(known.sum(), dtype='float64'),
+         (rows[known], columns.drop_null().to_numpy().astype('int64'))),
+        shape=(len(lists), len(vocabulary)),
+    )
+    # Libellé répété dans une même liste : indicatrice à 1
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def _vocabulary(labels):
+    values = pc.unique(pc.list_flatten(pa.array(labels))).drop_null()
+    return values.take(pc.sort_indices(values)).to_pylist()
+
+
+def _feature_blocks(df, vocabularies):
+    from scipy import sparse
+
+    X_num = df[NUMERICAL_COLS].fillna(0).to_numpy(dtype='float64')
+    X_lab = sparse.hstack([multilabel_matrix(df[col], vocabularies[col]) for col in LIST_COLS], format='csr')
+    return X_num, X_lab
+
+
+def fit_encoders(df):
+    """Matrice CSR standardisée (numériques + indicatrices multilabel) et encodeurs ajustés.
+
+    Les numériques sont centrées-réduites ; les indicatrices sont seulement
+    réduites (centrer rendrait la matrice dense).
+    """
+    from scipy import sparse
+    from sklearn.preprocessing import StandardScaler
+
+    vocabularies = {col: _vocabulary(df[col]) for col in LIST_COLS}
+    X_num, X_lab = _feature_blocks(df, vocabularies)
+    num_scaler = StandardScaler()
+    label_scaler = StandardScaler(with_mean=False)
+    X_scaled = sparse.hstack([num_scaler.fit_transform(X_num), label_scaler.fit_transform(X_lab)], format='csr')
+    encoders = {'vocabularies': vocabularies, 'num_scaler': num_scaler, 'label_scaler': label_scaler}
+    return X_scaled, encoders
+
+
+def encode_channels(df, encoders):
+    """Matrice CSR standardisée de nouvelles chaînes, avec les encodeurs de l'ajustement.
+
+    Les libellés absents des vocabulaires enregistrés sont ignorés.
+    """
+    from scipy import sparse
+
+    X_num, X_lab = _feature_blocks(df, encoders['vocabularies'])
+    return sparse.hstack([encoders['num_scaler'].transform(X_num),
+                          encoders['label_scaler'].transform(X_lab)], format='csr')
+
+
+def content_hashes(df):
+    """Empreinte (uint64) du contenu de chaque chaîne : variables numériques et listes."""
+    parts = [pc.cast(pa.array(df[col]), pa.string()).fill_null('') for col in NUMERICAL_COLS]
+    parts += [pc.binary_join(pa.array(df[col]), '\x1f').fill_null('') for col in LIST_COLS]
+    joined = pc.binary_join_element_wise(*parts, '\x1e')
+    return pd.util.hash_array(joined.to_numpy(zero_copy_only=False))
+
+
+def _coords_frame(x, y, df):
+    return pd.DataFrame({
+        "x": x,
+        "y": y,
+        "title": df["title"].to_numpy(),
+        "charge_politique_latente": df["charge_politique_latente"].to_numpy(),
+        "empreinte": content_hashes(df),
+    })
+
+
+def _write_frame(name, frame, fingerprint):
+    write_fingerprinted_parquet(cache_path(name), frame, fingerprint)
+
+
+def _read_if_fresh(name, fingerprint):
+    return read_if_fresh(cache_path(name), fingerprint)
+
+
+def _write_state(state):
+    atomic_write(cache_path(REDUCER_NAME), lambda tmp: tmp.write_bytes(pickle.dumps(state)))
+
+
+def source_fingerprint():
+    """Empreinte du CSV de résultats et de la version du calcul."""
+    return f"{EMBEDDING_VERSION}:{file_fingerprint(RESULTS_FILE)}"
+
+
+def build_embedding():
+    """Ajuste encodeurs et UMAP, enregistre coordonnées et réducteur ; renvoie les coordonnées."""
+    from umap.umap_ import UMAP
+
+    fingerprint = source_fingerprint()
+    df = load_results()
+    X_scaled, encoders = fit_encoders(df)
+    reducer = UMAP(**UMAP_PARAMS)
+    embedding = reducer.fit_transform(X_scaled)
+
+    coords = _coords_frame(embedding[:, 0], embedding[:, 1], df)
+    _write_frame(EMBEDDING_NAME, coords, fingerprint)
+    _write_state(dict(encoders, reducer=reducer, source_fingerprint=fingerprint,
+                      fitted=len(df), placed=0))
+    _write_frame(NEIGHBORS_NAME, build_neighbors(df, X_scaled), fingerprint)
+    return coords
+
+
+def place_new_channels():
+    """Met à jour la projection sans réajustement : nouvelles chaînes placées, anciennes inchangées.
+
+    Renvoie les coordonnées, ou ``None`` si un réajustement complet est nécessaire.
+    """
+    path = cache_path(EMBEDDING_NAME)
+    state_path = cache_path(REDUCER_NAME)
+    if not (path.exists() and state_path.exists()):
+        return None
+    state = pickle.loads(state_path.read_bytes())
+    if not state.get('source_fingerprint', '').startswith(f"{EMBEDDING_VERSION}:"):
+        return None
+    previous = pd.read_parquet(path).set_index('title')
+    df = load_results()
+    if df['title'].duplicated().any() or not previous.index.is_unique:
+        return None
+
+    # Chaîne connue : même titre et même contenu ; une chaîne réanalysée est replacée
+    known = (df['title'].isin(previous.index).to_numpy()
+             & (previous['empreinte'].reindex(df['title'], fill_value=0).to_numpy() == content_hashes(df)))
+    new_rows = df.loc[~known].reset_index(drop=True)
+    placed = state.get('placed', 0) + len(new_rows)
+    if not known.any() or placed > MAX_PLACED_FRACTION * state.get('fitted', len(previous)):
+        return None
+
+    x = previous['x'].reindex(df['title']).to_numpy(copy=True)
+    y = previous['y'].reindex(df['title']).to_numpy(copy=True)
+    if len(new_rows):
+        embedding = state['reducer'].transform(encode_channels(new_rows, state))
+        x[~known] = embedding[:, 0]
+        y[~known] = embedding[:, 1]
+
+    neighbors_path = cache_path(NEIGHBORS_NAME)
+    previous_neighbors = pd.read_parquet(neighbors_path) if neighbors_path.exists() else None
+    changed = df.loc[~known & df['title'].isin(previous.index).to_numpy(), 'title']
+    neighbors = build_neighbors(df, encode_channels(df, state), previous_neighbors, changed=changed)
+
+    fingerprint = source_fingerprint()
+    coords = _coords_frame(x, y, df)
+    _write_frame(EMBEDDING_NAME, coords, fingerprint)
+    _write_frame(NEIGHBORS_NAME, neighbors, fingerprint)
+    _write_state(dict(state, source_fingerprint=fingerprint, placed=placed))
+    return coords
+
+
+def _top_similar(X, rows, candidates, k, exclude_self=False):
+    """Les ``k`` colonnes ``candidates`` les plus similaires à chaque ligne ``rows`` (X normalisé)."""
+    k = min(k, len(candidates) - int(exclude_self))
+    index = np.empty((len(rows), max(k, 0)), dtype='int64')
+    similarity = np.empty((len(rows), max(k, 0)), dtype='float32')
+    if k <= 0:
+        return index, similarity
+    C = X[candidates].T.tocsc()
+    for start in range(0, len(rows), SIMILARITY_BLOCK):
+        block = rows[start:start + SIMILARITY_BLOCK]
+        S = (X[block] @ C).toarray()
+        if exclude_self:
+            # rows ⊂ candidates : une chaîne n'est pas sa propre voisine
+            S[np.arange(len(block)), np.searchsorted(candidates, block)] = -np.inf
+        top = np.argpartition(-S, k - 1, axis=1)[:, :k]
+        top_sim = np.take_along_axis(S, top, axis=1)
+        order = np.argsort(-top_sim, axis=1)
+        index[start:start + len(block)] = candidates[np.take_along_axis(top, order, axis=1)]
+        similarity[start:start + len(block)] = np.take_along_axis(top_sim, order, axis=1)
+    return index, similarity
+
+
+def _neighbors_frame(titles, rows, index, similarity):
+    k = index.shape[1]
+    return pd.DataFrame({
+        'title': np.repeat(titles[rows], k),
+        'voisin': titles[index.ravel()],
+        'similarite': similarity.ravel(),
+    })
+
+
+def _sorted_neighbors(frame, k):
+    frame = frame.sort_values(['title', 'similarite'], ascending=[True, False], kind='stable')
+    return frame.groupby('title', sort=False).head(k).reset_index(drop=True)
+
+
+def build_neighbors(df, X_scaled, previous=None, k=N_NEIGHBORS, changed=()):
+    """Index des ``k`` chaînes les plus similaires (cosinus) à chaque chaîne.
+
+    Avec ``previous`` (index d'une version antérieure), seules les nouvelles
+    chaînes, celles dont le contenu a changé (titres ``changed``) et celles qui
+    ont perdu un voisin sont recalculées entièrement ; les autres ne sont
+    comparées qu'aux nouvelles et aux modifiées.
+    """
+    from sklearn.preprocessing import normalize
+
+    X = normalize(X_scaled.tocsr(), norm='l2')
+    titles = df['title'].to_numpy(dtype=object)
+    everyone = np.arange(len(titles))
+    if previous is None:
+        recompute = everyone
+        kept = previous = pd.DataFrame(columns=['title', 'voisin', 'similarite'])
+        new = np.array([], dtype='int64')
+    else:
+        # Voisins réutilisables : chaîne et voisin toujours présents, contenus inchangés
+        usable = set(titles).difference(changed)
+        kept = previous[previous['title'].isin(usable) & previous['voisin'].isin(usable)]
+        counts = kept['title'].value_counts()
+        indexed = np.isin(titles, counts.index[counts >= min(k, len(titles) - 1)])
+        new = np.flatnonzero(~np.isin(titles, previous['title'].unique()) | np.isin(titles, list(changed)))
+        recompute = np.flatnonzero(~indexed)
+        kept = kept[kept['title'].isin(titles[indexed])]
+
+    parts = [kept]
+    if len(recompute):
+        parts.append(_neighbors_frame(titles, recompute, *_top_similar(X, recompute, everyone, k, exclude_self=True)))
+    updated = np.setdiff1d(everyone, recompute)
+    if len(new) and len(updated):
+        # Chaînes déjà indexées : seules les nouvelles et les modifiées peuvent entrer dans leurs voisins
+        parts.append(_neighbors_frame(titles, updated, *_top_similar(X, updated, new, k)))
+    frame = pd.concat([p for p in parts if len(p)], ignore_index=True)
+    frame['similarite'] = frame['similarite'].astype('float32')
+    return _sorted_neighbors(frame, k)
+
+
+def load_neighbors():
+    """Index des chaînes similaires (title, voisin, similarite), à jour du CSV."""
+    load_embedding()
+    fingerprint = source_fingerprint()
+    neighbors = _read_if_fresh(NEIGHBORS_NAME, fingerprint)
+    if neighbors is None:
+        state = load_reducer()
+        df = load_results()
+        neighbors = build_neighbors(df, encode_channels(df, state))
+        _write_frame(NEIGHBORS_NAME, neighbors, fingerprint)
+    return neighbors
+
+
+def similar_channels(neighbors, title, k=N_NEIGHBORS):
+    """Les ``k`` chaînes les plus similaires à ``title``, de la plus proche à la moins proche."""
+    return neighbors[neighbors['title'] == title].head(k)[['voisin', 'similarite']].reset_index(drop=True)
+
+
+def load_embedding():
+    """Coordonnées 2D des chaînes, relues depuis le disque si à jour (sinon recalculées)."""
+    coords = _read_if_fresh(EMBEDDING_NAME, source_fingerprint())
+    if coords is not None:
+        return coords
+    coords = place_new_channels()
+    return coords if coords is not None else build_embedding()
+
+
+def load_reducer():
+    """Réducteur UMAP ajusté et encodeurs associés (dict), reconstruits si le CSV a changé."""
+    path = cache_path(REDUCER_NAME)
+    if path.exists():
+        state = pickle.loads(path.read_bytes())
+        if state.get('source_fingerprint') == source_fingerprint():
+            return state
+    load_embedding()
+    return pickle.loads(path.read_bytes())
+
+
+if __name__ == "__main__":
+    coords = build_embedding() if "--refit" in sys.argv else load_embedding()
+    print(f"{cache_path(EMBEDDING_NAME)} : {len(coords)} chaînes")